@@ -1,9 +1,24 @@
+import os
 from flask import Flask
 from flask_cors import CORS
 from flask_caching import Cache
 
+# Backends do cache de respostas (variável de ambiente CACHE_BACKEND):
+# - memoria: LRU em memória com contadores (app/cache_lru.py), um cache por processo
+# - sqlite: arquivo SQLite em CACHE_DIR, compartilhado pelos workers do gunicorn, sem servidor
+# - redis: servidor compatível com Redis em CACHE_REDIS_URL (requer o pacote redis)
+BACKENDS_CACHE = {
+    'memoria': {'CACHE_TYPE': 'app.cache_lru.CacheLRU'},
+    'sqlite': {'CACHE_TYPE': 'app.cache_compartilhado.CacheSQLite', 'CACHE_DIR': os.getenv('CACHE_DIR', 'cache/')},
+    'redis': {'CACHE_TYPE': 'app.cache_compartilhado.CacheRedis', 'CACHE_REDIS_URL': os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')},
+}
+
  # Configuração do cache
-cache = Cache(config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 300})
+cache = Cache(config={
+    **BACKENDS_CACHE[os.getenv('CACHE_BACKEND', 'memoria')],
+    'CACHE_DEFAULT_TIMEOUT': 300,
+    'CACHE_THRESHOLD': int(os.getenv('CACHE_MAX_RESPOSTAS', 1000)),
+})
 
 def create_app():
     app = Flask(__name__)
@@ -0,0 +1,192 @@
+# agendador.py
+import asyncio
+import logging
+import queue
+import time
+from concurrent.futures import Future
+from threading import Thread, Lock, Timer
+
+
+# Faixa de processamento: uma fila própria atendida por um grupo de threads
+# Perguntas locais (pandas) e perguntas do Gemini usam faixas diferentes, assim
+# uma rajada de perguntas lentas não bloqueia as respostas rápidas
+# Cada tarefa pode ter um prazo (time.monotonic()): vencido na fila, ela nem é executada
+class Faixa:
+    def __init__(self, nome, trabalhadores, antes_de_processar=None):
+        self.nome = nome
+        self.trabalhadores = trabalhadores
+        self.fila = queue.Queue()
+        # Ex.: controle de taxa da API; recebe os segundos até o prazo (ou None) e devolve
+        # quantos segundos adiar a tarefa (0 = processar agora)
+        self.antes_de_processar = antes_de_processar
+
+        self._trava = Lock()
+        self.em_execucao = 0
+        self.iniciadas = 0
+        self.processadas = 0
+        self.adiadas = 0
+        self.vencidas = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+        for i in range(trabalhadores):
+            Thread(target=self._trabalhar, name=f"faixa-{nome}-{i}", daemon=True).start()
+
+    # Enfileirar uma tarefa (função sem argumentos) e devolver o Future com o resultado
+    def enviar(self, tarefa, prazo=None):
+        futuro = Future()
+        self.fila.put((time.monotonic(), tarefa, futuro, prazo, False))
+        return futuro
+
+    # Devolver à fila uma tarefa adiada, já liberada pelo antes_de_processar
+    def _reenfileirar(self, enfileirada_em, tarefa, futuro, prazo):
+        with self._trava:
+            self.adiadas -= 1
+        self.fila.put((enfileirada_em, tarefa, futuro, prazo, True))
+
+    def _trabalhar(self):
+        while True:
+            enfileirada_em, tarefa, futuro, prazo, liberada = self.fila.get()
+            try:
+                if prazo is not None and time.monotonic() >= prazo:
+                    with self._trava:
+                        self.vencidas += 1
+                    raise TimeoutError(f"Prazo vencido na fila da faixa {self.nome}")
+
+                if self.antes_de_processar and not liberada:
+                    adiar = self.antes_de_processar(None if prazo is None else prazo - time.monotonic())
+                    if adiar > 0:
+                        # A vez da tarefa já está garantida: ela volta para a fila na hora certa
+                        # sem ocupar uma thread da faixa dormindo até lá
+                        with self._trava:
+                            self.adiadas += 1
+                        temporizador = Timer(adiar, self._reenfileirar, args=(enfileirada_em, tarefa, futuro, prazo))
+                        temporizador.daemon = True
+                        temporizador.start()
+                        continue
+
+                # Tempo de espera: da entrada na fila até o início do processamento
+                espera = time.monotonic() - enfileirada_em
+                with self._trava:
+                    self.em_execucao += 1
+                    self.iniciadas += 1
+                    self.espera_total += espera
+                    self.espera_maxima = max(self.espera_maxima, espera)
+
+                try:
+                    futuro.set_result(tarefa())
+                finally:
+                    with self._trava:
+                        self.em_execucao -= 1
+                        self.processadas += 1
+            except Exception as e:
+                logging.exception(f"Erro na faixa {self.nome}")
+                futuro.set_exception(e)
+            finally:
+                self.fila.task_done()
+
+    # Métricas da faixa: profundidade da fila e tempo de espera
+    def metricas(self):
+        with self._trava:
+            return {
+                "trabalhadores": self.trabalhadores,
+                "na_fila": self.fila.qsize(),
+                "em_execucao": self.em_execucao,
+                "processadas": self.processadas,
+                "adiadas": self.adiadas,
+                "vencidas": self.vencidas,
+                "espera_media_s": self.espera_total / self.iniciadas if self.iniciadas else 0.0,
+                "espera_maxima_s": self.espera_maxima,
+            }
+
+
+# Faixa para tarefas que devolvem corrotinas (chamadas ao Gemini): um único laço asyncio
+# numa thread própria, com até `trabalhadores` tarefas em andamento ao mesmo tempo
+# Enquanto uma geração aguarda a API, nenhuma thread fica parada; mesma interface da Faixa
+class FaixaAssincrona:
+    def __init__(self, nome, trabalhadores, antes_de_processar=None):
+        self.nome = nome
+        self.trabalhadores = trabalhadores
+        self.antes_de_processar = antes_de_processar
+
+        self._trava = Lock()
+        self.na_fila = 0
+        self.em_execucao = 0
+        self.iniciadas = 0
+        self.processadas = 0
+        self.adiadas = 0
+        self.vencidas = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+        self._laco = asyncio.new_event_loop()
+        self._semaforo = None  # Criado dentro do laço
+        Thread(target=self._laco.run_forever, name=f"faixa-{nome}", daemon=True).start()
+
+    # Enfileirar uma tarefa (função sem argumentos que devolve uma corrotina) e devolver o
+    # Future (concurrent.futures) com o resultado
+    def enviar(self, tarefa, prazo=None):
+        with self._trava:
+            self.na_fila += 1
+        return asyncio.run_coroutine_threadsafe(self._processar(time.monotonic(), tarefa, prazo), self._laco)
+
+    def _verificar_prazo(self, prazo):
+        if prazo is not None and time.monotonic() >= prazo:
+            with self._trava:
+                self.vencidas += 1
+            raise TimeoutError(f"Prazo vencido na fila da faixa {self.nome}")
+
+    async def _processar(self, enfileirada_em, tarefa, prazo):
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.trabalhadores)
+        iniciada = False
+        try:
+            self._verificar_prazo(prazo)
+            if self.antes_de_processar:
+                restante = None if prazo is None else prazo - time.monotonic()
+                adiar = await asyncio.to_thread(self.antes_de_processar, restante)
+                if adiar > 0:
+                    with self._trava:
+                        self.adiadas += 1
+                    try:
+                        await asyncio.sleep(adiar)  # A vez já está garantida; só a corrotina espera
+                    finally:
+                        with self._trava:
+                            self.adiadas -= 1
+
+            async with self._semaforo:
+                self._verificar_prazo(prazo)
+                espera = time.monotonic() - enfileirada_em
+                with self._trava:
+                    self.na_fila -= 1
+                    self.em_execucao += 1
+                    self.iniciadas += 1
+                    self.espera_total += espera
+                    self.espera_maxima = max(self.espera_maxima, espera)
+                iniciada = True
+                try:
+                    return await tarefa()
+                finally:
+                    with self._trava:
+                        self.em_execucao -= 1
+                        self.processadas += 1
+        except Exception:
+            logging.exception(f"Erro na faixa {self.nome}")
+            raise
+        finally:
+            if not iniciada:
+                with self._trava:
+                    self.na_fila -= 1
+
+    def metricas(self):
+        with self._trava:
+            return {
+                "trabalhadores": self.trabalhadores,
+                "na_fila": self.na_fila,
+                "em_execucao": self.em_execucao,
+                "processadas": self.processadas,
+                "adiadas": self.adiadas,
+                "vencidas": self.vencidas,
+                "espera_media_s": self.espera_total / self.iniciadas if self.iniciadas else 0.0,
+                "espera_maxima_s": self.espera_maxima,
+            }
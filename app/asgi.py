@@ -0,0 +1,160 @@
+# asgi.py
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qsl
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app.routes import (
+    processar_requisicao_pergunta, processar_atualizacao_telegram, preparar_requisicao_em_partes,
+    responder_em_partes_async, evento_da_etapa, evento_de_erro,
+)
+
+TAMANHO_MAXIMO_CORPO = 1024 * 1024  # Bytes aceitos no corpo das rotas nativas
+
+
+# Ler o corpo inteiro da requisição ASGI (que pode chegar em vários pedaços)
+async def _ler_corpo(receive):
+    partes, tamanho = [], 0
+    while True:
+        mensagem = await receive()
+        if mensagem['type'] == 'http.disconnect':
+            return None
+        partes.append(mensagem.get('body', b''))
+        tamanho += len(partes[-1])
+        if tamanho > TAMANHO_MAXIMO_CORPO:
+            raise ValueError("Corpo da requisição grande demais")
+        if not mensagem.get('more_body', False):
+            return b''.join(partes)
+
+
+async def _enviar(send, status, corpo, tipo='application/json', cabecalhos=None):
+    conteudo = corpo if isinstance(corpo, bytes) else json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+    cabecalhos = {
+        'content-type': tipo,
+        'content-length': str(len(conteudo)),
+        'access-control-allow-origin': '*',  # Mesmo comportamento do flask_cors nas outras rotas
+        **{nome.lower(): valor for nome, valor in (cabecalhos or {}).items()},
+    }
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(nome.encode('latin-1'), valor.encode('latin-1')) for nome, valor in cabecalhos.items()],
+    })
+    await send({'type': 'http.response.body', 'body': conteudo})
+
+
+async def _rota_pergunta(scope, receive, send):
+    try:
+        corpo = await _ler_corpo(receive)
+        if corpo is None:
+            return
+        dados = json.loads(corpo or b'null')
+    except ValueError:
+        await _enviar(send, 400, {"erro": "JSON inválido."})
+        return
+    cabecalhos_requisicao = dict(scope.get('headers', []))
+    conversa, nome_carteira = cabecalhos_requisicao.get(b'x-conversa'), cabecalhos_requisicao.get(b'x-carteira')
+    resposta, status, cabecalhos = await processar_requisicao_pergunta(
+        dados if isinstance(dados, dict) else None,
+        conversa.decode('latin-1') if conversa else None,
+        nome_carteira.decode('latin-1') if nome_carteira else None,
+    )
+    await _enviar(send, status, resposta, cabecalhos=cabecalhos)
+
+
+# Resposta em partes (server-sent events) no laço de eventos: cada evento sai num pedaço do corpo,
+# e a espera pelo limite do Gemini não prende nenhuma thread (responder_em_partes_async)
+async def _rota_pergunta_em_partes(scope, receive, send):
+    if scope['method'] == 'GET':
+        dados = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+    else:
+        try:
+            corpo = await _ler_corpo(receive)
+            if corpo is None:
+                return
+            dados = json.loads(corpo or b'null')
+        except ValueError:
+            await _enviar(send, 400, {"erro": "JSON inválido."})
+            return
+    cabecalhos_requisicao = dict(scope.get('headers', []))
+    conversa, nome_carteira = cabecalhos_requisicao.get(b'x-conversa'), cabecalhos_requisicao.get(b'x-carteira')
+    # Numa thread: a primeira pergunta de um cliente pode carregar a carteira dele
+    pergunta, carteira, conversa, erro = await asyncio.to_thread(
+        preparar_requisicao_em_partes,
+        dados if isinstance(dados, dict) else None,
+        conversa.decode('latin-1') if conversa else None,
+        nome_carteira.decode('latin-1') if nome_carteira else None,
+    )
+    if erro is not None:
+        await _enviar(send, erro[1], erro[0])
+        return
+
+    # Sem buffer no proxy (nginx) para que cada parte chegue assim que for gerada
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'), (b'access-control-allow-origin', b'*'),
+        ],
+    })
+    try:
+        async for tipo, conteudo in responder_em_partes_async(pergunta, carteira, conversa):
+            await send({'type': 'http.response.body', 'body': evento_da_etapa(tipo, conteudo).encode('utf-8'), 'more_body': True})
+    except Exception as e:
+        await send({'type': 'http.response.body', 'body': evento_de_erro(e).encode('utf-8'), 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _rota_telegram(scope, receive, send):
+    try:
+        corpo = await _ler_corpo(receive)
+        if corpo is None:
+            return
+        dados = json.loads(corpo)
+    except ValueError:
+        await _enviar(send, 400, {"erro": "JSON inválido."})
+        return
+    # O dispatcher só enfileira a pergunta; numa thread para não travar o laço com o cache/classificador
+    await asyncio.to_thread(processar_atualizacao_telegram, dados)
+    await _enviar(send, 200, b'ok', tipo='text/html; charset=utf-8')
+
+
+# Rotas atendidas direto no laço de eventos: a espera pela resposta é um await sobre o Future
+# da faixa, então centenas de perguntas pendentes não ocupam nenhuma thread
+ROTAS_NATIVAS = {
+    ('POST', '/pergunta'): _rota_pergunta,
+    ('GET', '/pergunta/stream'): _rota_pergunta_em_partes,
+    ('POST', '/pergunta/stream'): _rota_pergunta_em_partes,
+    ('POST', '/telegram_webhook'): _rota_telegram,
+}
+
+
+# Aplicação ASGI (uvicorn asgi:app): as rotas de perguntas são nativas e as demais seguem
+# para o Flask pelo adaptador WSGI do asgiref (que as executa num pool de threads)
+def criar_app_asgi(app_flask):
+    app_wsgi = WsgiToAsgi(app_flask)
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                mensagem = await receive()
+                if mensagem['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif mensagem['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+
+        rota = ROTAS_NATIVAS.get((scope.get('method'), scope.get('path'))) if scope['type'] == 'http' else None
+        if rota is None:
+            await app_wsgi(scope, receive, send)
+            return
+        try:
+            await rota(scope, receive, send)
+        except Exception:
+            logging.exception(f"Erro na rota {scope['path']}")
+            await _enviar(send, 500, {"erro": "Erro interno."})
+
+    return app
@@ -0,0 +1,143 @@
+# cache_compartilhado.py
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.rediscache import RedisCache
+
+
+# Backend do Flask-Caching compartilhado entre processos (workers do gunicorn) sem servidor
+# externo: um arquivo SQLite em modo WAL no CACHE_DIR
+# - limitado a CACHE_THRESHOLD itens, descartando os menos usados recentemente (LRU)
+# - add() é um único INSERT ... ON CONFLICT, atômico entre processos: só um worker
+#   consegue reservar uma chave (usado para que apenas um deles calcule cada resposta)
+class CacheSQLite(BaseCache):
+    def __init__(self, caminho, threshold=1000, default_timeout=300, ignore_delete_many_errors=False):
+        super().__init__(default_timeout=default_timeout, ignore_delete_many_errors=ignore_delete_many_errors)
+        self.caminho = caminho
+        self.limite = threshold
+        self._local = threading.local()  # Uma conexão por thread
+        self._trava_contadores = threading.Lock()
+        self._contadores = {"acertos": 0, "falhas": 0, "expirados": 0, "descartados": 0}
+
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        conexao = self._conexao()
+        conexao.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "chave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira_em REAL, usado_em REAL NOT NULL)"
+        )
+        conexao.execute("CREATE INDEX IF NOT EXISTS cache_usado_em ON cache (usado_em)")
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        caminho = os.path.join(config['CACHE_DIR'], 'respostas.sqlite3')
+        kwargs.update(threshold=config['CACHE_THRESHOLD'], default_timeout=config['CACHE_DEFAULT_TIMEOUT'])
+        return cls(caminho, *args, **kwargs)
+
+    def _conexao(self):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            # isolation_level=None: cada comando é sua própria transação (autocommit)
+            conexao = sqlite3.connect(self.caminho, timeout=30, isolation_level=None, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def _contar(self, contador, quantidade=1):
+        with self._trava_contadores:
+            self._contadores[contador] += quantidade
+
+    def _expiracao(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return time.time() + timeout if timeout > 0 else None
+
+    def get(self, key):
+        conexao = self._conexao()
+        linha = conexao.execute("SELECT valor, expira_em FROM cache WHERE chave = ?", (key,)).fetchone()
+        agora = time.time()
+        if linha is not None and linha[1] is not None and linha[1] <= agora:
+            conexao.execute("DELETE FROM cache WHERE chave = ? AND expira_em <= ?", (key, agora))
+            self._contar("expirados")
+            linha = None
+        if linha is None:
+            self._contar("falhas")
+            return None
+
+        conexao.execute("UPDATE cache SET usado_em = ? WHERE chave = ?", (agora, key))
+        self._contar("acertos")
+        return pickle.loads(linha[0])
+
+    def set(self, key, value, timeout=None):
+        conexao = self._conexao()
+        conexao.execute(
+            "INSERT OR REPLACE INTO cache (chave, valor, expira_em, usado_em) VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expiracao(timeout), time.time()),
+        )
+        self._descartar_excedentes(conexao)
+        return True
+
+    def add(self, key, value, timeout=None):
+        conexao = self._conexao()
+        agora = time.time()
+        # Insere se a chave não existe ou se o valor anterior já expirou; senão, não altera nada
+        cursor = conexao.execute(
+            "INSERT INTO cache (chave, valor, expira_em, usado_em) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (chave) DO UPDATE SET valor = excluded.valor, expira_em = excluded.expira_em, "
+            "usado_em = excluded.usado_em WHERE cache.expira_em IS NOT NULL AND cache.expira_em <= ?",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expiracao(timeout), agora, agora),
+        )
+        if cursor.rowcount != 1:
+            return False
+        self._descartar_excedentes(conexao)
+        return True
+
+    def _descartar_excedentes(self, conexao):
+        excedentes = conexao.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.limite
+        if excedentes > 0:
+            cursor = conexao.execute(
+                "DELETE FROM cache WHERE chave IN (SELECT chave FROM cache ORDER BY usado_em LIMIT ?)", (excedentes,)
+            )
+            self._contar("descartados", cursor.rowcount)
+
+    def delete(self, key):
+        return self._conexao().execute("DELETE FROM cache WHERE chave = ?", (key,)).rowcount == 1
+
+    def has(self, key):
+        linha = self._conexao().execute(
+            "SELECT 1 FROM cache WHERE chave = ? AND (expira_em IS NULL OR expira_em > ?)", (key, time.time())
+        ).fetchone()
+        return linha is not None
+
+    def clear(self):
+        self._conexao().execute("DELETE FROM cache")
+        return True
+
+    def metricas(self):
+        itens = self._conexao().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        with self._trava_contadores:
+            contadores = dict(self._contadores)
+        consultas = contadores["acertos"] + contadores["falhas"]
+        return {
+            "itens": itens,
+            "limite": self.limite,
+            **contadores,  # Contadores deste processo; os itens são compartilhados
+            "taxa_acerto": round(contadores["acertos"] / consultas, 4) if consultas else None,
+        }
+
+
+# Adaptador para servidores compatíveis com Redis (Redis, Valkey, KeyDB...; CACHE_REDIS_URL)
+# O add() do RedisCache do Flask-Caching faz SETNX e depois EXPIRE: se o worker cair entre
+# os dois comandos a reserva nunca expira. Aqui é um único SET NX EX, atômico no servidor
+class CacheRedis(RedisCache):
+    def add(self, key, value, timeout=None):
+        timeout = self._normalize_timeout(timeout)
+        return bool(self._write_client.set(
+            name=f"{self._get_prefix()}{key}",
+            value=self.serializer.dumps(value),
+            ex=timeout if timeout > 0 else None,
+            nx=True,
+        ))
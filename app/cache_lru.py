@@ -0,0 +1,91 @@
+# cache_lru.py
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from flask_caching.backends.base import BaseCache
+
+
+# Backend do Flask-Caching (CACHE_TYPE='app.cache_lru.CacheLRU') para as respostas:
+# em memória, limitado a CACHE_THRESHOLD itens com descarte do menos usado recentemente (LRU),
+# expiração por item (timeout 0 = sem expiração) e contadores de acertos e falhas
+class CacheLRU(BaseCache):
+    def __init__(self, threshold=1000, default_timeout=300, ignore_delete_many_errors=False):
+        super().__init__(default_timeout=default_timeout, ignore_delete_many_errors=ignore_delete_many_errors)
+        self.limite = threshold
+        self._itens = OrderedDict()  # chave -> (expira_em ou None, valor)
+        self._trava = Lock()
+        self._contadores = {"acertos": 0, "falhas": 0, "expirados": 0, "descartados": 0}
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(threshold=config['CACHE_THRESHOLD'], default_timeout=config['CACHE_DEFAULT_TIMEOUT'])
+        return cls(*args, **kwargs)
+
+    def _expiracao(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return time.monotonic() + timeout if timeout > 0 else None
+
+    # Buscar o item válido (sem contar acerto/falha); remove o item se já expirou
+    def _buscar(self, key):
+        item = self._itens.get(key)
+        if item is None:
+            return None
+        expira_em, _ = item
+        if expira_em is not None and expira_em <= time.monotonic():
+            del self._itens[key]
+            self._contadores["expirados"] += 1
+            return None
+        return item
+
+    def _guardar(self, key, value, timeout):
+        self._itens[key] = (self._expiracao(timeout), value)
+        self._itens.move_to_end(key)
+        while len(self._itens) > self.limite:
+            self._itens.popitem(last=False)
+            self._contadores["descartados"] += 1
+
+    def get(self, key):
+        with self._trava:
+            item = self._buscar(key)
+            if item is None:
+                self._contadores["falhas"] += 1
+                return None
+            self._itens.move_to_end(key)
+            self._contadores["acertos"] += 1
+            return item[1]
+
+    def set(self, key, value, timeout=None):
+        with self._trava:
+            self._guardar(key, value, timeout)
+        return True
+
+    def add(self, key, value, timeout=None):
+        with self._trava:
+            if self._buscar(key) is not None:
+                return False
+            self._guardar(key, value, timeout)
+        return True
+
+    def delete(self, key):
+        with self._trava:
+            return self._itens.pop(key, None) is not None
+
+    def has(self, key):
+        with self._trava:
+            return self._buscar(key) is not None
+
+    def clear(self):
+        with self._trava:
+            self._itens.clear()
+        return True
+
+    def metricas(self):
+        with self._trava:
+            consultas = self._contadores["acertos"] + self._contadores["falhas"]
+            return {
+                "itens": len(self._itens),
+                "limite": self.limite,
+                **self._contadores,
+                "taxa_acerto": round(self._contadores["acertos"] / consultas, 4) if consultas else None,
+            }
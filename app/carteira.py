@@ -0,0 +1,105 @@
+# carteira.py
+import hashlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+from app.contexto import ContextoCarteira
+from app.cubo import construir_cubo
+from app.indice_nomes import IndiceNomes
+from app.somente_leitura import congelar
+
+
+# Snapshot de uma carteira de processos já normalizada
+# A versão é a assinatura do arquivo de origem: muda sempre que os dados mudam
+# O cubo de agregados, o índice de nomes das partes e o contexto do Gemini são montados aqui,
+# uma vez por carga, e lidos pelos handlers
+# Os dados são congelados: o mesmo DataFrame é lido por várias requisições ao mesmo tempo,
+# então colunas derivadas devem ser calculadas na ingestão (app/ingestao.py)
+# Numa carga incremental (app/delta.py) o cubo já vem atualizado e os termos do índice de nomes
+# são reaproveitados da carteira anterior; impressoes_linhas guarda a impressão digital de cada
+# linha bruta, usada para comparar a próxima exportação com esta
+class Carteira:
+    def __init__(self, dados, versao, origem=None, impressoes_linhas=None, cubo=None, anterior=None):
+        self.dados = congelar(dados)
+        self.versao = versao
+        self.origem = origem
+        self.impressoes_linhas = impressoes_linhas
+        self.cubo = cubo if cubo is not None else construir_cubo(self.dados)
+        termos_conhecidos = anterior.indice_nomes.termos_por_nome if anterior is not None and anterior.indice_nomes else None
+        self.indice_nomes = (
+            IndiceNomes(self.dados, termos_conhecidos=termos_conhecidos)
+            if 'Envolvidos - Polo Ativo' in self.dados.columns else None
+        )
+        self.contexto = ContextoCarteira(self.dados, self.cubo, self.indice_nomes, versao, origem)
+        self.alteracoes = None  # Resumo da carga incremental que montou esta carteira (app/delta.py)
+        self._memoria = None
+        self._impressoes = {}
+
+    # Impressão digital do conteúdo que uma intenção lê (Intencao.dependencias), usada na chave do
+    # cache no lugar da versão: quando uma exportação nova não muda esse conteúdo, as respostas já
+    # calculadas continuam valendo
+    # - fonte 'cubo': caminhos (dimensão, agregado) do cubo, ex.: ('Foro', 'Total deferido')
+    # - fonte 'dados': nomes das colunas (uma coluna ausente também entra na impressão)
+    # Sem dependências declaradas (ou outra fonte), a impressão é a própria versão
+    def impressao(self, fonte, dependencias):
+        if not dependencias or fonte not in ('cubo', 'dados'):
+            return self.versao
+        chave = (fonte, dependencias)
+        impressao = self._impressoes.get(chave)
+        if impressao is None:
+            resumo = hashlib.sha1(fonte.encode('utf-8'))
+            for dependencia in dependencias:
+                resumo.update(repr(dependencia).encode('utf-8'))
+                if fonte == 'cubo':
+                    resumo.update(repr(self.cubo.get(dependencia[0], {}).get(dependencia[1])).encode('utf-8'))
+                elif dependencia in self.dados.columns:
+                    serie = self.dados[dependencia]
+                    resumo.update(str(serie.dtype).encode('utf-8'))
+                    resumo.update(pd.util.hash_pandas_object(serie, index=False).to_numpy().tobytes())
+            impressao = self._impressoes[chave] = resumo.hexdigest()
+        return impressao
+
+    # Memória aproximada (bytes) ocupada pela carteira: dados, cubo, índice de nomes e contexto
+    # As estruturas são imutáveis e medidas uma vez; só a tabela completa do contexto é somada à parte,
+    # porque é serializada depois, na primeira pergunta do modo 'completo'
+    def memoria(self):
+        if self._memoria is None:
+            self._memoria = _tamanho_profundo(self, {id(self.contexto.__dict__.get('_contexto_completo'))})
+        completo = self.contexto._contexto_completo
+        return self._memoria + (sys.getsizeof(completo) if completo is not None else 0)
+
+    def __repr__(self):
+        return f"Carteira(origem={self.origem!r}, versao={self.versao[:12]!r}, linhas={len(self.dados)})"
+
+
+# Tamanho (bytes) de um objeto e de tudo que ele referencia, contando cada objeto uma única vez
+# (o DataFrame da carteira é compartilhado pelo índice de nomes e pelo contexto)
+def _tamanho_profundo(objeto, vistos):
+    if id(objeto) in vistos:
+        return 0
+    vistos.add(id(objeto))
+    if isinstance(objeto, pd.DataFrame):
+        return sum(_tamanho_serie(objeto[coluna]) for coluna in objeto.columns) + int(objeto.index.memory_usage())
+    if isinstance(objeto, pd.Series):
+        return _tamanho_serie(objeto)
+    if isinstance(objeto, np.ndarray):
+        return objeto.nbytes
+    tamanho = sys.getsizeof(objeto)
+    if isinstance(objeto, dict):
+        tamanho += sum(_tamanho_profundo(chave, vistos) + _tamanho_profundo(valor, vistos) for chave, valor in objeto.items())
+    elif isinstance(objeto, (list, tuple, set, frozenset)):
+        tamanho += sum(_tamanho_profundo(item, vistos) for item in objeto)
+    elif hasattr(objeto, '__dict__') and not isinstance(objeto, type):
+        tamanho += _tamanho_profundo(vars(objeto), vistos)
+    return tamanho
+
+
+# memory_usage(deep=True) falha com os arrays somente leitura da carteira: os textos são medidos um a um
+def _tamanho_serie(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.nbytes + sum(map(sys.getsizeof, serie.cat.categories))
+    if serie.dtype == object:
+        return serie.memory_usage(index=False) + sum(map(sys.getsizeof, serie.to_numpy()))
+    return serie.memory_usage(index=False)
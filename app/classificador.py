@@ -0,0 +1,82 @@
+# classificador.py
+import re
+import unicodedata
+from collections import deque
+
+
+# Função para normalizar a pergunta, removendo acentos e pontuações
+def normalizar_pergunta(pergunta):
+    # Remover acentos
+    pergunta = ''.join(
+        c for c in unicodedata.normalize('NFD', pergunta) if unicodedata.category(c) != 'Mn'
+    )
+    # Remover pontuações
+    pergunta = re.sub(r'[^\w\s]', '', pergunta)
+    return pergunta.lower().strip()
+
+
+# Classificador de intenções: um autômato de Aho-Corasick montado uma vez com todas as
+# frases de app/map.py (normalizadas como as perguntas), que encontra a categoria em uma
+# única passada pela pergunta, sem depender da ordem de um laço de re.search.
+#
+# Regra de desempate: vence a frase encontrada mais longa (a mais específica); com o
+# mesmo tamanho, vence a categoria declarada primeiro em categoria_perguntas.
+class ClassificadorIntencoes:
+    def __init__(self, categorias):
+        self._transicoes = [{}]
+        self._falha = [0]
+        self._melhor = [None]  # Por estado: (tamanho, -ordem, categoria) da melhor frase que termina ali
+
+        for ordem, (categoria, frases) in enumerate(categorias.items()):
+            for frase in frases:
+                if not re.fullmatch(r'[\w\s]+', frase):
+                    raise ValueError(f"Os padrões de categoria_perguntas devem ser frases literais: {frase!r}")
+                self._adicionar(normalizar_pergunta(frase), categoria, ordem)
+        self._ligar_falhas()
+
+    def _adicionar(self, frase, categoria, ordem):
+        estado = 0
+        for caractere in frase:
+            proximo = self._transicoes[estado].get(caractere)
+            if proximo is None:
+                self._transicoes.append({})
+                self._falha.append(0)
+                self._melhor.append(None)
+                proximo = len(self._transicoes) - 1
+                self._transicoes[estado][caractere] = proximo
+            estado = proximo
+
+        candidato = (len(frase), -ordem, categoria)
+        if self._melhor[estado] is None or candidato[:2] > self._melhor[estado][:2]:
+            self._melhor[estado] = candidato
+
+    # Montar os links de falha em largura e propagar para cada estado a melhor frase
+    # que termina nele (inclusive as frases que são sufixo do caminho até ali)
+    def _ligar_falhas(self):
+        fila = deque(self._transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            for caractere, destino in self._transicoes[estado].items():
+                fila.append(destino)
+                falha = self._falha[estado]
+                while falha and caractere not in self._transicoes[falha]:
+                    falha = self._falha[falha]
+                self._falha[destino] = self._transicoes[falha].get(caractere, 0)
+
+                herdado = self._melhor[self._falha[destino]]
+                if herdado is not None and (self._melhor[destino] is None or herdado[:2] > self._melhor[destino][:2]):
+                    self._melhor[destino] = herdado
+
+    # Identificar a categoria de uma pergunta já normalizada; None quando nenhuma frase aparece
+    def classificar(self, pergunta_normalizada):
+        transicoes, falhas, melhores = self._transicoes, self._falha, self._melhor
+        estado = 0
+        melhor = None
+        for caractere in pergunta_normalizada:
+            while estado and caractere not in transicoes[estado]:
+                estado = falhas[estado]
+            estado = transicoes[estado].get(caractere, 0)
+            encontrado = melhores[estado]
+            if encontrado is not None and (melhor is None or encontrado[:2] > melhor[:2]):
+                melhor = encontrado
+        return melhor[2] if melhor else None
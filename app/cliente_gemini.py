@@ -0,0 +1,147 @@
+# cliente_gemini.py
+import asyncio
+import logging
+import os
+import random
+import time
+from threading import Lock
+from types import SimpleNamespace
+
+import google.generativeai as genai
+from google.api_core import exceptions as erros_api
+
+from config import GEMINI_MODELO, GEMINI_TIMEOUT, GEMINI_TENTATIVAS, GEMINI_ESPERA_INICIAL, GEMINI_LATENCIA_FALSA
+
+# Erros passageiros da API: vale a pena tentar de novo (com espera crescente)
+ERROS_TEMPORARIOS = (
+    erros_api.ResourceExhausted,    # 429
+    erros_api.ServiceUnavailable,   # 503
+    erros_api.InternalServerError,  # 500
+    erros_api.DeadlineExceeded,     # Timeout do lado da API
+    TimeoutError,
+)
+
+
+# Modelo local com a mesma interface do genai.GenerativeModel (generate_content e
+# generate_content_async), para medir latência e concorrência sem rede (GEMINI_MODELO=falso)
+class ModeloFalso:
+    def __init__(self, latencia=1.0, taxa_falhas=0.0):
+        self.latencia = latencia
+        self.taxa_falhas = taxa_falhas  # Fração das chamadas que falham com erro temporário
+        self.chamadas = 0
+        self._trava = Lock()
+
+    def _responder(self, prompt):
+        with self._trava:
+            self.chamadas += 1
+        if random.random() < self.taxa_falhas:
+            raise erros_api.ServiceUnavailable("Falha simulada do modelo falso")
+        pergunta = prompt.rsplit("Pergunta atual:", 1)[-1].split("\n", 1)[0].strip()
+        return SimpleNamespace(
+            text=f"Resposta simulada para: {pergunta}",
+            usage_metadata=SimpleNamespace(prompt_token_count=len(prompt) // 4),
+        )
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        if stream:
+            return RespostaFalsaEmPartes(self, prompt)
+        time.sleep(self.latencia)
+        return self._responder(prompt)
+
+    async def generate_content_async(self, prompt, request_options=None):
+        await asyncio.sleep(self.latencia)
+        return self._responder(prompt)
+
+
+# Resposta em partes do modelo falso: a latência é dividida entre os pedaços, como num
+# generate_content(stream=True); text e usage_metadata ficam completos ao final da iteração
+class RespostaFalsaEmPartes:
+    PARTES = 5
+
+    def __init__(self, modelo, prompt):
+        time.sleep(modelo.latencia / self.PARTES)  # Até o primeiro pedaço (as falhas acontecem aqui)
+        self._completa = modelo._responder(prompt)
+        self._modelo = modelo
+        self.text = ""
+        self.usage_metadata = self._completa.usage_metadata
+
+    def __iter__(self):
+        palavras = self._completa.text.split(" ")
+        tamanho = -(-len(palavras) // self.PARTES)
+        for inicio in range(0, len(palavras), tamanho):
+            if inicio:
+                time.sleep(self._modelo.latencia / self.PARTES)
+            pedaco = " ".join(palavras[inicio:inicio + tamanho]) + (" " if inicio + tamanho < len(palavras) else "")
+            self.text += pedaco
+            yield SimpleNamespace(text=pedaco)
+
+
+# Cliente do Gemini criado uma vez por processo: a API é configurada e o modelo instanciado
+# uma única vez, então o canal HTTP/gRPC é reaproveitado entre as perguntas
+# Cada chamada tem timeout e é repetida em erros temporários, com espera exponencial
+class ClienteGemini:
+    def __init__(self, modelo, timeout=GEMINI_TIMEOUT, tentativas=GEMINI_TENTATIVAS, espera_inicial=GEMINI_ESPERA_INICIAL):
+        self.modelo = modelo
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.espera_inicial = espera_inicial
+
+    # Espera antes da tentativa seguinte: exponencial com variação aleatória (jitter)
+    def _espera(self, tentativa):
+        return self.espera_inicial * 2 ** tentativa * random.uniform(0.5, 1.5)
+
+    def gerar(self, prompt):
+        for tentativa in range(self.tentativas):
+            try:
+                return self.modelo.generate_content(prompt, request_options={"timeout": self.timeout})
+            except ERROS_TEMPORARIOS as e:
+                if tentativa == self.tentativas - 1:
+                    raise
+                espera = self._espera(tentativa)
+                logging.warning(f"Gemini falhou ({e}); nova tentativa em {espera:.1f} s")
+                time.sleep(espera)
+
+    # Abrir a geração em partes (stream): devolve a resposta iterável, já com o primeiro pedaço
+    # recebido; só a abertura é repetida em erros temporários, os pedaços não
+    def gerar_em_partes(self, prompt):
+        for tentativa in range(self.tentativas):
+            try:
+                return self.modelo.generate_content(prompt, stream=True, request_options={"timeout": self.timeout})
+            except ERROS_TEMPORARIOS as e:
+                if tentativa == self.tentativas - 1:
+                    raise
+                espera = self._espera(tentativa)
+                logging.warning(f"Gemini falhou ({e}); nova tentativa em {espera:.1f} s")
+                time.sleep(espera)
+
+    async def gerar_async(self, prompt):
+        for tentativa in range(self.tentativas):
+            try:
+                return await asyncio.wait_for(
+                    self.modelo.generate_content_async(prompt, request_options={"timeout": self.timeout}),
+                    self.timeout,
+                )
+            except ERROS_TEMPORARIOS as e:
+                if tentativa == self.tentativas - 1:
+                    raise
+                espera = self._espera(tentativa)
+                logging.warning(f"Gemini falhou ({e}); nova tentativa em {espera:.1f} s")
+                await asyncio.sleep(espera)
+
+
+_cliente = None
+_trava_cliente = Lock()
+
+# Função para obter o cliente do processo (criado na primeira pergunta, não na importação,
+# para que a aplicação suba mesmo sem GEMINI_API_KEY)
+def obter_cliente():
+    global _cliente
+    with _trava_cliente:
+        if _cliente is None:
+            if GEMINI_MODELO == 'falso':
+                modelo = ModeloFalso(latencia=GEMINI_LATENCIA_FALSA)
+            else:
+                genai.configure(api_key=os.environ["GEMINI_API_KEY"])  # Certifique-se de ter a chave de API do Gemini no seu .env
+                modelo = genai.GenerativeModel(GEMINI_MODELO)
+            _cliente = ClienteGemini(modelo)
+        return _cliente
@@ -0,0 +1,292 @@
+# contexto.py
+import logging
+import math
+import re
+import time
+from collections import defaultdict
+from threading import Lock
+
+import numpy as np
+
+from app.classificador import normalizar_pergunta
+from app.indice_nomes import termos_do_nome
+from app.snapshot import ler_texto_snapshot, gravar_texto_snapshot
+from app.tokens import contador_tokens
+from config import CONTEXTO_GEMINI
+
+# Colunas sempre enviadas para identificar cada processo selecionado
+COLUNAS_BASE = ['Número CNJ', 'Status', 'Foro', 'Rito', 'Fase']
+
+# Colunas extras conforme o assunto da pergunta (termos já normalizados)
+COLUNAS_POR_ASSUNTO = [
+    ({'valor', 'valores', 'causa', 'acordo', 'acordos', 'condenacao', 'deferido', 'beneficio', 'economico', 'dinheiro', 'custo', 'provisionado'},
+     ['Total da causa', 'Total deferido', 'Valor do acordo', 'Valor provisionado']),
+    ({'data', 'datas', 'antigo', 'antigos', 'recente', 'recentes', 'idade', 'tempo', 'duracao', 'quando', 'movimentacao', 'distribuicao', 'citacao'},
+     ['Data de distribuição', 'Data de citação', 'Última mov.', 'Duração']),
+    ({'assunto', 'assuntos', 'tema', 'materia', 'pedido', 'pedidos'}, ['Assuntos']),
+    ({'orgao', 'tribunal', 'tribunais', 'vara', 'julgador'}, ['Órgão', 'Órgão julgador']),
+    ({'autor', 'autora', 'autores', 'parte', 'partes', 'reclamante', 'reclamantes', 'envolvidos'}, ['Envolvidos - Polo Ativo']),
+    ({'sentenca', 'resultado', 'desfecho', 'encerramento', 'encerrado', 'julgado', 'recurso'}, ['Desfecho', 'Data de encerramento']),
+]
+
+# Ordenação das linhas quando a pergunta pede "o mais antigo", "o de maior valor"...
+ORDENACOES = [
+    ({'antigo', 'antigos', 'idade'}, 'Data de distribuição', True),
+    ({'recente', 'recentes', 'novo', 'novos'}, 'Data de distribuição', False),
+    ({'parado', 'parados', 'movimentacao'}, 'Duração', False),
+    ({'maior', 'maiores', 'caro', 'caros'}, 'Total da causa', False),
+]
+
+# Colunas categóricas cujos valores podem aparecer na pergunta como filtro ("processos em Fortaleza")
+COLUNAS_ENTIDADE = ['Comarca', 'Status', 'Rito', 'Fase', 'Órgão']
+
+ESTADOS = {
+    'AC': 'Acre', 'AL': 'Alagoas', 'AP': 'Amapá', 'AM': 'Amazonas', 'BA': 'Bahia', 'CE': 'Ceará',
+    'DF': 'Distrito Federal', 'ES': 'Espírito Santo', 'GO': 'Goiás', 'MA': 'Maranhão',
+    'MT': 'Mato Grosso', 'MS': 'Mato Grosso do Sul', 'MG': 'Minas Gerais', 'PA': 'Pará',
+    'PB': 'Paraíba', 'PR': 'Paraná', 'PE': 'Pernambuco', 'PI': 'Piauí', 'RJ': 'Rio de Janeiro',
+    'RN': 'Rio Grande do Norte', 'RS': 'Rio Grande do Sul', 'RO': 'Rondônia', 'RR': 'Roraima',
+    'SC': 'Santa Catarina', 'SP': 'São Paulo', 'SE': 'Sergipe', 'TO': 'Tocantins',
+}
+
+# Nomes de estado que também são palavras comuns: só valem escritos com acento ("Pará", não "para")
+ESTADOS_AMBIGUOS = {'para'}
+
+# Termos frequentes nas perguntas que não dizem nada sobre o assunto dos processos
+TERMOS_GENERICOS = {
+    'base', 'carteira', 'dados', 'planilha', 'melhor', 'estrategia', 'media', 'total', 'quantidade',
+    'quantos', 'quantas', 'sobre', 'fale', 'todos', 'todas', 'mais', 'menos', 'tem', 'existe', 'existem',
+}
+
+# Colunas da tabela completa (modo CONTEXTO_GEMINI='completo'): as mesmas que o modo recortado usa
+COLUNAS_TABELA_COMPLETA = COLUNAS_BASE + [
+    coluna for _, extras in COLUNAS_POR_ASSUNTO for coluna in extras if coluna not in COLUNAS_BASE
+]
+
+# Alterar quando o formato da tabela completa mudar, para não reaproveitar arquivos antigos
+EXTENSAO_TABELA_COMPLETA = 'contexto-v1.csv'
+
+LIMITE_LINHAS_CONTEXTO = 40  # Processos enviados ao modelo por pergunta
+LIMITE_RESUMO = 10           # Itens por tabela de resumo (comarcas, assuntos, órgãos)
+LIMITE_ASSUNTOS_RANQUEADOS = 5
+
+
+# Contexto enviado ao Gemini: em vez da planilha inteira (dataframe.to_string), um resumo
+# pré-calculado a partir do cubo mais as linhas e colunas relevantes para a pergunta,
+# escolhidas por filtros de entidade (estado, comarca, status, rito, fase, órgão, parte),
+# pelo assunto da pergunta e por um ranking TF-IDF sobre os assuntos dos processos
+#
+# Tudo o que não depende da pergunta (resumo e tabela completa) é serializado uma vez por
+# versão dos dados: o objeto pertence a uma Carteira, e recarregar a planilha cria outro
+class ContextoCarteira:
+    def __init__(self, dados, cubo, indice_nomes=None, versao=None, origem=None, modo=CONTEXTO_GEMINI):
+        self.dados = dados
+        self.cubo = cubo
+        self.indice_nomes = indice_nomes
+        self.versao = versao
+        self.origem = origem
+        self.modo = modo
+        self.resumo = resumir_cubo(cubo)
+        self._contexto_completo = None
+        self._trava_tabela = Lock()
+
+        # Frase normalizada -> [(coluna, valor)] para reconhecer entidades na pergunta
+        self._entidades = defaultdict(list)
+        for coluna in COLUNAS_ENTIDADE:
+            if coluna in dados.columns:
+                for valor in dados[coluna].dropna().unique():
+                    frase = normalizar_pergunta(str(valor))
+                    if frase:
+                        self._entidades[frase].append((coluna, valor))
+        if 'Estado' in dados.columns:
+            for uf, nome in ESTADOS.items():
+                if normalizar_pergunta(nome) not in ESTADOS_AMBIGUOS:
+                    self._entidades[normalizar_pergunta(nome)].append(('Estado', uf))
+        self._maior_frase = max((len(frase.split()) for frase in self._entidades), default=0)
+
+        # TF-IDF sobre os assuntos distintos: termo -> {assunto: peso}
+        self._assuntos = defaultdict(dict)
+        if 'Assuntos' in dados.columns:
+            assuntos = [valor for valor in dados['Assuntos'].dropna().unique() if valor]
+            termos_por_assunto = {assunto: set(termos_do_nome(assunto)) for assunto in assuntos}
+            frequencia = defaultdict(int)
+            for termos in termos_por_assunto.values():
+                for termo in termos:
+                    frequencia[termo] += 1
+            for assunto, termos in termos_por_assunto.items():
+                for termo in termos:
+                    self._assuntos[termo][assunto] = math.log(len(assuntos) / frequencia[termo]) / math.sqrt(len(termos))
+
+    # Filtros de entidade encontrados na pergunta: {coluna: {valores}}
+    def _filtros(self, pergunta):
+        filtros = defaultdict(set)
+        palavras = normalizar_pergunta(pergunta).split()
+        for inicio in range(len(palavras)):
+            for tamanho in range(min(self._maior_frase, len(palavras) - inicio), 0, -1):
+                frase = " ".join(palavras[inicio:inicio + tamanho])
+                if frase in self._entidades and (tamanho > 1 or len(frase) > 2):
+                    for coluna, valor in self._entidades[frase]:
+                        filtros[coluna].add(valor)
+                    break
+        # Siglas de estado só valem em maiúsculas ("processos no CE"), para não confundir com "se", "pe"...
+        if 'Estado' in self.dados.columns:
+            for sigla in re.findall(r'\b[A-Z]{2}\b', pergunta):
+                if sigla in ESTADOS:
+                    filtros['Estado'].add(sigla)
+            for uf, nome in ESTADOS.items():
+                if normalizar_pergunta(nome) in ESTADOS_AMBIGUOS and re.search(rf'\b{nome.lower()}\b', pergunta.lower()):
+                    filtros['Estado'].add(uf)
+        return filtros
+
+    # Assuntos mais parecidos com a pergunta (soma dos pesos TF-IDF dos termos em comum),
+    # opcionalmente só entre os assuntos permitidos (os das linhas já filtradas)
+    def _ranquear_assuntos(self, termos, permitidos=None):
+        pontuacao = defaultdict(float)
+        for termo in termos - TERMOS_GENERICOS:
+            for assunto, peso in self._assuntos.get(termo, {}).items():
+                if permitidos is None or assunto in permitidos:
+                    pontuacao[assunto] += peso
+        return sorted(pontuacao, key=pontuacao.get, reverse=True)[:LIMITE_ASSUNTOS_RANQUEADOS]
+
+    # Resumo + tabela completa em CSV, serializados uma única vez por versão dos dados: na memória
+    # e, quando a origem é conhecida, também em disco (reaproveitada pelos outros workers e após reinícios)
+    def contexto_completo(self):
+        if self._contexto_completo is not None:
+            return self._contexto_completo
+
+        with self._trava_tabela:
+            if self._contexto_completo is None:
+                persistir = self.origem is not None and self.versao is not None
+                tabela = ler_texto_snapshot(self.origem, self.versao, EXTENSAO_TABELA_COMPLETA) if persistir else None
+                if tabela is None:
+                    inicio = time.perf_counter()
+                    colunas = [coluna for coluna in COLUNAS_TABELA_COMPLETA if coluna in self.dados.columns]
+                    tabela = self.dados[colunas].to_csv(index=False, date_format='%d/%m/%Y', float_format='%.2f')
+                    logging.debug(f"Tabela completa do contexto serializada em {time.perf_counter() - inicio:.2f} s ({len(tabela)} caracteres)")
+                    if persistir:
+                        gravar_texto_snapshot(tabela, self.origem, self.versao, EXTENSAO_TABELA_COMPLETA)
+                self._contexto_completo = f"{self.resumo}\n\nTodos os processos:\n{tabela}"
+        return self._contexto_completo
+
+    # Função para montar o texto de contexto da pergunta; devolve (texto, detalhes da seleção)
+    # Com orçamento (em tokens), o resumo e a tabela são cortados por linhas até caberem
+    def montar(self, pergunta, orcamento=None):
+        if self.modo == 'completo':
+            texto = self.contexto_completo()
+            detalhes = {"filtros": {}, "linhas": len(self.dados), "colunas": COLUNAS_TABELA_COMPLETA}
+            if orcamento is not None:
+                texto, linhas = contador_tokens.cortar_linhas(texto, orcamento)
+                if len(texto) < len(self.contexto_completo()):
+                    # Linhas da tabela que couberam (descontando resumo, título e cabeçalho)
+                    detalhes["linhas"] = max(0, linhas - self.resumo.count("\n") - 4)
+                    detalhes["cortado"] = True
+            detalhes["tokens_contexto"] = contador_tokens.estimar(texto)
+            return texto, detalhes
+
+        termos = set(normalizar_pergunta(pergunta).split())
+        dados = self.dados
+        selecao = None
+        detalhes = {"filtros": {}, "linhas": 0}
+
+        for coluna, valores in self._filtros(pergunta).items():
+            mascara = dados[coluna].isin(valores)
+            selecao = mascara if selecao is None else selecao & mascara
+            detalhes["filtros"][coluna] = sorted(map(str, valores))
+
+        if self.indice_nomes is not None:
+            # Só nomes exatos: aqui o nome é opcional e a busca aproximada confundiria palavras da pergunta
+            nome, posicoes = self.indice_nomes.encontrar_nome(pergunta, aproximado=False)
+            if nome:
+                mascara = np.zeros(len(dados), dtype=bool)
+                mascara[posicoes] = True
+                selecao = mascara if selecao is None else selecao & mascara
+                detalhes["filtros"]["Envolvidos - Polo Ativo"] = [" ".join(nome)]
+
+        ordenacao = next(((coluna, crescente) for gatilhos, coluna, crescente in ORDENACOES
+                          if termos & gatilhos and coluna in dados.columns), None)
+
+        # Assuntos mais parecidos com a pergunta restringem as linhas (dentro dos filtros, se houver);
+        # com ordenação ("o mais antigo") a pergunta é sobre a carteira toda
+        if ordenacao is None and 'Assuntos' in dados.columns:
+            permitidos = None if selecao is None else set(dados.loc[selecao, 'Assuntos'].dropna())
+            assuntos = self._ranquear_assuntos(termos, permitidos)
+            if assuntos:
+                mascara = dados['Assuntos'].isin(assuntos)
+                selecao = mascara if selecao is None else selecao & mascara
+                detalhes["assuntos_ranqueados"] = assuntos
+
+        colunas = list(COLUNAS_BASE)
+        for gatilhos, extras in COLUNAS_POR_ASSUNTO:
+            if termos & gatilhos:
+                colunas += [coluna for coluna in extras if coluna not in colunas]
+        if "assuntos_ranqueados" in detalhes and 'Assuntos' not in colunas:
+            colunas.append('Assuntos')
+        colunas = [coluna for coluna in colunas if coluna in dados.columns]
+
+        resumo = self.resumo
+        if orcamento is not None and contador_tokens.estimar(resumo) > orcamento:
+            resumo, _ = contador_tokens.cortar_linhas(resumo, orcamento)
+            detalhes["cortado"] = True
+        partes = [resumo]
+        if selecao is not None or ordenacao is not None:
+            linhas = dados[selecao] if selecao is not None else dados
+            if ordenacao is not None:
+                coluna, crescente = ordenacao
+                linhas = linhas.sort_values(coluna, ascending=crescente, na_position='last')
+                if coluna not in colunas:
+                    colunas.append(coluna)
+            detalhes["linhas_encontradas"] = int(len(linhas))
+            linhas = linhas.head(LIMITE_LINHAS_CONTEXTO)[colunas]
+            tabela = linhas.to_csv(index=False, date_format='%d/%m/%Y', float_format='%.2f')
+            quantidade = len(linhas)
+            if orcamento is not None:
+                # Título ("Processos relevantes... (NN de NN):") + separador entre as partes
+                restante = orcamento - contador_tokens.estimar(resumo) - 20
+                cortada, mantidas = contador_tokens.cortar_linhas(tabela, restante)
+                if len(cortada) < len(tabela.rstrip("\n")):
+                    tabela, quantidade = cortada, max(0, mantidas - 1)  # Sem o cabeçalho
+                    detalhes["cortado"] = True
+            detalhes["linhas"] = quantidade
+            if quantidade:
+                partes.append(
+                    f"Processos relevantes para a pergunta ({quantidade} de {detalhes['linhas_encontradas']}):\n" + tabela
+                )
+        detalhes["colunas"] = colunas
+
+        texto = "\n\n".join(partes)
+        detalhes["tokens_contexto"] = contador_tokens.estimar(texto)
+        return texto, detalhes
+
+
+# Função para escrever as tabelas de resumo da carteira (a partir do cubo) em texto compacto
+def resumir_cubo(cubo):
+    total = cubo['total']
+    linhas = [f"Resumo da carteira: {total['quantidade']} processos."]
+    for medida in ('Total da causa', 'Total deferido', 'Valor do acordo'):
+        if medida in total:
+            linhas.append(f"{medida}: soma R$ {total[medida]['soma']:.2f} em {total[medida]['contagem']} processos.")
+    if 'Duração' in total and total['Duração']['media'] is not None:
+        linhas.append(f"Duração média (distribuição até a última movimentação): {total['Duração']['media']:.0f} dias.")
+
+    for dimensao in ('Status', 'Rito', 'Fase'):
+        if dimensao in cubo:
+            linhas.append(f"Processos por {dimensao}: " + _listar(cubo[dimensao]['quantidade']))
+
+    if 'Estado' in cubo:
+        estado = cubo['Estado']
+        linhas.append("Por estado (estado,processos,valor_causa,duracao_media_dias):")
+        for uf, quantidade in estado['quantidade'].items():
+            valor = estado.get('Total da causa', {}).get('soma', {}).get(uf, 0.0)
+            duracao = estado.get('Duração', {}).get('media', {}).get(uf)
+            linhas.append(f"{uf or '?'},{quantidade},{valor:.2f},{'' if duracao is None else f'{duracao:.0f}'}")
+
+    for dimensao in ('Comarca', 'Assuntos', 'Órgão'):
+        if dimensao in cubo:
+            mais_frequentes = dict(list(cubo[dimensao]['quantidade'].items())[:LIMITE_RESUMO])
+            linhas.append(f"{dimensao} com mais processos: " + _listar(mais_frequentes))
+
+    return "\n".join(linhas)
+
+
+def _listar(contagem):
+    return ", ".join(f"{chave}: {quantidade}" for chave, quantidade in contagem.items())
@@ -0,0 +1,114 @@
+# cubo.py
+import pandas as pd
+
+# Dimensões pré-agregadas ('Comarca', 'Estado' e 'Duração' são colunas derivadas na ingestão)
+DIMENSOES = ['Foro', 'Comarca', 'Estado', 'Status', 'Rito', 'Fase', 'Resultado da Sentença', 'Órgão', 'Assuntos']
+
+# Medidas numéricas com soma, média e contagem (valores não nulos) por grupo
+MEDIDAS = ['Total da causa', 'Total deferido', 'Valor do acordo', 'Duração']
+
+# Colunas em que só interessa quantos valores estão preenchidos por grupo
+CONTAGENS = ['Número CNJ', 'Data de citação']
+
+
+# Função para montar o cubo de agregados da carteira, uma única vez por carga dos dados
+#
+# Estrutura (dicionários simples, prontos para JSON):
+#   cubo['total'] = {'quantidade': n, medida: {'soma', 'media', 'contagem'}, coluna: preenchidos}
+#   cubo[dimensao] = {'quantidade': {chave: n}, medida: {'soma': {...}, 'media': {...}, 'contagem': {...}},
+#                     coluna: {chave: preenchidos}}
+# 'quantidade' vem ordenada da mais frequente para a menos frequente (empates pela chave); as
+# demais, pela chave (como groupby)
+def construir_cubo(dados):
+    valores = _valores(dados)
+    cubo = {'total': _totais(valores)}
+    for dimensao in DIMENSOES:
+        if dimensao in dados.columns:
+            cubo[dimensao] = _agregar(dados[dimensao], valores)
+    return cubo
+
+
+# Função para atualizar o cubo de uma carga anterior depois de uma ingestão incremental (app/delta.py)
+# chaves_alteradas = {dimensao: chaves das linhas inseridas, alteradas ou removidas}: só os grupos
+# dessas chaves são recalculados (sobre as linhas que têm a chave nos dados novos); os demais são
+# reaproveitados, e uma dimensão sem chaves alteradas é o mesmo dicionário da carga anterior
+# O resultado é igual ao de construir_cubo(dados), inclusive na ordem das chaves
+def atualizar_cubo(cubo, dados, chaves_alteradas):
+    valores = _valores(dados)
+    novo = {'total': _totais(valores)}
+    for dimensao in DIMENSOES:
+        if dimensao not in dados.columns:
+            continue
+        chaves = chaves_alteradas.get(dimensao)
+        if dimensao not in cubo or chaves is None:
+            novo[dimensao] = _agregar(dados[dimensao], valores)
+        elif not chaves:
+            novo[dimensao] = cubo[dimensao]
+        else:
+            afetadas = dados[dimensao].isin(chaves).to_numpy()
+            parcial = _agregar(dados[dimensao][afetadas], valores[afetadas])
+            novo[dimensao] = _mesclar(cubo[dimensao], parcial, chaves)
+    return novo
+
+
+# Colunas agregadas pelo cubo: as medidas e, nas contagens, se o valor está preenchido
+def _valores(dados):
+    medidas = {nome: dados[nome] for nome in MEDIDAS if nome in dados.columns}
+    contagens = {coluna: dados[coluna].notna() for coluna in CONTAGENS if coluna in dados.columns}
+    return pd.DataFrame({**medidas, **contagens}, index=dados.index)
+
+
+def _totais(valores):
+    totais = {'quantidade': len(valores)}
+    for coluna, serie in valores.items():
+        if coluna in MEDIDAS:
+            totais[coluna] = {'soma': float(serie.sum()), 'media': _nativo(serie.mean()), 'contagem': int(serie.count())}
+        else:
+            totais[coluna] = int(serie.sum())
+    return totais
+
+
+def _agregar(chaves, valores):
+    agrupado = valores.groupby(chaves, sort=True, observed=True)
+    # Numa parte das linhas, as categorias que não aparecem têm quantidade 0 e ficam de fora
+    quantidade = chaves.value_counts()
+    agregados = {'quantidade': _ordenar_quantidade(quantidade[quantidade > 0].items())}
+    for coluna in valores.columns:
+        if coluna in MEDIDAS:
+            agregados[coluna] = {
+                'soma': agrupado[coluna].sum().to_dict(),
+                'media': agrupado[coluna].mean().dropna().to_dict(),
+                'contagem': agrupado[coluna].count().to_dict(),
+            }
+        else:
+            agregados[coluna] = agrupado[coluna].sum().astype(int).to_dict()
+    return agregados
+
+
+# Trocar, numa dimensão do cubo anterior, os grupos das chaves alteradas pelos recalculados
+# Chaves que sumiram dos dados simplesmente não voltam do cálculo parcial
+def _mesclar(anterior, parcial, chaves):
+    def juntar(antigos, novos, quantidade=False):
+        itens = {chave: valor for chave, valor in antigos.items() if chave not in chaves}
+        itens.update(novos)
+        return _ordenar_quantidade(itens.items()) if quantidade else dict(sorted(itens.items()))
+
+    mesclado = {'quantidade': juntar(anterior['quantidade'], parcial['quantidade'], quantidade=True)}
+    for coluna, novos in parcial.items():
+        if coluna == 'quantidade':
+            continue
+        if coluna in MEDIDAS:
+            mesclado[coluna] = {nome: juntar(anterior[coluna][nome], novos[nome]) for nome in novos}
+        else:
+            mesclado[coluna] = juntar(anterior[coluna], novos)
+    return mesclado
+
+
+# Da mais frequente para a menos frequente e, nos empates, pela chave (o value_counts não
+# garante a ordem dos empates)
+def _ordenar_quantidade(itens):
+    return dict(sorted(itens, key=lambda item: (-item[1], item[0])))
+
+
+def _nativo(valor):
+    return None if pd.isna(valor) else float(valor)
@@ -0,0 +1,131 @@
+# delta.py
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.carteira import Carteira
+from app.cubo import DIMENSOES, atualizar_cubo
+from app.ingestao import normalizar_bloco, finalizar_dados
+from app.leitura_planilha import LINHAS_POR_BLOCO, ler_blocos, impressoes_linhas, ajustar_tipos
+
+# Coluna que identifica o processo: classifica as linhas que mudaram em inseridas, alteradas e removidas
+COLUNA_CHAVE = 'Número CNJ'
+
+
+# Função para montar a carteira de uma exportação nova a partir da carteira atual
+# As exportações são sempre completas, mas de um dia para o outro quase todas as linhas se repetem:
+# - cada linha bruta é comparada pela impressão digital (app/leitura_planilha.py) com as da
+#   carteira anterior; as iguais reaproveitam a linha já normalizada e só as demais passam por
+#   normalizar_bloco (moeda, datas e textos, a parte cara da carga)
+# - o cubo recalcula só os grupos das chaves tocadas pelas linhas inseridas, alteradas ou
+#   removidas, e o índice de nomes reaproveita os termos das partes que já existiam
+# - as respostas em cache cujas dependências não mudaram continuam valendo (Carteira.impressao)
+# O resultado é o mesmo da carga completa: mesmas linhas, na ordem da exportação nova
+# A planilha continua sendo lida inteira (em blocos), porque a exportação não diz o que mudou
+def atualizar_carteira(anterior, caminho, versao, origem=None, progresso=None):
+    inicio = time.perf_counter()
+
+    # Impressão -> posições ainda livres na carteira anterior (a mesma linha pode se repetir)
+    # (listas de trás para frente: pop() entrega a primeira posição ainda livre)
+    disponiveis = {}
+    impressoes_anteriores = anterior.impressoes_linhas.tolist()
+    for posicao in range(len(impressoes_anteriores) - 1, -1, -1):
+        disponiveis.setdefault(impressoes_anteriores[posicao], []).append(posicao)
+
+    impressoes, reaproveitadas, destinos, novas, linhas = [], [], [], [], 0
+    pendentes = {}  # Tipos das colunas do bloco -> linhas brutas que mudaram, ainda não normalizadas
+    for bloco, fracao in ler_blocos(caminho):
+        impressoes_bloco = impressoes_linhas(bloco)
+        posicoes = np.array([
+            disponiveis[impressao].pop() if disponiveis.get(impressao) else -1
+            for impressao in impressoes_bloco.tolist()
+        ], dtype=np.int64)
+        iguais = posicoes >= 0
+        reaproveitadas.append(posicoes[iguais])
+        destinos.append(linhas + np.flatnonzero(iguais))
+        if not iguais.all():
+            # As linhas que mudaram são normalizadas juntas (poucas por bloco, e normalizar_bloco
+            # custa quase o mesmo para 5 ou 5000 linhas), separadas pelos tipos que o leitor deu às
+            # colunas, que decidem a normalização como na carga completa
+            mudaram = bloco[~iguais]
+            mudaram.index = linhas + np.flatnonzero(~iguais)
+            tipos = tuple(mudaram.dtypes)
+            pendentes.setdefault(tipos, []).append(mudaram)
+            if sum(map(len, pendentes[tipos])) >= LINHAS_POR_BLOCO:
+                novas.append(_normalizar(pendentes.pop(tipos)))
+        impressoes.append(impressoes_bloco)
+        linhas += len(bloco)
+        if progresso:
+            progresso(fracao, linhas)
+    if not impressoes:
+        raise ValueError("A planilha não tem cabeçalho")
+    novas.extend(_normalizar(partes) for partes in pendentes.values())
+
+    reaproveitadas, destinos = np.concatenate(reaproveitadas), np.concatenate(destinos)
+    removidas = np.setdiff1d(np.arange(len(anterior.dados)), reaproveitadas)
+
+    # Linhas reaproveitadas voltam ao estado anterior às categorias; as colunas derivadas e as
+    # categorias são refeitas sobre o conjunto, como na carga completa (finalizar_dados)
+    partes = []
+    if len(reaproveitadas):
+        mantidas = anterior.dados.iloc[reaproveitadas].copy()
+        for coluna in mantidas.columns:
+            if isinstance(mantidas[coluna].dtype, pd.CategoricalDtype):
+                mantidas[coluna] = mantidas[coluna].astype(object)
+        mantidas.index = destinos
+        partes.append(mantidas)
+    partes.extend(novas)
+    dados = pd.concat(partes).sort_index() if len(partes) > 1 else partes[0]
+    dados = finalizar_dados(ajustar_tipos(dados.reset_index(drop=True)))
+
+    posicoes_novas = np.concatenate([parte.index.to_numpy() for parte in novas]) if novas else np.array([], dtype=np.int64)
+    linhas_novas = dados.iloc[posicoes_novas]
+    linhas_removidas = anterior.dados.iloc[removidas]
+
+    # Sem nenhuma linha reaproveitada (cabeçalho mudou, outro formato) o cubo é montado do zero
+    if len(reaproveitadas):
+        chaves_alteradas = {
+            dimensao: _chaves(linhas_novas, dimensao) | _chaves(linhas_removidas, dimensao)
+            for dimensao in DIMENSOES
+        }
+        cubo = atualizar_cubo(anterior.cubo, dados, chaves_alteradas)
+    else:
+        cubo = None
+
+    carteira = Carteira(dados, versao, origem or caminho, np.concatenate(impressoes), cubo=cubo, anterior=anterior)
+    carteira.alteracoes = {
+        **_classificar(anterior.dados, dados, linhas_novas, linhas_removidas),
+        "linhas": len(dados),
+        "linhas_reaproveitadas": len(reaproveitadas),
+        "linhas_normalizadas": len(posicoes_novas),
+        "linhas_descartadas": len(removidas),
+        "duracao_s": round(time.perf_counter() - inicio, 3),
+    }
+    logging.info(f"Carga incremental de {caminho}: {carteira.alteracoes}")
+    return carteira
+
+
+def _normalizar(partes):
+    return normalizar_bloco(pd.concat(partes) if len(partes) > 1 else partes[0])
+
+
+# Processos inseridos, alterados e removidos, pelo Número CNJ: um número das linhas que mudaram
+# que existe antes e depois foi alterado
+def _classificar(dados_anteriores, dados, linhas_novas, linhas_removidas):
+    if COLUNA_CHAVE not in dados.columns or COLUNA_CHAVE not in dados_anteriores.columns:
+        return {"inseridos": len(linhas_novas), "alterados": 0, "removidos": len(linhas_removidas)}
+    antes, depois = set(dados_anteriores[COLUNA_CHAVE].dropna()), set(dados[COLUNA_CHAVE].dropna())
+    entraram, sairam = set(linhas_novas[COLUNA_CHAVE].dropna()), set(linhas_removidas[COLUNA_CHAVE].dropna())
+    return {
+        "inseridos": len(entraram - antes),
+        "alterados": len((entraram | sairam) & antes & depois),
+        "removidos": len(sairam - depois),
+    }
+
+
+def _chaves(linhas, dimensao):
+    if dimensao not in linhas.columns:
+        return set()
+    return set(linhas[dimensao].dropna().unique())
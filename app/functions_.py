@@ -11,38 +11,45 @@ except locale.Error:
     locale.setlocale(locale.LC_ALL, '')  # Ajuste para o sistema onde está rodando, pode ser necessário instalar o locale 'pt_BR'
 
 
+# Quantidade máxima de processos listados no texto da resposta (o gráfico recebe todos)
+LIMITE_PROCESSOS_TEXTO = 10
+
+
 # Função para processar o status do caso ou processo de um autor específico
-def processar_status_autor(pergunta, dataframe):
-    pergunta_lower = pergunta.lower().strip()
-    # Extração do nome do autor da pergunta (assumindo nome completo)
-    palavras_pergunta = pergunta_lower.split()
-    nome_autor = None
-    
-    # Procurar o nome e sobrenome dentro da pergunta
-    for i in range(len(palavras_pergunta) - 1):
-        possivel_nome = f"{palavras_pergunta[i]} {palavras_pergunta[i + 1]}"
-        if dataframe['Envolvidos - Polo Ativo'].str.contains(possivel_nome, case=False).any():
-            nome_autor = possivel_nome
-            break
-
-    if nome_autor:
-        # Filtrar o dataframe para o nome do autor e buscar o status correspondente
-        status_autor = dataframe[dataframe['Envolvidos - Polo Ativo'].str.contains(nome_autor, case=False)]
-        
-        if not status_autor.empty:
-            return f"O status do processo do {nome_autor} é: {status_autor['Status'].values[0]}", {}
-        else:
-            return f"Não foi encontrado nenhum processo ou caso relacionado ao autor {nome_autor}.", {}
-    else:
+def processar_status_autor(indice, pergunta):
+    # Procurar o nome (ao menos nome e sobrenome) no índice de partes do polo ativo
+    termos, posicoes = indice.encontrar_nome(pergunta)
+
+    if not termos:
         return "Por favor, forneça o nome completo (nome e sobrenome) do autor para que possamos identificar o caso corretamente.", {}
 
+    nome_autor = " ".join(termos).title()
+    processos = indice.dados.iloc[posicoes]
+    status_por_processo = {
+        numero: str(status).capitalize()
+        for numero, status in zip(processos['Número CNJ'], processos['Status'])
+    }
+
+    if len(status_por_processo) == 1:
+        numero, status = next(iter(status_por_processo.items()))
+        return f"O status do processo de {nome_autor} ({numero}) é: {status}", {
+            "processos": status_por_processo
+        }
 
-def processar_nao_citados(dataframe):
-    # Contar processos que ainda não têm data de citação (processos não citados)
-    processos_nao_citados = dataframe[dataframe['Data de citação'].isna()].shape[0]
-    
-    # Contar processos que já foram citados
-    processos_citados = dataframe[dataframe['Data de citação'].notna()].shape[0]
+    linhas = [f"{numero}: {status}" for numero, status in list(status_por_processo.items())[:LIMITE_PROCESSOS_TEXTO]]
+    if len(status_por_processo) > LIMITE_PROCESSOS_TEXTO:
+        linhas.append(f"e mais {len(status_por_processo) - LIMITE_PROCESSOS_TEXTO} processos")
+    return f"Foram encontrados {len(status_por_processo)} processos de {nome_autor}: " + "; ".join(linhas) + ".", {
+        "processos": status_por_processo
+    }
+
+
+def processar_nao_citados(cubo):
+    # Contar processos que já foram citados (com data de citação preenchida)
+    processos_citados = cubo['total']['Data de citação']
+
+    # Os demais ainda não foram citados
+    processos_nao_citados = cubo['total']['quantidade'] - processos_citados
     
     # Retornar o texto da resposta e os dados para o gráfico
     return f"Atualmente, há {processos_nao_citados} processos que ainda não foram citados.", {
@@ -62,9 +69,9 @@ def processar_nao_julgados(dataframe):
         "nao_julgados": quantidade_nao_julgados
     }
 
-def processar_divisao_por_rito(dataframe):
+def processar_divisao_por_rito(cubo):
     # Contar a quantidade de processos por tipo de Rito
-    ritos = dataframe['Rito'].str.lower().value_counts().to_dict()
+    ritos = cubo['Rito']['quantidade']
 
     # Preparar o texto de resposta com os valores de cada rito
     ritos_texto = ", ".join([f"{rito.capitalize()}: {quantidade}" for rito, quantidade in ritos.items()])
@@ -78,47 +85,35 @@ def processar_divisao_por_rito(dataframe):
     }
 
 def processar_maior_tempo_sem_movimentacao(dataframe):
-    # Converter as colunas 'Data de distribuição' e 'Última mov.' para o formato datetime
-    dataframe['Data de distribuição'] = pd.to_datetime(dataframe['Data de distribuição'], format='%d/%m/%Y', errors='coerce')
-    dataframe['Última mov.'] = pd.to_datetime(dataframe['Última mov.'], format='%d/%m/%Y', errors='coerce')
-
-    # Calcular a diferença de dias entre 'Última mov.' e 'Data de distribuição'
-    dataframe['Dias sem movimentação'] = (dataframe['Última mov.'] - dataframe['Data de distribuição']).dt.days
-
-    # Identificar o processo com maior tempo sem movimentação
-    processo_maior_tempo = dataframe.loc[dataframe['Dias sem movimentação'].idxmax()]
-
-    # Extrair os dados do processo
-    numero_processo = processo_maior_tempo['Número CNJ']
-    dias_sem_movimentacao = processo_maior_tempo['Dias sem movimentação']
-
+    # 'Duração' (dias entre 'Data de distribuição' e 'Última mov.') é calculada na carga
     # Selecionar os 4 processos com maior tempo sem movimentação
-    top_4_processos = dataframe[['Número CNJ', 'Dias sem movimentação']].sort_values(by='Dias sem movimentação', ascending=False).head(4)
+    top_4_processos = dataframe.nlargest(4, 'Duração')[['Número CNJ', 'Duração']]
+
+    # Extrair os dados do processo com maior tempo sem movimentação
+    numero_processo = top_4_processos['Número CNJ'].iloc[0]
+    dias_sem_movimentacao = top_4_processos['Duração'].iloc[0]
 
     # Preparar os dados para o gráfico
-    dados_grafico = top_4_processos.set_index('Número CNJ').to_dict()['Dias sem movimentação']
+    dados_grafico = top_4_processos.set_index('Número CNJ')['Duração'].to_dict()
 
     # Retornar a resposta e os dados para o gráfico
-    return f"O processo com maior tempo sem movimentação é o número {numero_processo}, com {dias_sem_movimentacao} dias sem movimentação.", {
+    return f"O processo com maior tempo sem movimentação é o número {numero_processo}, com {dias_sem_movimentacao:.0f} dias sem movimentação.", {
         "processos": dados_grafico
     }
 
 
 
-def processar_sentencas_extinto_sem_custos(dataframe):
-    # Converter a coluna 'Resultado da Sentença' para minúsculas para garantir consistência
-    dataframe['Resultado da Sentença'] = dataframe['Resultado da Sentença'].str.lower()
+def processar_sentencas_extinto_sem_custos(cubo):
+    # Contar todos os tipos de sentenças para o gráfico
+    sentencas_contagem = cubo['Resultado da Sentença']['quantidade']
 
     # Contar a quantidade de processos extintos sem custos
-    extincao_sem_resolucao = dataframe[dataframe['Resultado da Sentença'] == 'sentenca de extincao sem resolucao do merito'].shape[0]
-    improcedentes = dataframe[dataframe['Resultado da Sentença'] == 'sentenca improcedente'].shape[0]
+    extincao_sem_resolucao = sentencas_contagem.get('sentenca de extincao sem resolucao do merito', 0)
+    improcedentes = sentencas_contagem.get('sentenca improcedente', 0)
 
     # Soma dos processos sem custos
     total_extinto_sem_custos = extincao_sem_resolucao + improcedentes
 
-    # Contar todos os tipos de sentenças para o gráfico
-    sentencas_contagem = dataframe['Resultado da Sentença'].value_counts().to_dict()
-
     # Abreviações das sentenças para o gráfico
     abreviacoes_sentencas = {
         "sentenca improcedente": "Improcedente",
@@ -136,15 +131,12 @@ def processar_sentencas_extinto_sem_custos(dataframe):
     }
 
 
-def processar_sentencas_improcedentes(dataframe):
-    # Converter a coluna 'Resultado da Sentença' para minúsculas para garantir consistência
-    dataframe['Resultado da Sentença'] = dataframe['Resultado da Sentença'].str.lower()
+def processar_sentencas_improcedentes(cubo):
+    # Contar todos os tipos de sentenças para o gráfico
+    sentencas_contagem = cubo['Resultado da Sentença']['quantidade']
 
     # Contar a quantidade de sentenças improcedentes
-    quantidade_improcedentes = dataframe[dataframe['Resultado da Sentença'] == 'sentenca improcedente'].shape[0]
-
-    # Contar todos os tipos de sentenças para o gráfico
-    sentencas_contagem = dataframe['Resultado da Sentença'].value_counts().to_dict()
+    quantidade_improcedentes = sentencas_contagem.get('sentenca improcedente', 0)
 
     # Abreviações das sentenças para o gráfico
     abreviacoes_sentencas = {
@@ -162,15 +154,12 @@ def processar_sentencas_improcedentes(dataframe):
         "sentencas": sentencas_abreviadas
     }
     
-def processar_sentencas_procedentes(dataframe):
-    # Converter a coluna 'Resultado da Sentença' para minúsculas para garantir consistência
-    dataframe['Resultado da Sentença'] = dataframe['Resultado da Sentença'].str.lower()
-
-    # Contar a quantidade de sentenças improcedentes
-    quantidade_improcedentes = dataframe[dataframe['Resultado da Sentença'] == 'sentenca parcialmente procedente'].shape[0]
-
+def processar_sentencas_procedentes(cubo):
     # Contar todos os tipos de sentenças para o gráfico
-    sentencas_contagem = dataframe['Resultado da Sentença'].value_counts().to_dict()
+    sentencas_contagem = cubo['Resultado da Sentença']['quantidade']
+
+    # Contar a quantidade de sentenças procedentes
+    quantidade_improcedentes = sentencas_contagem.get('sentenca parcialmente procedente', 0)
 
     # Abreviações das sentenças para o gráfico
     abreviacoes_sentencas = {
@@ -189,26 +178,13 @@ def processar_sentencas_procedentes(dataframe):
     }
 
 
-def processar_media_duracao_por_estado(dataframe):
-    # Converter as colunas 'Última mov.' e 'Data de distribuição' para datetime, corrigindo o formato
-    dataframe['Última mov.'] = pd.to_datetime(dataframe['Última mov.'], format='%d/%m/%Y', errors='coerce')
-    dataframe['Data de distribuição'] = pd.to_datetime(dataframe['Data de distribuição'], format='%d/%m/%Y', errors='coerce')
-
-    # Calcular a duração do processo (diferença entre 'Última mov.' e 'Data de distribuição')
-    dataframe['Duração'] = (dataframe['Última mov.'] - dataframe['Data de distribuição']).dt.days
-
-    # Remover valores de duração inválidos (NaN)
-    dataframe = dataframe.dropna(subset=['Duração'])
-
-    # Verificar se há dados suficientes para continuar
-    if dataframe.empty:
+def processar_media_duracao_por_estado(cubo):
+    # Verificar se há dados suficientes para continuar (duração = 'Última mov.' - 'Data de distribuição')
+    if not cubo['total']['Duração']['contagem']:
         return "Não há dados suficientes para calcular a média de duração por estado.", {}
 
-    # Extrair o estado da coluna 'Foro'
-    dataframe['Estado'] = dataframe['Foro'].str.split('-').str[-1].str.strip()
-
-    # Calcular a média de duração por estado
-    media_duracao_por_estado = dataframe.groupby('Estado')['Duração'].mean().to_dict()
+    # Média de duração por estado (UF extraída da coluna 'Foro'), pré-calculada no cubo
+    media_duracao_por_estado = cubo['Estado']['Duração']['media']
 
     if not media_duracao_por_estado:
         return "Não foi possível calcular a média de duração por estado.", {}
@@ -223,26 +199,13 @@ def processar_media_duracao_por_estado(dataframe):
         "media_duracao_por_estado": media_duracao_por_estado
     }
 
-def processar_media_duracao_por_comarca(dataframe):
-    # Converter as colunas 'Última mov.' e 'Data de distribuição' para datetime, corrigindo o formato
-    dataframe['Última mov.'] = pd.to_datetime(dataframe['Última mov.'], format='%d/%m/%Y', errors='coerce')
-    dataframe['Data de distribuição'] = pd.to_datetime(dataframe['Data de distribuição'], format='%d/%m/%Y', errors='coerce')
-
-    # Calcular a duração do processo (diferença entre 'Última mov.' e 'Data de distribuição')
-    dataframe['Duração'] = (dataframe['Última mov.'] - dataframe['Data de distribuição']).dt.days
-
-    # Remover valores de duração inválidos (NaN)
-    dataframe = dataframe.dropna(subset=['Duração'])
-
-    # Verificar se há dados suficientes para continuar
-    if dataframe.empty:
+def processar_media_duracao_por_comarca(cubo):
+    # Verificar se há dados suficientes para continuar (duração = 'Última mov.' - 'Data de distribuição')
+    if not cubo['total']['Duração']['contagem']:
         return "Não há dados suficientes para calcular a média de duração por comarca.", {}
 
-    # Extrair o município (comarca) da coluna 'Foro'
-    dataframe['Comarca'] = dataframe['Foro'].str.split('-').str[0].str.strip()
-
-    # Calcular a média de duração por comarca
-    media_duracao_por_comarca = dataframe.groupby('Comarca')['Duração'].mean().to_dict()
+    # Média de duração por comarca (extrair_comarca da coluna 'Foro'), pré-calculada no cubo
+    media_duracao_por_comarca = cubo['Comarca']['Duração']['media']
 
     if not media_duracao_por_comarca:
         return "Não foi possível calcular a média de duração por comarca.", {}
@@ -258,22 +221,15 @@ def processar_media_duracao_por_comarca(dataframe):
 
 def processar_media_duracao_processos_arquivados(dataframe):
     # Filtrar os processos arquivados
-    processos_arquivados = dataframe[dataframe['Status'].str.lower() == 'arquivado']
+    processos_arquivados = dataframe[dataframe['Status'] == 'arquivado']
 
-    # Garantir que as colunas de data estejam no formato correto e tratar valores inválidos
-    processos_arquivados['Última mov.'] = pd.to_datetime(processos_arquivados['Última mov.'], format='%d/%m/%Y', errors='coerce')
-    processos_arquivados['Data de distribuição'] = pd.to_datetime(processos_arquivados['Data de distribuição'], format='%d/%m/%Y', errors='coerce')
-
-    # Remover linhas onde uma das datas é inválida (NaT)
-    processos_arquivados = processos_arquivados.dropna(subset=['Última mov.', 'Data de distribuição'])
+    # Remover linhas onde uma das datas é inválida (duração calculada na carga fica NaN)
+    processos_arquivados = processos_arquivados.dropna(subset=['Duração'])
 
     # Verificar se há processos suficientes para calcular a duração
     if processos_arquivados.empty:
         return "Não foi possível calcular a média de duração dos processos arquivados.", {}
 
-    # Calcular a duração (diferença em dias entre Última mov. e Data de distribuição)
-    processos_arquivados['Duração'] = (processos_arquivados['Última mov.'] - processos_arquivados['Data de distribuição']).dt.days
-
     # Calcular a média da duração
     media_duracao = processos_arquivados['Duração'].mean()
 
@@ -286,58 +242,39 @@ def processar_media_duracao_processos_arquivados(dataframe):
 
 def extrair_comarca(foro):
     """Função para extrair o município (comarca) da coluna 'Foro'."""
+    if not isinstance(foro, str):
+        return foro  # Foro vazio (NaN) na exportação
     match = re.match(r"^(.+?)\s*-\s*[A-Z]{2}", foro)
     if match:
         return match.group(1).strip()  # Retorna o nome do município (comarca)
     return foro  # Caso não encontre o formato esperado, retorna o valor original
 
-def processar_comarca_mais_preocupante(dataframe):
-    # Extrair a comarca (município) da coluna 'Foro'
-    dataframe['Comarca'] = dataframe['Foro'].apply(extrair_comarca)
-
-    # Verificar se a coluna 'Total deferido' contém valores não-string e converter para string se necessário
-    dataframe['Total deferido'] = dataframe['Total deferido'].apply(lambda x: str(x) if pd.notnull(x) else x)
-
-    # Limpar e converter a coluna 'Total deferido' para float, tratando os valores corretamente
-    dataframe['Total deferido'] = pd.to_numeric(
-        dataframe['Total deferido']
-        .str.replace('R$', '', regex=False)
-        .str.replace('.', '', regex=False)
-        .str.replace(',', '.', regex=False),
-        errors='coerce'
-    )
-
-    # Agrupar por comarca e somar os valores de condenação
-    valor_condenacao_por_comarca = dataframe.groupby('Comarca')['Total deferido'].sum()
+def processar_comarca_mais_preocupante(cubo):
+    # Soma dos valores de condenação por comarca (extraída da coluna 'Foro')
+    valor_condenacao_por_comarca = cubo['Comarca']['Total deferido']['soma']
 
     # Verificar qual comarca tem o maior valor de condenação
-    comarca_mais_preocupante = valor_condenacao_por_comarca.idxmax()
-    maior_valor = valor_condenacao_por_comarca.max()
+    comarca_mais_preocupante = max(valor_condenacao_por_comarca, key=valor_condenacao_por_comarca.get)
+    maior_valor = valor_condenacao_por_comarca[comarca_mais_preocupante]
 
-    # Converter os dados para um formato gráfico
-    dados_grafico = valor_condenacao_por_comarca.to_dict()
+    # Os dados já estão no formato do gráfico
+    dados_grafico = valor_condenacao_por_comarca
 
     # Retornar a resposta e os dados do gráfico
     return f"A comarca com o maior valor de condenação é {comarca_mais_preocupante}, com um total de R$ {maior_valor:,.2f}.", {
         "valor_condenacao_por_comarca": dados_grafico  # Dados para o gráfico
     }
 
-def processar_estado_mais_ofensor(dataframe):
-    # Garantir que todos os valores na coluna 'Total deferido' sejam strings antes de aplicar as substituições
-    dataframe['Total deferido'] = dataframe['Total deferido'].astype(str).str.replace('R$', '', regex=False).str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
-
-    # Converter para float
-    dataframe['Total deferido'] = pd.to_numeric(dataframe['Total deferido'], errors='coerce')
-
-    # Agrupar por estado (Foro) e somar os valores de condenação
-    valor_condenacao_por_estado = dataframe.groupby('Foro')['Total deferido'].sum()
+def processar_estado_mais_ofensor(cubo):
+    # Soma dos valores de condenação por estado (Foro)
+    valor_condenacao_por_estado = cubo['Foro']['Total deferido']['soma']
 
     # Verificar qual estado tem o maior valor de condenação
-    estado_mais_preocupante = valor_condenacao_por_estado.idxmax()
-    maior_valor = valor_condenacao_por_estado.max()
+    estado_mais_preocupante = max(valor_condenacao_por_estado, key=valor_condenacao_por_estado.get)
+    maior_valor = valor_condenacao_por_estado[estado_mais_preocupante]
 
-    # Converter os dados para um formato gráfico
-    dados_grafico = valor_condenacao_por_estado.to_dict()
+    # Os dados já estão no formato do gráfico
+    dados_grafico = valor_condenacao_por_estado
 
     return f"O estado com o maior valor de condenação é {estado_mais_preocupante}, com um total de R$ {maior_valor:,.2f}.", {
         "valor_condenacao_por_estado": dados_grafico  # Dados para o gráfico
@@ -345,9 +282,6 @@ def processar_estado_mais_ofensor(dataframe):
 
 
 def processar_reclamantes_multiplos(dataframe):
-    # Remover qualquer tipo de espaço antes e depois dos nomes
-    dataframe['Envolvidos - Polo Ativo'] = dataframe['Envolvidos - Polo Ativo'].str.strip()
-
     # Contar quantos processos cada reclamante tem
     reclamantes = dataframe['Envolvidos - Polo Ativo'].value_counts()
 
@@ -362,9 +296,9 @@ def processar_reclamantes_multiplos(dataframe):
     else:
         return "Nenhum reclamante tem mais de um processo.", {}
     
-def processar_rito(dataframe):
+def processar_rito(cubo):
     # Contar a quantidade de processos por tipo de rito
-    ritos = dataframe['Rito'].str.lower().value_counts().to_dict()
+    ritos = cubo['Rito']['quantidade']
 
     # Verificar quantos processos estão no rito sumaríssimo
     quantidade_sumarissimo = ritos.get('sumaríssimo', 0)  # A contagem de "Sumaríssimo" no dataframe
@@ -377,7 +311,9 @@ def processar_tribunal_acoes_convenções(dataframe):
     convenções = dataframe[dataframe['Assuntos'].str.contains('Acordo e Convenção Coletivos de Trabalho', case=False, na=False)]
     
     # Contar os tribunais (coluna Órgão) associados a essas ações
-    tribunais = convenções['Órgão'].value_counts().to_dict()
+    # 'Órgão' é categórica: value_counts lista também os órgãos sem nenhuma ação no filtro
+    contagem = convenções['Órgão'].value_counts()
+    tribunais = contagem[contagem > 0].to_dict()
 
     # Verificar qual tribunal tem mais ações
     if tribunais:
@@ -391,9 +327,9 @@ def processar_tribunal_acoes_convenções(dataframe):
 
 
 # Função para processar os assuntos mais recorrentes
-def processar_assuntos_recorrentes(dataframe):
+def processar_assuntos_recorrentes(cubo):
     # Contar a frequência dos assuntos na coluna "Assuntos"
-    assuntos = dataframe['Assuntos'].str.lower().value_counts().to_dict()
+    assuntos = cubo['Assuntos']['quantidade']
 
     # Abreviar os nomes dos assuntos
     assuntos_abreviados = {abreviar_assuntos(assunto): quantidade for assunto, quantidade in assuntos.items()}
@@ -424,9 +360,6 @@ def abreviar_assuntos(assunto):
     return abreviacoes.get(assunto.lower(), assunto)  # Retorna a abreviação se houver, caso contrário retorna o original
 # Função para processar a quantidade de recursos interpostos
 def processar_quantidade_recursos(dataframe):
-    # Remover espaços extras e converter para minúsculas para evitar problemas de formatação
-    dataframe['Tipo de Recurso'] = dataframe['Tipo de Recurso'].str.strip().str.lower()
-
     # Contar os processos com recursos (diferentes de '-')
     recursos_interpostos = dataframe[dataframe['Tipo de Recurso'] != '-'].shape[0]
 
@@ -439,9 +372,9 @@ def processar_quantidade_recursos(dataframe):
         "sem_recursos": sem_recursos
     }
 
-def processar_quantidade_processos_por_estado(dataframe):
-    # Agrupar os processos por estado (coluna 'Foro') e contar a quantidade de processos por estado
-    processos_por_estado = dataframe['Foro'].value_counts().to_dict()
+def processar_quantidade_processos_por_estado(cubo):
+    # Quantidade de processos por estado (coluna 'Foro')
+    processos_por_estado = cubo['Foro']['quantidade']
 
     # Preparar a resposta textual
     estados_texto = ", ".join([f"{estado}: {quantidade}" for estado, quantidade in processos_por_estado.items()])
@@ -454,13 +387,13 @@ def processar_quantidade_processos_por_estado(dataframe):
 
     return resposta, grafico_data
 # Função para contagem de numero de processo ,e separa por ativos e arquivados
-def processar_quantidade_processos(dataframe):
-    # Contar a quantidade total de processos
-    total_processos = int(dataframe['Número CNJ'].count())
+def processar_quantidade_processos(cubo):
+    # Contar a quantidade total de processos (com Número CNJ preenchido)
+    total_processos = cubo['total']['Número CNJ']
 
     # Contar os processos ativos e arquivados
-    processos_ativos = int(dataframe[dataframe['Status'].str.lower() == 'ativo']['Número CNJ'].count())
-    processos_arquivados = int(dataframe[dataframe['Status'].str.lower() == 'arquivado']['Número CNJ'].count())
+    processos_ativos = cubo['Status']['Número CNJ'].get('ativo', 0)
+    processos_arquivados = cubo['Status']['Número CNJ'].get('arquivado', 0)
 
     # Retornar a resposta e os dados do gráfico
     return f"Há um total de {total_processos} processos. Destes, {processos_ativos} são ativos e {processos_arquivados} estão arquivados.", {
@@ -470,8 +403,8 @@ def processar_quantidade_processos(dataframe):
 
 # Função auxiliar para processar perguntas sobre "Data de Trânsito em Julgado"
 def processar_transito_julgado(dataframe):
-    # Verificar quais células da coluna 'Data de Trânsito em Julgado' têm data e quais estão vazias
-    transitado = dataframe['Data de Trânsito em Julgado'].notna() & dataframe['Data de Trânsito em Julgado'].apply(lambda x: str(x).strip() != '-')
+    # Verificar quais células da coluna 'Data de Trânsito em Julgado' têm data (o '-' da exportação vira NaT na carga)
+    transitado = dataframe['Data de Trânsito em Julgado'].notna()
     processos_transitados = int(transitado.sum())  # Converte para tipo int nativo
     processos_nao_transitados = int((~transitado).sum())  # Converte para tipo int nativo
 
@@ -482,8 +415,8 @@ def processar_transito_julgado(dataframe):
     }
 
 # Função auxiliar para processar perguntas sobre "Resultado da Sentença"
-def processar_sentenca(dataframe, pergunta):
-    sentencas = dataframe['Resultado da Sentença'].str.lower().value_counts().to_dict()
+def processar_sentenca(cubo, pergunta):
+    sentencas = cubo['Resultado da Sentença']['quantidade']
 
     # Dicionário de abreviações para as sentenças
     abreviacoes_sentencas = {
@@ -525,22 +458,13 @@ def processar_sentenca(dataframe, pergunta):
     }
 
 # Função para processar o valor total da causa
-def processar_valor_total_causa(dataframe):
-    # Converter a coluna 'Total da causa' para string e depois para valores numéricos (removendo símbolos de moeda e ajustando formatação)
-    dataframe['Total da causa'] = pd.to_numeric(
-        dataframe['Total da causa']
-        .astype(str)  # Converte todos os valores da coluna para string
-        .str.replace('R$', '', regex=False)
-        .str.replace('.', '', regex=False)
-        .str.replace(',', '.', regex=False), errors='coerce'
-    )
-
+def processar_valor_total_causa(cubo):
     # Somar o valor total da causa para todos os processos
-    valor_total_causa = dataframe['Total da causa'].sum()
+    valor_total_causa = cubo['total']['Total da causa']['soma']
 
     # Dividir o total por status (ativo e arquivado)
-    total_ativos = dataframe[dataframe['Status'].str.lower() == 'ativo']['Total da causa'].sum()
-    total_arquivados = dataframe[dataframe['Status'].str.lower() == 'arquivado']['Total da causa'].sum()
+    total_ativos = cubo['Status']['Total da causa']['soma'].get('ativo', 0.0)
+    total_arquivados = cubo['Status']['Total da causa']['soma'].get('arquivado', 0.0)
 
     # Formatar os valores no padrão brasileiro
     valor_total_causa_formatado = f"{valor_total_causa:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
@@ -560,67 +484,42 @@ def processar_valor_total_causa(dataframe):
 
 
 
-def processar_media_valor_causa_por_estado(dataframe):
-    # Verificar se a coluna "Total da causa" é do tipo string e, se não for, converter para string
-    if dataframe['Total da causa'].dtype != 'object':
-        dataframe['Total da causa'] = dataframe['Total da causa'].astype(str)
-
-    # Limpar e converter os valores na coluna "Total da causa"
-    dataframe['Total da causa'] = pd.to_numeric(
-        dataframe['Total da causa']
-        .str.replace('R$', '', regex=False)
-        .str.replace('.', '', regex=False)
-        .str.replace(',', '.', regex=False),
-        errors='coerce'
-    )
-    
-    # Agrupar por estado (coluna Foro) e calcular a média
-    media_valor_por_estado = dataframe.groupby('Foro')['Total da causa'].mean().dropna()
+def processar_media_valor_causa_por_estado(cubo):
+    # Média do valor da causa por estado (coluna Foro)
+    media_valor_por_estado = cubo['Foro']['Total da causa']['media']
     
     # Encontrar o estado com a maior média
-    estado_maior_media = media_valor_por_estado.idxmax()
-    maior_media = media_valor_por_estado.max()
+    estado_maior_media = max(media_valor_por_estado, key=media_valor_por_estado.get)
+    maior_media = media_valor_por_estado[estado_maior_media]
 
     # Formatar a média no estilo brasileiro (R$ X.XXX.XXX,XX)
     resposta_texto = f"O estado com a maior média de valor de causa é {estado_maior_media} com uma média de R$ {maior_media:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
 
     # Retornar a resposta e os dados do gráfico
     return resposta_texto, {
-        "media_valor_causa_por_estado": media_valor_por_estado.to_dict()
+        "media_valor_causa_por_estado": media_valor_por_estado
     }
 
 
-def processar_maior_valor_causa_por_estado(dataframe):
-    # Converter a coluna 'Total da causa' para string, limpar e converter para float
-    dataframe['Total da causa'] = dataframe['Total da causa'].astype(str).str.replace('R$', '', regex=False).str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
-    
-    # Converter para numérico, tratando erros como NaN
-    dataframe['Total da causa'] = pd.to_numeric(dataframe['Total da causa'], errors='coerce')
-
-    # Agrupar por estado (coluna 'Foro') e somar os valores de 'Total da causa'
-    soma_por_estado = dataframe.groupby('Foro')['Total da causa'].sum()
+def processar_maior_valor_causa_por_estado(cubo):
+    # Soma dos valores de 'Total da causa' por estado (coluna 'Foro')
+    soma_por_estado = cubo['Foro']['Total da causa']['soma']
 
     # Encontrar o estado com o maior valor de causa
-    estado_com_maior_valor = soma_por_estado.idxmax()
-    maior_valor = soma_por_estado.max()
+    estado_com_maior_valor = max(soma_por_estado, key=soma_por_estado.get)
+    maior_valor = soma_por_estado[estado_com_maior_valor]
 
    # Criar a resposta textual, formatando o valor no estilo brasileiro (R$ X.XXX.XXX,XX)
     resposta_texto = f"O estado com o maior valor de causa é {estado_com_maior_valor}, com um total de R$ {maior_valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
     
     # Retornar os dados em um formato serializável para o gráfico
     return resposta_texto, {
-        "valor_causa_por_estado": soma_por_estado.to_dict()
+        "valor_causa_por_estado": soma_por_estado
     }
 
-def processar_valor_condenacao_por_estado(dataframe):
-    # Converter os valores da coluna 'Total deferido (condenação)' para string e remover 'R$', '.', e ',' para transformar em float
-    dataframe['Total deferido'] = dataframe['Total deferido'].astype(str).str.replace('R$', '', regex=False).str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
-
-    # Converter a coluna para valores numéricos, tratando os erros como NaN
-    dataframe['Total deferido'] = pd.to_numeric(dataframe['Total deferido'], errors='coerce')
-
-    # Agrupar por estado (coluna 'Foro') e somar os valores
-    soma_por_estado = dataframe.groupby('Foro')['Total deferido'].sum()
+def processar_valor_condenacao_por_estado(cubo):
+    # Soma dos valores de condenação por estado (coluna 'Foro')
+    soma_por_estado = cubo['Foro']['Total deferido']['soma']
     
 
      # Criar a resposta textual, formatando os valores no estilo brasileiro (R$ X.XXX,XX)
@@ -628,25 +527,25 @@ def processar_valor_condenacao_por_estado(dataframe):
     resposta_texto += "\n".join([f"{estado}: R$ {valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.') for estado, valor in soma_por_estado.items()])
     # Retornar os dados em um formato serializável para o gráfico
     return resposta_texto, {
-        "condenacao_por_estado": soma_por_estado.to_dict()  # Retorna um dicionário com os valores para o gráfico
+        "condenacao_por_estado": soma_por_estado  # Retorna um dicionário com os valores para o gráfico
     }
 
 
 # Função auxiliar para processar perguntas sobre status (ativos, arquivados, etc.)
-def processar_status(pergunta, dataframe, status):
+def processar_status(pergunta, cubo, status):
     status_lower = status.lower()
-    processos_status = dataframe[dataframe['Status'].str.lower() == status_lower]
-    quantidade = processos_status.shape[0]
+    quantidade_por_status = cubo['Status']['quantidade']
+    quantidade = quantidade_por_status.get(status_lower, 0)
     
     # Retornar a chave correta dependendo do status
     if status_lower == 'ativo':
         return f"Atualmente, há {quantidade} processos ativos.", {
             "ativos": quantidade,
-            "arquivados": dataframe[dataframe['Status'].str.lower() == 'arquivado'].shape[0]  # Adicionar arquivados para gráfico comparativo
+            "arquivados": quantidade_por_status.get('arquivado', 0)  # Adicionar arquivados para gráfico comparativo
         }
     elif status_lower == 'arquivado':
         return f"Atualmente, há {quantidade} processos arquivados/encerrados.", {
-            "ativos": dataframe[dataframe['Status'].str.lower() == 'ativo'].shape[0],  # Adicionar ativos para gráfico comparativo
+            "ativos": quantidade_por_status.get('ativo', 0),  # Adicionar ativos para gráfico comparativo
             "arquivados": quantidade
         }
     else:
@@ -662,9 +561,9 @@ def processar_orgao(dataframe):
         "orgaos": orgaos
     }
 
-def processar_fase(dataframe, pergunta=None):
-    # Converter a coluna 'Fase' para minúsculas para facilitar a comparação
-    fases = dataframe['Fase'].str.lower().value_counts().to_dict()
+def processar_fase(cubo, pergunta=None):
+    # A coluna 'Fase' já chega em minúsculas da carga
+    fases = cubo['Fase']['quantidade']
     
     # Se a pergunta não especifica uma fase particular, retorna todas as fases
     if not pergunta or "fase" in pergunta.lower():
@@ -696,9 +595,9 @@ def processar_fase(dataframe, pergunta=None):
         "fases": fases
     }
 # Função auxiliar para processar perguntas sobre "Resultado da Sentença"
-def processar_sentenca(dataframe, pergunta):
-    # Contar a ocorrência dos diferentes resultados de sentença, normalizando para lowercase
-    sentencas = dataframe['Resultado da Sentença'].str.lower().value_counts().to_dict()
+def processar_sentenca(cubo, pergunta):
+    # Contar a ocorrência dos diferentes resultados de sentença (pré-calculada no cubo)
+    sentencas = cubo['Resultado da Sentença']['quantidade']
 
     # Dicionário de abreviações para os resultados das sentenças
     abreviacoes_sentencas = {
@@ -721,20 +620,6 @@ def processar_sentenca(dataframe, pergunta):
     
 def processar_valor_acordo(dataframe):
     if 'Valor do acordo' in dataframe.columns:
-        # Garantir que todos os valores estão no formato de string
-        dataframe['Valor do acordo'] = dataframe['Valor do acordo'].astype(str)
-        
-        # Remover símbolos de moeda e converter valores para numéricos
-        dataframe['Valor do acordo'] = (
-            dataframe['Valor do acordo']
-            .str.replace('R$', '', regex=False)  # Remover o símbolo 'R$'
-            .str.replace('.', '', regex=False)   # Remover os pontos dos milhares
-            .str.replace(',', '.', regex=False)  # Substituir vírgula por ponto para decimal
-        )
-        
-        # Converter os valores da coluna para numéricos
-        dataframe['Valor do acordo'] = pd.to_numeric(dataframe['Valor do acordo'], errors='coerce')
-        
         # Somar os valores, ignorando os NaN
         valor_total_acordo = dataframe['Valor do acordo'].sum()
 
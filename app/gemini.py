@@ -0,0 +1,140 @@
+# gemini.py
+import logging
+import time
+from collections import deque
+from threading import Lock
+
+from app.cliente_gemini import obter_cliente
+from app.tokens import contador_tokens
+from config import ORCAMENTO_TOKENS_PROMPT
+
+
+MENSAGEM_ERRO_GEMINI = "Desculpe, ainda estou aprimorando minha base de conhecimento. Tente novamente em alguns instantes."
+
+INSTRUCOES = "Converse com o usuário de forma amigável e educada, sem incluir emojis."
+FRACAO_HISTORICO = 0.25    # Parte do orçamento que o histórico pode reservar antes do contexto
+TOKENS_ROTULOS = 20        # "Contexto da conversa:", "Dados do Excel:" e quebras de linha
+
+# Tamanho dos prompts enviados (exposto em /metricas); tokens_total usa a contagem da API
+# quando ela vem na resposta e a estimativa (app/tokens.py) quando não vem
+estatisticas_prompt = {
+    "chamadas": 0, "caracteres_total": 0, "tokens_total": 0, "tokens_estimados_total": 0,
+    "tokens_resposta_total": 0, "ultimo": None,
+}
+prompts_recentes = deque(maxlen=20)  # Métricas de tokens das últimas perguntas
+_trava_prompt = Lock()
+
+
+# Falha ao consultar o Gemini (cota, rede, tentativas esgotadas no ClienteGemini): a pergunta
+# termina com erro, então a desculpa (MENSAGEM_ERRO_GEMINI) não vai para o cache nem para o
+# histórico; cada rota mostra a mensagem a quem perguntou
+class ErroGemini(Exception):
+    pass
+
+
+# Função para montar o prompt de uma pergunta conversacional: (prompt, tokens estimados, detalhes)
+# historico: últimas trocas da conversa de quem perguntou (app/historico.py)
+# O prompt respeita o orçamento de tokens: pergunta e instruções sempre vão; o histórico reserva
+# até FRACAO_HISTORICO do restante, o contexto da carteira usa o resto e o histórico fica com o
+# que sobrar, descartando as mensagens mais antigas
+def montar_prompt(pergunta, contexto_carteira, historico=(), orcamento=ORCAMENTO_TOKENS_PROMPT):
+    fixo = contador_tokens.estimar(f"Pergunta atual: {pergunta}\n\n{INSTRUCOES}") + TOKENS_ROTULOS
+    restante = max(0, orcamento - fixo)
+    mensagens = [f"{msg['Usuário']}: {msg['TIAGO']}" for msg in historico]
+    custos = [contador_tokens.estimar(mensagem) + 1 for mensagem in mensagens]
+    reserva_historico = min(sum(custos), int(restante * FRACAO_HISTORICO))
+
+    # Apenas o resumo da carteira e as linhas/colunas relevantes para a pergunta (app/contexto.py)
+    inicio = time.perf_counter()
+    contexto, detalhes = contexto_carteira.montar(pergunta, orcamento=restante - reserva_historico)
+    tempo_contexto = time.perf_counter() - inicio
+
+    disponivel = restante - detalhes["tokens_contexto"]
+    while mensagens and sum(custos) > disponivel:
+        mensagens.pop(0)
+        custos.pop(0)
+    contexto_conversa = "\n".join(mensagens)
+    prompt = (f"Contexto da conversa:\n{contexto_conversa}\n\nDados do Excel:\n{contexto}\n\n"
+              f"Pergunta atual: {pergunta}\n\n{INSTRUCOES}")
+
+    tokens_enviados = contador_tokens.estimar(prompt)
+    detalhes.update(orcamento=orcamento, tokens_historico=sum(custos), mensagens_historico=len(mensagens))
+    logging.info(f"Tokens enviados (estimativa): {tokens_enviados} de {orcamento} ({len(prompt)} caracteres, "
+                 f"{detalhes['linhas']} linhas, contexto montado em {tempo_contexto * 1e3:.1f} ms)")
+    return prompt, tokens_enviados, detalhes
+
+# Função para extrair o texto da resposta do Gemini e registrar o tamanho do prompt
+# A contagem real informada pela API calibra a estimativa offline das próximas perguntas
+def tratar_resposta(response, prompt, tokens_estimados, detalhes):
+    uso = getattr(response, 'usage_metadata', None)
+    tokens_reais = getattr(uso, 'prompt_token_count', None) if uso is not None else None
+    tokens_recebidos = getattr(uso, 'candidates_token_count', None) if uso is not None else None
+    if not tokens_recebidos:
+        tokens_recebidos = contador_tokens.estimar(response.text)
+    logging.info(f"Tokens recebidos: {tokens_recebidos}")
+
+    if tokens_reais:
+        logging.debug(f"Tokens do prompt (API): {tokens_reais} (estimativa: {tokens_estimados})")
+        contador_tokens.calibrar(prompt, tokens_reais)
+    registrar_prompt(prompt, tokens_estimados, tokens_reais, tokens_recebidos, detalhes)
+    return response.text.strip()  # Retorna a resposta como string limpa
+
+# Função específica para perguntas conversacionais
+# O limite de requisições é aplicado pela faixa do Gemini (app/limitador.py, em routes.py)
+def consultar_gemini_conversacional(pergunta, contexto_carteira, historico=()):
+    prompt, tokens_enviados, detalhes = montar_prompt(pergunta, contexto_carteira, historico)
+    try:
+        # Enviar a pergunta para o Gemini (cliente único do processo) e obter uma resposta
+        response = obter_cliente().gerar(prompt)
+        return tratar_resposta(response, prompt, tokens_enviados, detalhes)
+    except Exception as e:
+        logging.exception("Erro ao consultar a API do Gemini")
+        raise ErroGemini(MENSAGEM_ERRO_GEMINI) from e
+
+# Mesma consulta sem bloquear a thread durante a geração (faixa assíncrona do Gemini)
+async def consultar_gemini_conversacional_async(pergunta, contexto_carteira, historico=()):
+    prompt, tokens_enviados, detalhes = montar_prompt(pergunta, contexto_carteira, historico)
+    try:
+        response = await obter_cliente().gerar_async(prompt)
+        return tratar_resposta(response, prompt, tokens_enviados, detalhes)
+    except Exception as e:
+        logging.exception("Erro ao consultar a API do Gemini")
+        raise ErroGemini(MENSAGEM_ERRO_GEMINI) from e
+
+# Mesma consulta devolvendo o texto em partes, à medida que o modelo gera (respostas em stream)
+# Uma falha no meio levanta ErroGemini depois das partes já entregues
+def consultar_gemini_em_partes(pergunta, contexto_carteira, historico=()):
+    prompt, tokens_enviados, detalhes = montar_prompt(pergunta, contexto_carteira, historico)
+    try:
+        response = obter_cliente().gerar_em_partes(prompt)
+        for parte in response:
+            if parte.text:
+                yield parte.text
+        tratar_resposta(response, prompt, tokens_enviados, detalhes)
+    except Exception as e:
+        logging.exception("Erro ao consultar a API do Gemini")
+        raise ErroGemini(MENSAGEM_ERRO_GEMINI) from e
+
+
+# Função para registrar o tamanho de cada prompt enviado ao Gemini
+def registrar_prompt(prompt, tokens_estimados, tokens_reais, tokens_resposta, detalhes):
+    registro = {
+        "caracteres": len(prompt), "tokens_estimados": tokens_estimados, "tokens": tokens_reais or tokens_estimados,
+        "tokens_resposta": tokens_resposta, **detalhes,
+    }
+    with _trava_prompt:
+        estatisticas_prompt["chamadas"] += 1
+        estatisticas_prompt["caracteres_total"] += len(prompt)
+        estatisticas_prompt["tokens_total"] += registro["tokens"]
+        estatisticas_prompt["tokens_estimados_total"] += tokens_estimados
+        estatisticas_prompt["tokens_resposta_total"] += tokens_resposta
+        estatisticas_prompt["ultimo"] = registro
+        prompts_recentes.append(registro)
+
+def obter_estatisticas_prompt():
+    with _trava_prompt:
+        return {
+            **estatisticas_prompt,
+            "fator_calibracao": round(contador_tokens.fator, 4),
+            "recentes": list(prompts_recentes),
+        }
@@ -0,0 +1,77 @@
+# historico.py
+import time
+from collections import OrderedDict, deque
+from threading import Lock
+
+from config import HISTORICO_MENSAGENS, HISTORICO_MAX_CONVERSAS, HISTORICO_EXPIRACAO
+
+LIMITE_CARACTERES_MENSAGEM = 2000  # Respostas longas são guardadas cortadas
+
+
+# Histórico das conversas, separado por conversa (chat do Telegram ou cliente HTTP)
+# - cada conversa é um buffer circular com as últimas HISTORICO_MENSAGENS trocas
+# - no máximo HISTORICO_MAX_CONVERSAS conversas: a menos usada recentemente sai primeiro (LRU)
+# - conversas paradas há mais de HISTORICO_EXPIRACAO segundos são descartadas
+# Assim a memória fica estável com tráfego contínuo e o histórico de um usuário nunca vai
+# para o prompt de outro
+class HistoricoConversas:
+    def __init__(self, mensagens=HISTORICO_MENSAGENS, max_conversas=HISTORICO_MAX_CONVERSAS, expiracao=HISTORICO_EXPIRACAO):
+        self.mensagens = mensagens
+        self.max_conversas = max_conversas
+        self.expiracao = expiracao
+        self._conversas = OrderedDict()  # conversa -> (usada_em, deque de mensagens)
+        self._trava = Lock()
+        self.expiradas = 0
+        self.descartadas = 0
+
+    # Remover as conversas paradas há mais tempo que a expiração (as mais antigas ficam no início)
+    def _expirar(self, agora):
+        while self._conversas:
+            conversa, (usada_em, _) = next(iter(self._conversas.items()))
+            if agora - usada_em < self.expiracao:
+                break
+            del self._conversas[conversa]
+            self.expiradas += 1
+
+    def adicionar(self, conversa, pergunta, resposta):
+        if conversa is None:
+            return  # Sem identificação não há histórico (nada é compartilhado entre clientes)
+        agora = time.monotonic()
+        with self._trava:
+            self._expirar(agora)
+            _, mensagens = self._conversas.pop(conversa, (None, None))
+            if mensagens is None:
+                mensagens = deque(maxlen=self.mensagens)
+            mensagens.append({"Usuário": pergunta, "TIAGO": resposta[:LIMITE_CARACTERES_MENSAGEM]})
+            self._conversas[conversa] = (agora, mensagens)
+            while len(self._conversas) > self.max_conversas:
+                self._conversas.popitem(last=False)
+                self.descartadas += 1
+
+    # Últimas trocas da conversa (lista de {"Usuário": pergunta, "TIAGO": resposta})
+    def ultimas(self, conversa):
+        if conversa is None:
+            return []
+        with self._trava:
+            self._expirar(time.monotonic())
+            item = self._conversas.get(conversa)
+            return list(item[1]) if item else []
+
+    def limpar(self, conversa):
+        with self._trava:
+            self._conversas.pop(conversa, None)
+
+    def metricas(self):
+        with self._trava:
+            self._expirar(time.monotonic())
+            return {
+                "conversas": len(self._conversas),
+                "mensagens": sum(len(mensagens) for _, mensagens in self._conversas.values()),
+                "limite_conversas": self.max_conversas,
+                "mensagens_por_conversa": self.mensagens,
+                "expiradas": self.expiradas,
+                "descartadas": self.descartadas,
+            }
+
+
+historico_conversas = HistoricoConversas()
@@ -0,0 +1,127 @@
+# importacao.py
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+
+from werkzeug.utils import secure_filename
+
+from app import cache
+from app.leitura_planilha import EXTENSOES_SUPORTADAS
+from app.snapshot import gravar_snapshot
+from app.utils import montar_carteira
+from config import UPLOAD_FOLDER
+
+TAMANHO_BLOCO_UPLOAD = 1 << 20  # Bytes copiados por vez do corpo da requisição para o disco
+VALIDADE_ESTADO = 86400  # Segundos que o estado de uma importação fica consultável
+
+
+class UploadGrandeDemais(Exception):
+    pass
+
+
+# Chave do estado da importação no cache compartilhado: qualquer worker responde à consulta
+def chave_importacao(importacao_id):
+    return f"importacao:{importacao_id}"
+
+def obter_importacao(importacao_id):
+    return cache.get(chave_importacao(importacao_id))
+
+def _atualizar(importacao, **campos):
+    importacao.update(campos, atualizado_em=time.time())
+    cache.set(chave_importacao(importacao["id"]), dict(importacao), timeout=VALIDADE_ESTADO)
+
+
+# Função para gravar o arquivo enviado em UPLOAD_FOLDER, em blocos, sem guardá-lo na memória
+# A assinatura (sha256, a versão da carteira) é calculada durante a cópia; devolve o estado
+# da importação (ainda 'recebido'), com o caminho do arquivo e a assinatura
+# Levanta ValueError (formato fora de `extensoes`) ou UploadGrandeDemais (tamanho_maximo, em bytes)
+def receber_upload(fluxo, nome_arquivo, tamanho_maximo, nome_carteira=None, extensoes=EXTENSOES_SUPORTADAS):
+    nome_arquivo = secure_filename(nome_arquivo or '')
+    extensao = os.path.splitext(nome_arquivo)[1].lower()
+    if extensao not in extensoes:
+        raise ValueError(f"Envie uma planilha {', '.join(extensoes)} (arquivo recebido: {nome_arquivo or 'sem nome'})")
+
+    importacao_id = uuid.uuid4().hex
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    caminho = os.path.join(UPLOAD_FOLDER, f"{importacao_id}{extensao}")
+    sha256, recebidos = hashlib.sha256(), 0
+    try:
+        with open(caminho + '.parte', 'wb') as destino:
+            for bloco in iter(lambda: fluxo.read(TAMANHO_BLOCO_UPLOAD), b''):
+                recebidos += len(bloco)
+                if recebidos > tamanho_maximo:
+                    raise UploadGrandeDemais(f"Arquivo maior que o limite de {tamanho_maximo // 2**20} MB")
+                sha256.update(bloco)
+                destino.write(bloco)
+        if not recebidos:
+            raise ValueError("Arquivo vazio")
+        os.replace(caminho + '.parte', caminho)
+    except BaseException:
+        _remover(caminho + '.parte')
+        raise
+
+    importacao = {
+        "id": importacao_id,
+        "arquivo": nome_arquivo,
+        "carteira": nome_carteira,
+        "bytes": recebidos,
+        "versao": sha256.hexdigest(),
+        "estado": "recebido",
+        "progresso": 0.0,
+        "linhas": 0,
+        "erro": None,
+        "recebido_em": time.time(),
+    }
+    _atualizar(importacao)
+    return importacao, caminho
+
+
+# Função executada pela faixa de importação: ler a planilha em blocos (informando o progresso),
+# gravar o arquivo na fonte acompanhada pelos recarregadores, gravar o snapshot e publicar a carteira nova
+# - pasta_destino: pasta da carteira (CARTEIRA_PASTA ou a do cliente), onde o arquivo entra como o mais recente
+# - arquivo_destino: o arquivo fixo da carteira (CARTEIRA_ARQUIVO), substituído pelo enviado
+# Como a fonte muda, os outros workers carregam a mesma versão (do snapshot) e ela vale após reiniciar
+# publicar(carteira, inicio) troca a carteira em uso neste processo (app/recarga.py ou app/registro_carteiras.py)
+# Com a carteira em uso (anterior), a importação é incremental: só as linhas que mudaram são
+# normalizadas (app/delta.py) e o estado traz o resumo das alterações
+def importar(importacao, caminho, pasta_destino, publicar, anterior=None, arquivo_destino=None):
+    inicio = time.perf_counter()
+    # Numa pasta, o nome leva a data: a exportação nova é a mais recente e não sobrescreve as anteriores
+    destino = arquivo_destino or os.path.join(pasta_destino, f"{time.strftime('%Y%m%d%H%M%S')}_{importacao['arquivo']}")
+    try:
+        _atualizar(importacao, estado="lendo")
+        carteira = montar_carteira(
+            caminho, importacao["versao"], destino, anterior,
+            progresso=lambda fracao, linhas: _atualizar(importacao, progresso=round(fracao or 0.0, 3), linhas=linhas),
+        )
+
+        _atualizar(importacao, estado="publicando", progresso=1.0, linhas=len(carteira.dados), alteracoes=carteira.alteracoes)
+        # O arquivo só entra na fonte (acompanhada pelo recarregador) com a carteira já montada, e
+        # inteiro: é copiado com outro nome ao lado do destino (que pode estar em outro disco) e
+        # trocado numa única operação, então nenhum worker lê um arquivo pela metade
+        os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+        shutil.move(caminho, destino + '.parte')
+        os.replace(destino + '.parte', destino)
+        gravar_snapshot(carteira.dados, destino, importacao["versao"], carteira.impressoes_linhas)
+        if carteira.contexto.modo == 'completo':
+            carteira.contexto.contexto_completo()
+        publicar(carteira, inicio)
+
+        _atualizar(importacao, estado="concluido", origem=destino, duracao_s=round(time.perf_counter() - inicio, 2))
+        return importacao
+    except Exception as e:
+        logging.exception(f"Falha na importação {importacao['id']} ({importacao['arquivo']})")
+        _remover(caminho)
+        _remover(destino + '.parte')
+        _atualizar(importacao, estado="erro", erro=str(e))
+        return importacao
+
+
+def _remover(caminho):
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
@@ -0,0 +1,98 @@
+# indice_nomes.py
+from bisect import bisect_left
+from collections import defaultdict
+from difflib import get_close_matches
+
+from app.classificador import normalizar_pergunta
+
+# Palavras que aparecem nas perguntas ou nas células de partes e não identificam ninguém
+PALAVRAS_IGNORADAS = {
+    'de', 'da', 'do', 'das', 'dos', 'e', 'qual', 'quais', 'como', 'esta', 'sao',
+    'status', 'situacao', 'andamento', 'processo', 'processos', 'caso', 'casos',
+    'autor', 'autora', 'autores', 'requerente', 'reclamante', 'exequente', 'parte',
+}
+
+TAMANHO_MINIMO_TERMO = 3    # Termos menores (artigos, iniciais) não entram na busca
+TAMANHO_MINIMO_PREFIXO = 4  # "silv" encontra "silva" e "silveira"; "si" não busca nada
+SEMELHANCA_MINIMA = 0.8     # Corte do difflib para a busca aproximada (erros de digitação)
+
+
+# Função para quebrar um texto em termos de nome, sem acentos, pontuação e maiúsculas
+def termos_do_nome(texto):
+    return [
+        termo for termo in normalizar_pergunta(texto).split()
+        if len(termo) >= TAMANHO_MINIMO_TERMO and termo not in PALAVRAS_IGNORADAS
+    ]
+
+
+# Índice invertido dos nomes das partes: termo do nome -> posições (iloc) dos processos
+# Montado uma vez por carga; a busca de um nome vira interseção de conjuntos, sem percorrer
+# a coluna inteira com str.contains a cada pergunta
+# Cada célula distinta é quebrada em termos uma única vez (termos_por_nome); numa carga
+# incremental, os termos das células que já existiam vêm do índice anterior (termos_conhecidos)
+class IndiceNomes:
+    def __init__(self, dados, coluna='Envolvidos - Polo Ativo', termos_conhecidos=None):
+        self.dados = dados
+        self.termos_por_nome = {}
+        termos_conhecidos = termos_conhecidos or {}
+        self._posicoes = defaultdict(set)
+        for posicao, nomes in enumerate(dados[coluna]):
+            if not isinstance(nomes, str):
+                continue
+            termos = self.termos_por_nome.get(nomes)
+            if termos is None:
+                termos = termos_conhecidos.get(nomes)
+                if termos is None:
+                    termos = tuple(termos_do_nome(nomes))
+                self.termos_por_nome[nomes] = termos
+            for termo in termos:
+                self._posicoes[termo].add(posicao)
+        self._posicoes = dict(self._posicoes)
+
+        # Vocabulário ordenado (busca por prefixo) e separado pela inicial (busca aproximada)
+        self._vocabulario = sorted(self._posicoes)
+        self._por_inicial = defaultdict(list)
+        for termo in self._vocabulario:
+            self._por_inicial[termo[0]].append(termo)
+
+    def __len__(self):
+        return len(self._posicoes)
+
+    # Processos que contêm o termo: exato, senão por prefixo, senão aproximado
+    def posicoes_do_termo(self, termo, aproximado=True):
+        if termo in self._posicoes:
+            return self._posicoes[termo]
+
+        encontrados = set()
+        if not aproximado:
+            return encontrados
+        if len(termo) >= TAMANHO_MINIMO_PREFIXO:
+            inicio = bisect_left(self._vocabulario, termo)
+            for candidato in self._vocabulario[inicio:]:
+                if not candidato.startswith(termo):
+                    break
+                encontrados |= self._posicoes[candidato]
+        if encontrados:
+            return encontrados
+
+        for candidato in get_close_matches(termo, self._por_inicial.get(termo[0], []), n=3, cutoff=SEMELHANCA_MINIMA):
+            encontrados |= self._posicoes[candidato]
+        return encontrados
+
+    # Localizar na pergunta a maior sequência de termos (mínimo de dois: nome e sobrenome)
+    # que corresponde a alguma parte; devolve (termos, posições ordenadas)
+    # Com aproximado=False só valem termos exatos (útil quando o nome é opcional na pergunta)
+    def encontrar_nome(self, pergunta, aproximado=True):
+        termos = termos_do_nome(pergunta)
+        melhor = ([], [])
+        for inicio in range(len(termos) - 1):
+            posicoes = self.posicoes_do_termo(termos[inicio], aproximado)
+            fim = inicio + 1
+            while fim < len(termos):
+                proximas = posicoes & self.posicoes_do_termo(termos[fim], aproximado)
+                if not proximas:
+                    break
+                posicoes, fim = proximas, fim + 1
+            if fim - inicio >= 2 and fim - inicio > len(melhor[0]):
+                melhor = (termos[inicio:fim], sorted(posicoes))
+        return melhor
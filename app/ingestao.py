@@ -0,0 +1,126 @@
+# ingestao.py
+import pandas as pd
+
+from app.functions_ import extrair_comarca
+
+# Nomes usados pela exportação atual do sistema de processos e o nome equivalente esperado pelos handlers
+COLUNAS_EQUIVALENTES = {
+    'Número': 'Número CNJ',
+    'Valor da causa': 'Total da causa',
+    'Procedimento': 'Rito',
+    'Última movimentação': 'Última mov.',
+    'Envolvidos - Polo ativo': 'Envolvidos - Polo Ativo',
+}
+
+# Colunas com valores em reais (numéricos ou no formato "R$ 1.234,56")
+COLUNAS_MONETARIAS = [
+    'Total da causa', 'Total deferido', 'Valor do acordo', 'Valor provisionado',
+    'Valor envolvido', 'Valor de Liquidação', 'Honorários'
+]
+
+# Colunas de data no formato dd/mm/aaaa
+COLUNAS_DATA = [
+    'Data de distribuição', 'Data de cadastro', 'Data de citação', 'Última mov.',
+    'Data de encerramento', 'Data de Trânsito em Julgado'
+]
+
+# Colunas categóricas que os handlers sempre comparam em minúsculas
+COLUNAS_MINUSCULAS = ['Status', 'Rito', 'Fase', 'Resultado da Sentença', 'Tipo de Recurso', 'Assuntos']
+
+# Colunas de texto com poucos valores distintos, guardadas como pandas.Categorical
+# (códigos inteiros + dicionário de categorias): menos memória por worker, e filtros,
+# value_counts e métodos .str trabalham sobre os códigos / sobre as categorias distintas
+COLUNAS_CATEGORICAS = [
+    'Status', 'Foro', 'Comarca', 'Estado', 'Rito', 'Fase', 'Órgão',
+    'Resultado da Sentença', 'Tipo de Recurso', 'Assuntos'
+]
+
+
+# Função para converter valores em reais para float, aceitando números ou textos "R$ 1.234,56"
+def converter_moeda(serie):
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype('float64')
+
+    e_texto = serie.map(lambda valor: isinstance(valor, str))
+    texto = (
+        serie[e_texto]
+        .str.replace('R$', '', regex=False)
+        .str.replace('.', '', regex=False)
+        .str.replace(',', '.', regex=False)
+        .str.strip()
+    )
+    convertido = pd.to_numeric(serie.where(~e_texto), errors='coerce').astype('float64')
+    convertido[e_texto] = pd.to_numeric(texto, errors='coerce')
+    return convertido
+
+
+# Função para garantir que uma coluna de texto tenha apenas strings sem espaços extras (ou NaN)
+def normalizar_texto(serie):
+    serie = serie.where(serie.isna(), serie.astype(str))
+    return serie.str.strip()
+
+
+# Função para normalizar o DataFrame bruto uma única vez, no carregamento
+def normalizar_dados(df):
+    return finalizar_dados(normalizar_bloco(df))
+
+
+# Função para normalizar um bloco de linhas: tudo que é calculado linha a linha (nomes das colunas,
+# moeda, datas e textos), para que a leitura em partes (app/leitura_planilha.py) descarte os
+# textos brutos de cada bloco antes de ler o próximo
+def normalizar_bloco(df):
+    df = df.rename(columns={
+        origem: destino for origem, destino in COLUNAS_EQUIVALENTES.items()
+        if origem in df.columns and destino not in df.columns
+    })
+
+    for coluna in COLUNAS_MONETARIAS:
+        if coluna in df.columns:
+            df[coluna] = converter_moeda(df[coluna])
+
+    for coluna in COLUNAS_DATA:
+        if coluna in df.columns:
+            df[coluna] = pd.to_datetime(df[coluna], format='%d/%m/%Y', errors='coerce')
+
+    # Demais colunas de texto: apenas strings, sem espaços nas pontas
+    for coluna in df.columns:
+        if df[coluna].dtype == 'object':
+            df[coluna] = normalizar_texto(df[coluna])
+
+    for coluna in COLUNAS_MINUSCULAS:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].str.lower()
+
+    return df
+
+
+# Função para concluir a normalização depois de juntar os blocos: colunas derivadas e categorias
+# (as categorias só podem ser montadas com todos os valores distintos)
+def finalizar_dados(df):
+    df = adicionar_colunas_derivadas(df)
+    return codificar_categorias(df)
+
+
+# Função para calcular as colunas derivadas usadas pelos handlers, uma única vez na carga
+# (os dados da carteira são somente leitura depois disso)
+def adicionar_colunas_derivadas(df):
+    if 'Foro' in df.columns:
+        # Comarca (município) e estado (UF) extraídos de 'Foro', ex.: "Fortaleza - CE"
+        # Extraídos uma vez por foro distinto (poucos, repetidos em milhares de processos)
+        foros = df['Foro'].dropna().unique()
+        df['Comarca'] = df['Foro'].map(dict(zip(foros, map(extrair_comarca, foros))))
+        df['Estado'] = df['Foro'].map({foro: foro.split('-')[-1].strip() for foro in foros if isinstance(foro, str)})
+
+    if 'Última mov.' in df.columns and 'Data de distribuição' in df.columns:
+        # Duração do processo em dias, entre a distribuição e a última movimentação
+        df['Duração'] = (df['Última mov.'] - df['Data de distribuição']).dt.days
+
+    return df
+
+
+# Função para converter as colunas de baixa cardinalidade em categóricas (já normalizadas)
+def codificar_categorias(df):
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df.columns and df[coluna].dtype == 'object':
+            df[coluna] = df[coluna].astype('category')
+    return df
@@ -0,0 +1,139 @@
+# intencoes.py
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable
+
+from app.functions_ import *
+from app.gemini import consultar_gemini_conversacional, consultar_gemini_conversacional_async, consultar_gemini_em_partes
+
+# Tempo (em segundos) que cada tipo de resposta pode ficar no cache (0 = sem expiração)
+# A chave do cache inclui a impressão do conteúdo que a intenção lê (ou a versão dos dados), então
+# as respostas calculadas localmente nunca ficam desatualizadas e saem apenas pelo descarte LRU;
+# as do Gemini expiram
+TTL_LOCAL = 0
+TTL_GEMINI = 300
+
+
+# Metadados de uma intenção: a função que responde e como ela deve ser agendada e cacheada
+# A função recebe a fonte de dados da carteira ('dados' = DataFrame, 'cubo' = agregados
+# pré-calculados, 'indice_nomes' = índice das partes, 'contexto' = contexto do Gemini) e,
+# quando usa_pergunta, também a pergunta; as do Gemini (usa_gemini) recebem ainda o histórico
+# da conversa (lista de trocas, app/historico.py); devolve (texto, gráfico)
+@dataclass(frozen=True)
+class Intencao:
+    funcao: Callable
+    fonte: str = 'dados'
+    usa_pergunta: bool = False
+    usa_gemini: bool = False
+    cacheavel: bool = True
+    ttl: int = TTL_LOCAL
+    # Parâmetros da pergunta que mudam a resposta (entram na chave do cache); por padrão, a
+    # pergunta normalizada quando usa_pergunta, e nenhum quando a função não recebe a pergunta
+    parametros: Callable = None
+    # Versão assíncrona da função (corrotina), usada pela faixa assíncrona do Gemini
+    funcao_async: Callable = None
+    # Versão em partes (respostas em stream): devolve (iterável com as partes do texto, gráfico)
+    funcao_em_partes: Callable = None
+    # Conteúdo da fonte que a função lê (Carteira.impressao): caminhos (dimensão, agregado) do cubo
+    # ou colunas dos dados; a resposta em cache continua valendo enquanto esse conteúdo não mudar,
+    # mesmo com uma exportação nova. Sem dependências, a chave muda a cada versão dos dados
+    dependencias: tuple = None
+
+    # Colunas da carteira que a função lê, tiradas das dependências: nos caminhos do cubo, a
+    # dimensão e o agregado ('total' e 'quantidade' não são colunas)
+    def colunas(self):
+        if not self.dependencias:
+            return ()
+        if self.fonte == 'cubo':
+            return tuple(dict.fromkeys(
+                parte for caminho in self.dependencias for parte in caminho if parte not in ('total', 'quantidade')
+            ))
+        return self.dependencias
+
+
+# Para intenções que recebem a pergunta mas respondem sempre o mesmo
+def _sem_parametros(pergunta):
+    return None
+
+
+# Intenção respondida pelo Gemini com uma observação fixa no lugar do gráfico
+def _gemini_com_observacao(observacao):
+    def responder(contexto, pergunta, historico):
+        return consultar_gemini_conversacional(pergunta, contexto, historico), observacao
+
+    async def responder_async(contexto, pergunta, historico):
+        return await consultar_gemini_conversacional_async(pergunta, contexto, historico), observacao
+
+    def responder_em_partes(contexto, pergunta, historico):
+        return consultar_gemini_em_partes(pergunta, contexto, historico), observacao
+
+    return Intencao(responder, fonte='contexto', usa_pergunta=True, usa_gemini=True, ttl=TTL_GEMINI,
+                    funcao_async=responder_async, funcao_em_partes=responder_em_partes)
+
+
+# Mapeamento de categorias (app/map.py) para as funções que as respondem
+intencoes = {
+    'valor_total_acordos': Intencao(processar_valor_acordo, dependencias=('Valor do acordo',)),
+    'valor_condenacao_estado': Intencao(processar_valor_condenacao_por_estado, fonte='cubo', dependencias=(('Foro', 'Total deferido'),)),
+    'estado_maior_valor_causa': Intencao(processar_maior_valor_causa_por_estado, fonte='cubo', dependencias=(('Foro', 'Total da causa'),)),
+    'estado_maior_media_valor_causa': Intencao(processar_media_valor_causa_por_estado, fonte='cubo', dependencias=(('Foro', 'Total da causa'),)),
+    'divisao_resultados_processos': Intencao(processar_sentenca, fonte='cubo', usa_pergunta=True, parametros=_sem_parametros, dependencias=(('Resultado da Sentença', 'quantidade'),)),
+    'transitaram_julgado': Intencao(processar_transito_julgado, dependencias=('Data de Trânsito em Julgado',)),
+    'quantidade_processos_estado': Intencao(processar_quantidade_processos_por_estado, fonte='cubo', dependencias=(('Foro', 'quantidade'),)),
+    'quantidade_total_processos': Intencao(processar_quantidade_processos, fonte='cubo', dependencias=(('total', 'Número CNJ'), ('Status', 'Número CNJ'))),
+    'valor_total_causa': Intencao(processar_valor_total_causa, fonte='cubo', dependencias=(('total', 'Total da causa'), ('Status', 'Total da causa'))),
+    'processos_ativos': Intencao(lambda cubo, pergunta: processar_status(pergunta, cubo, "ativo"), fonte='cubo', usa_pergunta=True, parametros=_sem_parametros, dependencias=(('Status', 'quantidade'),)),
+    'processos_arquivados': Intencao(lambda cubo, pergunta: processar_status(pergunta, cubo, "arquivado"), fonte='cubo', usa_pergunta=True, parametros=_sem_parametros, dependencias=(('Status', 'quantidade'),)),
+    'quantidade_recursos': Intencao(processar_quantidade_recursos, dependencias=('Tipo de Recurso',)),
+    'sentencas': Intencao(processar_sentenca, fonte='cubo', usa_pergunta=True, parametros=_sem_parametros, dependencias=(('Resultado da Sentença', 'quantidade'),)),
+    'assuntos_recorrentes': Intencao(processar_assuntos_recorrentes, fonte='cubo', dependencias=(('Assuntos', 'quantidade'),)),
+    'tribunal_acoes_convencoes': Intencao(processar_tribunal_acoes_convenções, dependencias=('Assuntos', 'Órgão')),
+    'rito_sumarisimo': Intencao(processar_rito, fonte='cubo', dependencias=(('Rito', 'quantidade'),)),
+    'divisao_fase': Intencao(processar_fase, fonte='cubo', dependencias=(('Fase', 'quantidade'),)),
+    'reclamantes_multiplos': Intencao(processar_reclamantes_multiplos, dependencias=('Envolvidos - Polo Ativo',)),
+    'estado_mais_ofensor': Intencao(processar_estado_mais_ofensor, fonte='cubo', dependencias=(('Foro', 'Total deferido'),)),
+    'comarca_mais_ofensora': Intencao(processar_comarca_mais_preocupante, fonte='cubo', dependencias=(('Comarca', 'Total deferido'),)),
+    'melhor_estrategia': _gemini_com_observacao("Essa pergunta envolve uma análise mais detalhada e política de acordo. Por favor, entre em contato com o setor responsável."),
+    'beneficio_economico_carteira': _gemini_com_observacao("Para calcular o benefício econômico, subtraia o valor da condenação do valor da causa."),
+    'beneficio_economico_estado': _gemini_com_observacao("Para calcular o benefício econômico por estado, subtraia o valor da condenação pelo valor da causa em cada estado."),
+    'idade_carteira': _gemini_com_observacao("Para determinar a idade da carteira, consulte os dados de abertura e finalização dos processos."),
+    'maior_media_duracao_estado': Intencao(processar_media_duracao_por_estado, fonte='cubo', dependencias=(('total', 'Duração'), ('Estado', 'Duração'))),
+    'maior_media_duracao_comarca': Intencao(processar_media_duracao_por_comarca, fonte='cubo', dependencias=(('total', 'Duração'), ('Comarca', 'Duração'))),
+    'processos_improcedentes': Intencao(processar_sentencas_improcedentes, fonte='cubo', dependencias=(('Resultado da Sentença', 'quantidade'),)),
+    'processos_procedentes': Intencao(processar_sentencas_procedentes, fonte='cubo', dependencias=(('Resultado da Sentença', 'quantidade'),)),
+    'processos_extintos_sem_custos': Intencao(processar_sentencas_extinto_sem_custos, fonte='cubo', dependencias=(('Resultado da Sentença', 'quantidade'),)),
+    'processo_maior_tempo_sem_movimentacao': Intencao(processar_maior_tempo_sem_movimentacao, dependencias=('Número CNJ', 'Duração')),
+    'divisao_por_rito': Intencao(processar_divisao_por_rito, fonte='cubo', dependencias=(('Rito', 'quantidade'),)),
+    'processos_nao_julgados': Intencao(processar_nao_julgados, dependencias=('Resultado da Sentença',)),
+    'processos_nao_citados': Intencao(processar_nao_citados, fonte='cubo', dependencias=(('total', 'quantidade'), ('total', 'Data de citação'))),
+    'status_autor': Intencao(processar_status_autor, fonte='indice_nomes', usa_pergunta=True),
+    'processo_mais_antigo': _gemini_com_observacao("Para encontrar o processo mais antigo, verifique a data de distribuição mais antiga no banco de dados."),
+}
+
+# Cumprimentos ("bom dia", "tudo bem"...) respondidos sem consultar os dados
+INTENCAO_SAUDACAO = Intencao(lambda dataframe: ("Como posso te ajudar hoje?", {}))
+
+# Perguntas sem categoria conhecida vão direto para o Gemini
+async def _responder_gemini_async(contexto, pergunta, historico):
+    return await consultar_gemini_conversacional_async(pergunta, contexto, historico), {}
+
+INTENCAO_GEMINI = Intencao(
+    lambda contexto, pergunta, historico: (consultar_gemini_conversacional(pergunta, contexto, historico), {}),
+    fonte='contexto', usa_pergunta=True, usa_gemini=True, ttl=TTL_GEMINI, funcao_async=_responder_gemini_async,
+    funcao_em_partes=lambda contexto, pergunta, historico: (consultar_gemini_em_partes(pergunta, contexto, historico), {})
+)
+
+
+# Estatísticas de execução por categoria (quantidade de chamadas e tempo total)
+estatisticas_intencoes = {}
+_trava_estatisticas = Lock()
+
+def registrar_execucao(categoria, duracao):
+    with _trava_estatisticas:
+        estatistica = estatisticas_intencoes.setdefault(categoria or 'gemini', {"chamadas": 0, "tempo_total_s": 0.0})
+        estatistica["chamadas"] += 1
+        estatistica["tempo_total_s"] += duracao
+
+def obter_estatisticas_intencoes():
+    with _trava_estatisticas:
+        return {categoria: dict(estatistica) for categoria, estatistica in estatisticas_intencoes.items()}
@@ -0,0 +1,164 @@
+# leitura_planilha.py
+import csv
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.ingestao import normalizar_bloco, finalizar_dados
+
+LINHAS_POR_BLOCO = 5000
+EXTENSOES_SUPORTADAS = ('.xlsx', '.xlsm', '.xls', '.csv')
+
+try:
+    from openpyxl import load_workbook
+except ImportError:
+    load_workbook = None  # Sem openpyxl o Excel é lido inteiro pelo pandas
+
+
+# Função para ler e normalizar uma planilha (Excel ou CSV) em blocos de linhas
+# - xlsx: openpyxl em modo somente leitura, que percorre a planilha sem montar o documento inteiro
+# - csv: pandas com chunksize (separador e codificação detectados no início do arquivo)
+# Cada bloco é normalizado assim que é lido (app/ingestao.py), então só os dados já convertidos
+# ficam na memória; progresso(fracao, linhas), se informado, é chamado a cada bloco
+def ler_planilha(caminho, progresso=None):
+    return ler_planilha_com_impressoes(caminho, progresso)[0]
+
+
+# Mesma leitura, devolvendo também a impressão digital de cada linha bruta (usada pela
+# ingestão incremental, app/delta.py, para reconhecer as linhas que não mudaram)
+def ler_planilha_com_impressoes(caminho, progresso=None):
+    normalizados, impressoes, linhas = [], [], 0
+    for bloco, fracao in ler_blocos(caminho):
+        impressoes.append(impressoes_linhas(bloco))
+        normalizados.append(normalizar_bloco(bloco))
+        linhas += len(bloco)
+        if progresso:
+            progresso(fracao, linhas)
+    return finalizar_dados(juntar_blocos(normalizados)), np.concatenate(impressoes)
+
+
+# Blocos brutos da planilha, na ordem do arquivo: (DataFrame, fração já lida do arquivo ou None)
+def ler_blocos(caminho):
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao not in EXTENSOES_SUPORTADAS:
+        raise ValueError(f"Formato não suportado: {extensao or caminho} (use {', '.join(EXTENSOES_SUPORTADAS)})")
+    if extensao == '.csv':
+        return _blocos_csv(caminho)
+    if extensao == '.xls' or load_workbook is None:
+        return _blocos_excel_pandas(caminho)
+    return _blocos_xlsx(caminho)
+
+
+# Juntar os blocos já normalizados num único DataFrame (ainda sem colunas derivadas e categorias)
+def juntar_blocos(normalizados):
+    if not normalizados:
+        raise ValueError("A planilha não tem cabeçalho")
+    dados = pd.concat(normalizados, ignore_index=True) if len(normalizados) > 1 else normalizados[0]
+    return ajustar_tipos(dados)
+
+
+# Colunas só com números voltam a ser numéricas e colunas vazias viram float (NaN), como no read_excel
+def ajustar_tipos(dados):
+    dados = dados.infer_objects()
+    for coluna in dados.columns:
+        if dados[coluna].dtype == 'object' and dados[coluna].isna().all():
+            dados[coluna] = dados[coluna].astype('float64')
+    return dados
+
+
+# Impressão digital (uint64) de cada linha bruta: o hash de todas as células, combinado com o do
+# cabeçalho (uma coluna renomeada ou nova muda todas as linhas)
+# Colunas numéricas entram como float: a mesma linha tem a mesma impressão num bloco em que o
+# leitor de CSV deu int64 à coluna e noutro em que deu float64 (por causa de um vazio)
+def impressoes_linhas(bloco):
+    colunas = {
+        coluna: serie.astype('float64') if serie.dtype.kind in 'biuf' else serie
+        for coluna, serie in bloco.items()
+    }
+    impressoes = pd.util.hash_pandas_object(pd.DataFrame(colunas, index=bloco.index), index=False).to_numpy()
+    cabecalho = pd.util.hash_array(np.array(['\x1f'.join(map(str, bloco.columns))], dtype=object))[0]
+    return impressoes ^ cabecalho
+
+
+def _blocos_xlsx(caminho):
+    livro = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        planilha = livro.worksheets[0]
+        total = planilha.max_row  # Dimensão declarada no arquivo (pode faltar)
+        linhas = planilha.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        colunas = _nomes_colunas(cabecalho)
+        bloco, lidas = [], 1
+        for linha in linhas:
+            lidas += 1
+            if all(valor is None or valor == '' for valor in linha):
+                continue  # Linhas vazias são ignoradas, como no read_excel
+            linha = linha[:len(colunas)] + (None,) * (len(colunas) - len(linha))
+            bloco.append([_valor_celula(valor) for valor in linha])
+            if len(bloco) == LINHAS_POR_BLOCO:
+                yield _montar_bloco(bloco, colunas), min(lidas / total, 1.0) if total else None
+                bloco = []
+        yield _montar_bloco(bloco, colunas), 1.0
+    finally:
+        livro.close()
+
+
+def _blocos_excel_pandas(caminho):
+    yield pd.read_excel(caminho), 1.0
+
+
+def _blocos_csv(caminho):
+    with open(caminho, 'rb') as arquivo:
+        amostra = arquivo.read(64 * 1024)
+    try:
+        codificacao = 'utf-8-sig'
+        texto = amostra.decode(codificacao)
+    except UnicodeDecodeError:
+        codificacao = 'latin-1'  # Exportações antigas do Windows
+        texto = amostra.decode(codificacao)
+    try:
+        separador = csv.Sniffer().sniff(texto.split('\n', 1)[0], delimiters=';,\t|').delimiter
+    except csv.Error:
+        separador = ','
+
+    tamanho = os.path.getsize(caminho) or 1
+    with open(caminho, encoding=codificacao, newline='') as arquivo:
+        # Com ';' a exportação é brasileira: vírgula decimal
+        leitor = pd.read_csv(arquivo, sep=separador, decimal=',' if separador == ';' else '.',
+                             chunksize=LINHAS_POR_BLOCO, skip_blank_lines=True)
+        for bloco in leitor:
+            yield bloco, min(arquivo.buffer.tell() / tamanho, 1.0)
+
+
+def _montar_bloco(linhas, colunas):
+    return pd.DataFrame(linhas, columns=colunas, dtype=object)
+
+
+# Nomes das colunas como o read_excel monta: sem nome vira "Unnamed: i" e repetidos ganham ".1", ".2"...
+def _nomes_colunas(cabecalho):
+    while cabecalho and cabecalho[-1] is None:
+        cabecalho = cabecalho[:-1]
+    nomes, vistos = [], {}
+    for posicao, nome in enumerate(cabecalho):
+        nome = f"Unnamed: {posicao}" if nome is None else str(nome)
+        if nome in vistos:
+            vistos[nome] += 1
+            nome = f"{nome}.{vistos[nome]}"
+        else:
+            vistos[nome] = 0
+        nomes.append(nome)
+    return nomes
+
+
+# Valores como o read_excel devolve: inteiros gravados como float voltam a ser int e células
+# vazias (ou com texto vazio) são NaN
+def _valor_celula(valor):
+    if valor is None or valor == '':
+        return math.nan
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
@@ -0,0 +1,96 @@
+# limitador.py
+import os
+import sqlite3
+import threading
+import time
+
+
+class LimiteExcedido(Exception):
+    def __init__(self, mensagem, aguardar):
+        super().__init__(mensagem)
+        self.aguardar = aguardar  # Segundos até haver orçamento para a chamada
+
+
+# Balde de fichas (token bucket) da API do Gemini, compartilhado entre os processos
+# (workers do gunicorn) por um arquivo SQLite: cada orçamento (por minuto, por dia) é um
+# balde com capacidade e reposição contínua. Cada chamada retira uma ficha de todos os
+# baldes numa única transação; se faltar ficha, o saldo fica negativo e a chamada recebe
+# o instante em que pode sair (reserva em ordem de chegada, sem um worker furar a fila
+# de outro). Se esse instante passa do prazo de quem perguntou, nada é reservado
+class LimitadorTaxa:
+    def __init__(self, caminho, orcamentos):
+        self.caminho = caminho
+        self.orcamentos = orcamentos  # nome -> (capacidade, período em segundos)
+        self._local = threading.local()  # Uma conexão por thread
+        self._trava_contadores = threading.Lock()
+        self._contadores = {"liberadas": 0, "adiadas": 0, "recusadas": 0}
+
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        self._conexao().execute(
+            "CREATE TABLE IF NOT EXISTS baldes (nome TEXT PRIMARY KEY, fichas REAL NOT NULL, atualizado_em REAL NOT NULL)"
+        )
+
+    def _conexao(self):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=30, isolation_level=None, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def _contar(self, contador):
+        with self._trava_contadores:
+            self._contadores[contador] += 1
+
+    # Saldo de cada balde agora, já com a reposição desde a última atualização
+    def _saldos(self, conexao, agora):
+        salvos = dict(
+            (nome, (fichas, atualizado_em))
+            for nome, fichas, atualizado_em in conexao.execute("SELECT nome, fichas, atualizado_em FROM baldes")
+        )
+        saldos = {}
+        for nome, (capacidade, periodo) in self.orcamentos.items():
+            fichas, atualizado_em = salvos.get(nome, (capacidade, agora))
+            saldos[nome] = min(capacidade, fichas + (agora - atualizado_em) * capacidade / periodo)
+        return saldos
+
+    # Reservar uma chamada: devolve quantos segundos esperar até ela poder sair (0 = já)
+    # Levanta LimiteExcedido, sem reservar, se a espera passar de espera_maxima
+    def reservar(self, espera_maxima=None):
+        conexao = self._conexao()
+        conexao.execute("BEGIN IMMEDIATE")  # Trava de escrita: um processo por vez
+        try:
+            agora = time.time()
+            saldos = self._saldos(conexao, agora)
+            aguardar = max(
+                max(0.0, (1 - saldos[nome]) * periodo / capacidade)
+                for nome, (capacidade, periodo) in self.orcamentos.items()
+            )
+            if espera_maxima is not None and aguardar > espera_maxima:
+                conexao.execute("ROLLBACK")
+                self._contar("recusadas")
+                raise LimiteExcedido(
+                    f"Limite de requisições ao Gemini atingido; tente novamente em {aguardar:.0f} s.", aguardar
+                )
+            conexao.executemany(
+                "INSERT OR REPLACE INTO baldes (nome, fichas, atualizado_em) VALUES (?, ?, ?)",
+                [(nome, saldo - 1, agora) for nome, saldo in saldos.items()],
+            )
+            conexao.execute("COMMIT")
+        except sqlite3.Error:
+            conexao.execute("ROLLBACK")
+            raise
+        self._contar("adiadas" if aguardar > 0 else "liberadas")
+        return aguardar
+
+    def metricas(self):
+        saldos = self._saldos(self._conexao(), time.time())
+        with self._trava_contadores:
+            contadores = dict(self._contadores)
+        return {
+            "orcamentos": {
+                nome: {"capacidade": capacidade, "periodo_s": periodo, "fichas": round(saldos[nome], 2)}
+                for nome, (capacidade, periodo) in self.orcamentos.items()
+            },
+            **contadores,  # Contadores deste processo; os baldes são compartilhados
+        }
@@ -2,6 +2,8 @@ from collections import defaultdict
 import re
 
 # Dicionário para mapear tipos de perguntas e suas variações
+# Os padrões são frases literais: app/classificador.py normaliza todas (acentos e
+# maiúsculas) e as procura em uma única passada pela pergunta
 categoria_perguntas = defaultdict(list)
 
 # Mapeamento de categorias para funções
@@ -195,6 +197,17 @@ categoria_perguntas['processos_nao_citados'] = [
     r"processos não citados"
 ]
 
+categoria_perguntas['status_autor'] = [
+    r"status do processo de",
+    r"status do processo do",
+    r"status do processo da",
+    r"situacao do processo de",
+    r"situacao do processo do",
+    r"situacao do processo da",
+    r"processo do autor",
+    r"processo da autora"
+]
+
 categoria_perguntas['processo_mais_antigo'] = [
     r"processo mais antigo da base", 
     r"qual o processo mais antigo"
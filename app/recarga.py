@@ -0,0 +1,149 @@
+# recarga.py
+import glob
+import logging
+import os
+import time
+from threading import Thread, Event, Lock
+
+from app.leitura_planilha import EXTENSOES_SUPORTADAS
+from app.snapshot import assinatura_arquivo
+from app.utils import carregar_carteira
+
+
+# Carteira em uso pelo processo, trocada a quente quando chega uma nova exportação
+# - a fonte é um arquivo fixo (CARTEIRA_ARQUIVO) ou a planilha mais recente de uma pasta (CARTEIRA_PASTA)
+# - uma thread verifica a fonte a cada `intervalo` segundos ou quando alguém pede (recarregar)
+# - a nova Carteira (dados, cubo, índice de nomes, contexto e versão) é montada inteira nessa
+#   thread e só então trocada, numa única atribuição: quem já leu `atual` continua com a versão
+#   antiga até o fim da pergunta, e as chaves do cache mudam junto com a versão
+# - numa pasta, o arquivo só é carregado quando tamanho e data ficam iguais entre duas verificações
+#   (a exportação pode ainda estar sendo copiada); o pedido explícito carrega na hora
+class RecarregadorCarteira:
+    def __init__(self, arquivo=None, pasta=None, intervalo=0):
+        self.arquivo = arquivo
+        self.pasta = pasta
+        self.intervalo = intervalo  # 0 = sem verificação periódica, só por pedido
+        self.atual = None
+
+        self._trava = Lock()  # Uma carga por vez
+        self._trava_thread = Lock()  # Separada: pedir uma recarga não espera a carga em andamento
+        self._pedido = Event()
+        self._carregado = None  # (caminho, mtime, tamanho) da fonte da carteira atual
+        self._observado = None  # Idem, na última verificação
+        self._rejeitado = None  # Idem, da última fonte que falhou (não é relida até mudar)
+        self.recargas = 0
+        self.falhas = 0
+        self.ultima_falha = None
+        self.carregada_em = None
+        self.duracao_ultima_carga = None
+        self.em_andamento = False
+        self._thread = None
+
+    # Planilha de origem e seus metadados (caminho, mtime, tamanho); None se não houver nenhuma
+    def _fonte(self):
+        if self.pasta:
+            candidatos = [
+                caminho for caminho in glob.glob(os.path.join(self.pasta, '*'))
+                if caminho.lower().endswith(EXTENSOES_SUPORTADAS)
+                and not os.path.basename(caminho).startswith(('~$', '.'))  # Travas do Excel e ocultos
+            ]
+            if not candidatos:
+                return None
+            caminho = max(candidatos, key=os.path.getmtime)
+        else:
+            caminho = self.arquivo
+        try:
+            estatisticas = os.stat(caminho)
+        except (OSError, TypeError):
+            return None
+        return caminho, estatisticas.st_mtime_ns, estatisticas.st_size
+
+    # Verificar a fonte e, se ela mudou, montar e trocar a carteira; devolve True se trocou
+    # forcar=True dispensa a espera pela estabilidade do arquivo
+    def recarregar(self, forcar=False):
+        with self._trava:
+            fonte = self._fonte()
+            if fonte is None or fonte == self._carregado or (fonte == self._rejeitado and not forcar):
+                return False
+            observado, self._observado = self._observado, fonte
+            if not forcar and self.atual is not None and fonte != observado:
+                return False  # Mudou desde a última verificação: aguardar a próxima
+
+            caminho = fonte[0]
+            self.em_andamento = True
+            inicio = time.perf_counter()
+            try:
+                versao = assinatura_arquivo(caminho)
+                if self.atual is not None and versao == self.atual.versao and caminho == self.atual.origem:
+                    self._carregado = fonte  # Só a data mudou: a carteira (e o cache) continuam valendo
+                    return False
+                nova = carregar_carteira(caminho, versao, anterior=self.atual)  # Incremental sobre a atual
+                if nova.contexto.modo == 'completo':
+                    nova.contexto.contexto_completo()  # Serializar a tabela antes da troca, não na primeira pergunta
+            except Exception as e:
+                self.falhas += 1
+                self._rejeitado = fonte
+                self.ultima_falha = f"{caminho}: {e}"
+                logging.exception(f"Falha ao carregar a carteira de {caminho}; a versão atual continua em uso")
+                return False
+            finally:
+                self.em_andamento = False
+
+            self._trocar(nova, fonte, inicio)
+            return True
+
+    # Publicar uma carteira já montada fora do recarregador (importação por upload, app/importacao.py)
+    # O arquivo dela já foi gravado na fonte (o mais recente da pasta ou o próprio arquivo fixo):
+    # este processo troca na hora, e os outros workers pela verificação da fonte
+    def publicar(self, nova, inicio=None):
+        with self._trava:
+            fonte = self._fonte()
+            self._observado = fonte
+            self._trocar(nova, fonte, inicio or time.perf_counter())
+
+    # Trocar a carteira atual (chamado com a trava)
+    def _trocar(self, nova, fonte, inicio):
+        anterior, self.atual = self.atual, nova
+        self._carregado = fonte
+        self.recargas += 1
+        self.carregada_em = time.time()
+        self.duracao_ultima_carga = time.perf_counter() - inicio
+        logging.info(f"Carteira trocada em {self.duracao_ultima_carga:.2f} s: {anterior} -> {nova}")
+
+    # Pedir uma recarga imediata, sem esperar por ela (a carga acontece na thread do recarregador)
+    def pedir_recarga(self):
+        self.iniciar()
+        self._pedido.set()
+
+    def _verificar_periodicamente(self):
+        while True:
+            pedido = self._pedido.wait(self.intervalo or None)
+            self._pedido.clear()
+            try:
+                self.recarregar(forcar=pedido)
+            except Exception:
+                logging.exception("Erro ao verificar a fonte da carteira")
+
+    # Iniciar a thread do recarregador (uma por processo)
+    def iniciar(self):
+        with self._trava_thread:
+            if self._thread is None:
+                self._thread = Thread(target=self._verificar_periodicamente, name="recarga-carteira", daemon=True)
+                self._thread.start()
+
+    def metricas(self):
+        carteira = self.atual
+        return {
+            "versao": carteira.versao if carteira else None,
+            "origem": carteira.origem if carteira else None,
+            "linhas": len(carteira.dados) if carteira else 0,
+            "carregada_em": self.carregada_em,
+            "duracao_ultima_carga_s": round(self.duracao_ultima_carga, 3) if self.duracao_ultima_carga else None,
+            "alteracoes": carteira.alteracoes if carteira else None,  # Da carga incremental (app/delta.py)
+            "recargas": self.recargas,
+            "falhas": self.falhas,
+            "ultima_falha": self.ultima_falha,
+            "em_andamento": self.em_andamento,
+            "pasta": self.pasta,
+            "intervalo_s": self.intervalo,
+        }
@@ -0,0 +1,169 @@
+# registro_carteiras.py
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from threading import Thread, Lock
+
+from app.recarga import RecarregadorCarteira
+
+# Nome de carteira aceito (é também o nome da pasta): sem barras nem pontos, para não sair da pasta
+PADRAO_NOME_CARTEIRA = re.compile(r'^[\w-]{1,64}$')
+
+
+class CarteiraNaoEncontrada(Exception):
+    pass
+
+
+# Carteiras de vários clientes num único processo: cada cliente tem uma pasta em `pasta` com as
+# suas exportações (a planilha mais recente vale, como em CARTEIRA_PASTA)
+# - a carteira é carregada na primeira pergunta do cliente (do snapshot binário, quando existe)
+# - as carregadas ficam numa LRU limitada pela memória estimada (Carteira.memoria()): passando de
+#   `memoria_maxima` bytes, as menos usadas recentemente saem e voltam do snapshot quando pedidas
+# - perguntas em andamento continuam com a referência que já têm, mesmo que a carteira saia da LRU
+# - uma thread verifica a cada `intervalo` segundos se as carregadas ganharam nova exportação
+# - os chats do Telegram são associados às carteiras pelo arquivo JSON `arquivo_telegram`
+#   ({"<id do chat>": "<carteira>"}), relido quando muda
+class RegistroCarteiras:
+    def __init__(self, pasta, memoria_maxima, intervalo=0, arquivo_telegram=None):
+        self.pasta = pasta
+        self.memoria_maxima = memoria_maxima
+        self.intervalo = intervalo
+        self.arquivo_telegram = arquivo_telegram
+
+        self._carregadas = OrderedDict()  # carteira -> RecarregadorCarteira (menos usada no início)
+        self._trava = Lock()
+        self._thread = None
+        self._chats = {}
+        self._chats_lidos = None  # mtime do arquivo_telegram já lido
+        self.carregamentos = 0
+        self.acertos = 0
+        self.descartadas = 0
+
+    # Carteira atual do cliente, carregando-a se preciso; levanta CarteiraNaoEncontrada
+    def obter(self, nome):
+        if not nome or not PADRAO_NOME_CARTEIRA.match(nome) or not os.path.isdir(os.path.join(self.pasta, nome)):
+            raise CarteiraNaoEncontrada(f"Carteira não encontrada: {nome}")
+
+        with self._trava:
+            recarregador = self._carregadas.pop(nome, None)
+            if recarregador is None:
+                recarregador = RecarregadorCarteira(pasta=os.path.join(self.pasta, nome))
+            self._carregadas[nome] = recarregador  # Fim da fila: a mais usada recentemente
+
+        carteira = recarregador.atual
+        if carteira is not None:
+            with self._trava:
+                self.acertos += 1
+            return carteira
+
+        # Primeira carga: quem pedir a mesma carteira ao mesmo tempo espera pela trava do recarregador
+        # Uma planilha que falhou não é relida a cada pergunta, só quando mudar
+        self._iniciar()
+        if recarregador.recarregar():
+            recarregador.atual.memoria()  # Medir fora da trava do registro
+            with self._trava:
+                self.carregamentos += 1
+            self._liberar_memoria()
+        carteira = recarregador.atual
+        if carteira is None:
+            raise CarteiraNaoEncontrada(f"A carteira {nome} não tem planilha válida")
+        return carteira
+
+    # Carteira atual do cliente se já estiver na memória (None se não foi carregada ou saiu da LRU)
+    def carregada(self, nome):
+        with self._trava:
+            recarregador = self._carregadas.get(nome)
+        return recarregador.atual if recarregador is not None else None
+
+    # Pasta das exportações do cliente (criada se preciso, para a importação por upload)
+    def pasta_da_carteira(self, nome):
+        if not nome or not PADRAO_NOME_CARTEIRA.match(nome):
+            raise CarteiraNaoEncontrada(f"Nome de carteira inválido: {nome}")
+        pasta = os.path.join(self.pasta, nome)
+        os.makedirs(pasta, exist_ok=True)
+        return pasta
+
+    # Publicar uma carteira já montada (importação por upload) como a atual do cliente
+    def publicar(self, nome, carteira, inicio=None):
+        carteira.memoria()
+        with self._trava:
+            recarregador = self._carregadas.pop(nome, None) or RecarregadorCarteira(pasta=os.path.join(self.pasta, nome))
+            self._carregadas[nome] = recarregador
+        recarregador.publicar(carteira, inicio)
+        self._liberar_memoria()
+
+    # Descartar as carteiras menos usadas até a memória estimada caber no limite
+    # A mais recente nunca sai, mesmo sozinha acima do limite
+    def _liberar_memoria(self):
+        with self._trava:
+            total = sum(r.atual.memoria() for r in self._carregadas.values() if r.atual is not None)
+            while total > self.memoria_maxima and len(self._carregadas) > 1:
+                nome, recarregador = self._carregadas.popitem(last=False)
+                if recarregador.atual is not None:
+                    total -= recarregador.atual.memoria()
+                self.descartadas += 1
+                logging.info(f"Carteira {nome} descartada da memória (volta do snapshot quando pedida)")
+
+    # Nome da carteira associada a um chat do Telegram (None se o chat não estiver no arquivo)
+    def carteira_do_chat(self, chat_id):
+        if not self.arquivo_telegram:
+            return None
+        try:
+            modificado = os.stat(self.arquivo_telegram).st_mtime_ns
+        except OSError:
+            return None
+        if modificado != self._chats_lidos:
+            try:
+                with open(self.arquivo_telegram, encoding='utf-8') as arquivo:
+                    self._chats = {str(chat): carteira for chat, carteira in json.load(arquivo).items()}
+                self._chats_lidos = modificado
+            except (OSError, ValueError, AttributeError) as e:
+                logging.warning(f"Arquivo de chats {self.arquivo_telegram} ignorado: {e}")
+        return self._chats.get(str(chat_id))
+
+    def _verificar_periodicamente(self):
+        while True:
+            time.sleep(self.intervalo)
+            with self._trava:
+                recarregadores = list(self._carregadas.values())
+            trocou = False
+            for recarregador in recarregadores:
+                try:
+                    if recarregador.recarregar():
+                        recarregador.atual.memoria()
+                        trocou = True
+                except Exception:
+                    logging.exception(f"Erro ao verificar a carteira de {recarregador.pasta}")
+            if trocou:
+                self._liberar_memoria()
+
+    # Iniciar a thread que verifica as carteiras carregadas (só com intervalo > 0)
+    def _iniciar(self):
+        if not self.intervalo:
+            return
+        with self._trava:
+            if self._thread is None:
+                self._thread = Thread(target=self._verificar_periodicamente, name="recarga-carteiras", daemon=True)
+                self._thread.start()
+
+    def metricas(self):
+        with self._trava:
+            carregadas = {
+                nome: {
+                    "versao": recarregador.atual.versao[:12],
+                    "linhas": len(recarregador.atual.dados),
+                    "memoria_mb": round(recarregador.atual.memoria() / 2**20, 1),
+                }
+                for nome, recarregador in self._carregadas.items() if recarregador.atual is not None
+            }
+            return {
+                "carregadas": carregadas,
+                "memoria_mb": round(sum(item["memoria_mb"] for item in carregadas.values()), 1),
+                "memoria_maxima_mb": round(self.memoria_maxima / 2**20, 1),
+                "carregamentos": self.carregamentos,
+                "acertos": self.acertos,
+                "descartadas": self.descartadas,
+            }
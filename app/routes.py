@@ -1,97 +1,428 @@
 # routes.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+import asyncio
+import json
 import logging
-from .utils import carregar_dados, processar_pergunta
+from .utils import resolver_intencao, executar_intencao, executar_intencao_async, executar_intencao_em_partes, chave_resposta
+from .intencoes import obter_estatisticas_intencoes
+from .gemini import obter_estatisticas_prompt, ErroGemini
+from .agendador import Faixa, FaixaAssincrona
+from .limitador import LimitadorTaxa, LimiteExcedido
+from .historico import historico_conversas
+from .recarga import RecarregadorCarteira
+from .registro_carteiras import RegistroCarteiras, CarteiraNaoEncontrada
+from .importacao import receber_upload, importar, obter_importacao, UploadGrandeDemais
+from .leitura_planilha import EXTENSOES_SUPORTADAS
+from config import GEMINI_RPM, GEMINI_RPD, LIMITADOR_ARQUIVO, CARTEIRA_ARQUIVO, CARTEIRA_PASTA, INTERVALO_RECARGA
+from config import CARTEIRAS_PASTA, CARTEIRAS_MEMORIA_MB, CARTEIRAS_TELEGRAM, UPLOAD_MAX_MB
 from dotenv import load_dotenv
 from telegram import Update, Bot
 from telegram.ext import Updater, Dispatcher, CommandHandler, MessageHandler, Filters, CallbackContext
 import os
 from flask_caching import Cache
 from app import cache
-import queue
-from threading import Thread
-from time import sleep
+from concurrent.futures import Future, TimeoutError
+from threading import RLock
 import time
 
 main = Blueprint('main', __name__)
-df = None 
 
 load_dotenv()
 
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 bot = Bot(token=TELEGRAM_TOKEN)
 
+# Tempo máximo (em segundos) que uma requisição aguarda a resposta da fila
+TEMPO_LIMITE_RESPOSTA = int(os.getenv('TEMPO_LIMITE_RESPOSTA', 120))
+
+# Quantidade de threads de cada faixa de processamento
+TRABALHADORES_LOCAIS = int(os.getenv('TRABALHADORES_LOCAIS', 4))
+TRABALHADORES_GEMINI = int(os.getenv('TRABALHADORES_GEMINI', 4))  # Chamadas simultâneas (faixa assíncrona)
+TRABALHADORES_ESPERA = int(os.getenv('TRABALHADORES_ESPERA', 1000))  # Esperas simultâneas (faixa assíncrona)
+TRABALHADORES_TELEGRAM = int(os.getenv('TRABALHADORES_TELEGRAM', 2))
+TRABALHADORES_TELEGRAM_EM_PARTES = int(os.getenv('TRABALHADORES_TELEGRAM_EM_PARTES', 100))  # Respostas em partes simultâneas (faixa assíncrona)
+
+# Respostas do Gemini no Telegram: mensagem provisória editada à medida que o texto chega
+RESPOSTAS_EM_PARTES_TELEGRAM = os.getenv('RESPOSTAS_EM_PARTES_TELEGRAM', '1') == '1'
+INTERVALO_EDICAO_TELEGRAM = float(os.getenv('INTERVALO_EDICAO_TELEGRAM', 1.0))  # Segundos entre edições
+LIMITE_MENSAGEM_TELEGRAM = 4096  # Caracteres por mensagem
+
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 
-df = carregar_dados('Processos_20240917131041.xlsx')  # Carregar dados do Excel
+# Carteira carregada do Excel (ou do snapshot) e trocada a quente quando a exportação muda
+# Cada pergunta lê recarregador_carteira.atual uma única vez e usa essa versão até o fim
+recarregador_carteira = RecarregadorCarteira(CARTEIRA_ARQUIVO, CARTEIRA_PASTA, INTERVALO_RECARGA)
+recarregador_carteira.recarregar()
+recarregador_carteira.iniciar()
+
+# Carteiras de outros clientes, escolhidas pelo campo "carteira" (ou cabeçalho X-Carteira) no HTTP
+# e pelo chat no Telegram; sem escolha, vale a carteira padrão acima
+registro_carteiras = RegistroCarteiras(CARTEIRAS_PASTA, CARTEIRAS_MEMORIA_MB * 2**20, INTERVALO_RECARGA, CARTEIRAS_TELEGRAM)
 
 # Criar o dispatcher manualmente
 dispatcher = Dispatcher(bot, None, workers=1)
 
-# Fila para controlar requisições
-fila_de_requisicoes = queue.Queue()
+# Perguntas já enfileiradas e ainda não respondidas: chave da resposta -> Future compartilhado
+perguntas_em_andamento = {}
+trava_perguntas = RLock()
+
+# Controle de requisições ao Gemini: orçamento por minuto e por dia, compartilhado entre os workers
+limitador_gemini = LimitadorTaxa(LIMITADOR_ARQUIVO, {"minuto": (GEMINI_RPM, 60), "dia": (GEMINI_RPD, 86400)})
+
+# Faixas de processamento: perguntas locais (pandas) em paralelo e perguntas do Gemini
+# com controle de taxa, para que o limite da API não atrase as respostas locais
+# Sem orçamento até o prazo da pergunta, o limitador recusa na hora (LimiteExcedido)
+# A faixa do Gemini é assíncrona: as gerações em andamento não ocupam uma thread cada
+faixa_local = Faixa('local', TRABALHADORES_LOCAIS)
+faixa_gemini = FaixaAssincrona('gemini', TRABALHADORES_GEMINI, antes_de_processar=limitador_gemini.reservar)
+# Perguntas que outro processo (worker do gunicorn) já está calculando: só aguardam o cache
+# compartilhado, em corrotinas no laço da faixa, sem uma thread parada por pergunta
+faixa_espera = FaixaAssincrona('espera', TRABALHADORES_ESPERA)
+# Envio das respostas do Telegram: o webhook só enfileira a pergunta e a resposta é enviada
+# quando fica pronta, sem uma thread parada esperando por ela
+faixa_telegram = Faixa('telegram', TRABALHADORES_TELEGRAM)
+# Respostas do Telegram em partes: corrotinas no laço da faixa, então uma geração em andamento
+# ou adiada pelo limitador do Gemini não prende uma das threads de envio acima
+faixa_telegram_em_partes = FaixaAssincrona('telegram_em_partes', TRABALHADORES_TELEGRAM_EM_PARTES)
+# Importação das planilhas enviadas por upload: uma por vez, para limitar a memória usada na leitura
+faixa_importacao = Faixa('importacao', 1)
+
+# Chave que marca, no cache compartilhado, que algum worker está calculando a resposta
+def chave_reserva(chave):
+    return f"calculando:{chave}"
+
+# Montar a resposta e armazená-la no cache
+def guardar_resposta(chave, intencao, resposta_texto, grafico_data):
+    resposta = {"resposta": resposta_texto, "grafico": grafico_data}
+    if intencao.cacheavel:
+        cache.set(chave, resposta, timeout=intencao.ttl)  # Armazenar no cache
+    return resposta
+
+# Função executada pelas faixas: processar a pergunta e armazenar a resposta no cache
+# A reserva (se houver) é liberada no final, com ou sem erro
+def responder_pergunta(chave, pergunta, carteira, categoria, intencao, historico, reserva=None):
+    try:
+        resposta_texto, grafico_data = executar_intencao(categoria, intencao, pergunta, carteira, historico)
+        return guardar_resposta(chave, intencao, resposta_texto, grafico_data)
+    finally:
+        if reserva is not None:
+            cache.delete(reserva)
+
+async def responder_pergunta_async(chave, pergunta, carteira, categoria, intencao, historico, reserva=None):
+    try:
+        resposta_texto, grafico_data = await executar_intencao_async(categoria, intencao, pergunta, carteira, historico)
+        return guardar_resposta(chave, intencao, resposta_texto, grafico_data)
+    finally:
+        if reserva is not None:
+            cache.delete(reserva)
+
+# Enviar a pergunta para a faixa que calcula a resposta (local ou Gemini)
+def enviar_para_faixa(chave, pergunta, carteira, categoria, intencao, historico, prazo, reserva=None):
+    if intencao.usa_gemini:
+        return faixa_gemini.enviar(
+            lambda: responder_pergunta_async(chave, pergunta, carteira, categoria, intencao, historico, reserva), prazo
+        )
+    return faixa_local.enviar(
+        lambda: responder_pergunta(chave, pergunta, carteira, categoria, intencao, historico, reserva), prazo
+    )
+
+# Reservar a chave no cache compartilhado depois que a reserva de outro worker sumiu
+def assumir_reserva(reserva):
+    return not cache.has(reserva) and cache.add(reserva, os.getpid(), timeout=TEMPO_LIMITE_RESPOSTA)
+
+# Corrotina executada pela faixa de espera: outro worker reservou a chave e está calculando a
+# resposta; aguardar até ela aparecer no cache compartilhado. Se a reserva sumir sem resposta
+# (erro no outro worker ou reserva vencida), reservar e calcular aqui, aguardando o Future da
+# faixa que calcula
+# O cache (SQLite/Redis) bloqueia: cada consulta vai para uma thread e volta logo; entre elas,
+# só a corrotina dorme
+async def esperar_outro_worker(chave, pergunta, carteira, categoria, intencao, historico, prazo):
+    reserva = chave_reserva(chave)
+    intervalo = 0.05
+    while time.monotonic() < prazo:
+        resposta = await asyncio.to_thread(cache.get, chave)
+        if resposta is not None:
+            return resposta
+        if await asyncio.to_thread(assumir_reserva, reserva):
+            futuro = enviar_para_faixa(chave, pergunta, carteira, categoria, intencao, historico, prazo, reserva)
+            return await asyncio.wrap_future(futuro)
+        await asyncio.sleep(min(intervalo, max(0.0, prazo - time.monotonic())))
+        intervalo = min(intervalo * 2, 0.25)
+    raise TimeoutError(f"Outro worker não respondeu a tempo: {pergunta}")
+
+def remover_pergunta_em_andamento(chave):
+    with trava_perguntas:
+        perguntas_em_andamento.pop(chave, None)
+
+# Adicionar pergunta na fila da faixa adequada e devolver o Future com a resposta
+# Perguntas equivalentes (mesma chave) já em processamento compartilham o mesmo Future; entre
+# processos, a reserva atômica no cache (add) garante que só um worker calcule cada resposta
+# prazo: instante (time.monotonic()) até o qual quem perguntou aguarda a resposta
+def adicionar_pergunta_na_fila(chave, pergunta, carteira, categoria, intencao, historico, prazo):
+    with trava_perguntas:
+        futuro = perguntas_em_andamento.get(chave)
+        if futuro is None:
+            reserva = chave_reserva(chave)
+            if not intencao.cacheavel:
+                futuro = enviar_para_faixa(chave, pergunta, carteira, categoria, intencao, historico, prazo)
+            elif cache.add(reserva, os.getpid(), timeout=TEMPO_LIMITE_RESPOSTA):
+                futuro = enviar_para_faixa(chave, pergunta, carteira, categoria, intencao, historico, prazo, reserva)
+            else:
+                futuro = faixa_espera.enviar(
+                    lambda: esperar_outro_worker(chave, pergunta, carteira, categoria, intencao, historico, prazo), prazo
+                )
+            perguntas_em_andamento[chave] = futuro
+            futuro.add_done_callback(lambda _: remover_pergunta_em_andamento(chave))
+    return futuro
+
+# Reservar a pergunta para gerá-la em partes neste worker, como adicionar_pergunta_na_fila: a
+# reserva no cache compartilhado ("calculando:<chave>") e um Future em perguntas_em_andamento, que
+# perguntas iguais feitas enquanto isso aguardam. Devolve (Future, segundos a aguardar pelo
+# limitador do Gemini) ou (None, 0) se a mesma pergunta já estiver em andamento, aqui ou em outro
+# worker; se o limitador recusar, libera a reserva e levanta LimiteExcedido
+def reservar_resposta_em_partes(chave, intencao, espera_maxima):
+    with trava_perguntas:
+        if chave in perguntas_em_andamento:
+            return None, 0.0
+        reserva = chave_reserva(chave) if intencao.cacheavel else None
+        if reserva is not None and not cache.add(reserva, os.getpid(), timeout=TEMPO_LIMITE_RESPOSTA):
+            return None, 0.0
+        try:
+            aguardar = limitador_gemini.reservar(espera_maxima)
+        except LimiteExcedido:
+            if reserva is not None:
+                cache.delete(reserva)
+            raise
+        futuro = Future()
+        perguntas_em_andamento[chave] = futuro
+        futuro.add_done_callback(lambda _: remover_pergunta_em_andamento(chave))
+        return futuro, aguardar
+
+# Liberar a reserva da resposta em partes e entregar a resposta (ou o erro) a quem aguarda a mesma
+# pergunta; a resposta já está no cache, então quem chegar depois a encontra lá
+# Uma geração interrompida (cliente desconectou, tarefa cancelada) vira erro para quem aguarda
+def encerrar_resposta_em_partes(chave, intencao, futuro, resposta=None, erro=None):
+    if intencao.cacheavel:
+        cache.delete(chave_reserva(chave))
+    if erro is None:
+        futuro.set_result(resposta)
+    elif isinstance(erro, Exception):
+        futuro.set_exception(erro)
+    else:
+        futuro.set_exception(RuntimeError("A geração da resposta foi interrompida"))
+
+# Identificar a intenção da pergunta: (categoria, intenção, histórico da conversa, chave da resposta)
+# conversa: identificação de quem pergunta (chat do Telegram ou cliente HTTP), para o histórico
+def preparar_pergunta(pergunta, carteira, conversa=None):
+    categoria, intencao = resolver_intencao(pergunta)
+    historico = historico_conversas.ultimas(conversa) if intencao.usa_gemini else []
+    return categoria, intencao, historico, chave_resposta(categoria, intencao, pergunta, carteira, historico)
+
+# Buscar a resposta no cache ou enfileirar a pergunta: devolve (resposta, None) ou (None, Future)
+def iniciar_resposta(pergunta, carteira, conversa=None):
+    categoria, intencao, historico, chave = preparar_pergunta(pergunta, carteira, conversa)
+    if intencao.cacheavel:
+        resposta = cache.get(chave)
+        if resposta is not None:
+            return resposta, None
+
+    prazo = time.monotonic() + TEMPO_LIMITE_RESPOSTA
+    return None, adicionar_pergunta_na_fila(chave, pergunta, carteira, categoria, intencao, historico, prazo)
+
+# Aguardar a resposta sem ocupar uma thread (levanta TimeoutError, LimiteExcedido ou o erro do
+# processamento); milhares de perguntas pendentes custam só um Future cada
+# iniciar_resposta roda numa thread: o cache (SQLite) e a primeira impressão das colunas
+# (Carteira.impressao) bloqueiam, e no laço de eventos parariam todas as outras requisições
+async def aguardar_resposta_async(pergunta, carteira, conversa=None):
+    resposta, futuro = await asyncio.to_thread(iniciar_resposta, pergunta, carteira, conversa)
+    if futuro is not None:
+        # shield: o Future pode ser compartilhado com perguntas iguais de outras requisições, e o
+        # tempo esgotado de uma delas não deve cancelá-lo
+        resposta = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(futuro)), TEMPO_LIMITE_RESPOSTA)
+    historico_conversas.adicionar(conversa, pergunta, resposta["resposta"])
+    return resposta
+
+# Processar o corpo JSON de uma requisição /pergunta: devolve (corpo, status, cabeçalhos)
+# Usada pela view do Flask e pela rota nativa do servidor ASGI (app/asgi.py)
+# A conversa vem no campo "conversa" do JSON ou no cabeçalho X-Conversa; sem ela, não há histórico
+# A carteira vem no campo "carteira" ou no cabeçalho X-Carteira; sem ela, vale a padrão
+async def processar_requisicao_pergunta(dados, conversa=None, nome_carteira=None):
+    dados = dados or {}
+    nome_carteira = dados.get('carteira') or nome_carteira
+    try:
+        # Numa thread: a primeira pergunta de um cliente pode carregar a carteira dele
+        carteira = await asyncio.to_thread(selecionar_carteira, nome_carteira) if nome_carteira else selecionar_carteira()
+    except CarteiraNaoEncontrada as e:
+        return {"erro": str(e)}, 404, {}
+    if carteira is None:
+        return {"erro": "Nenhum arquivo carregado!"}, 400, {}
 
-# Controle de requisições: Limitar 4 por minuto e 100 por dia
-limite_por_minuto = 4
-limite_por_dia = 100
-requisicoes_no_minuto = 0
-requisicoes_no_dia = 0
-ultimo_minuto = time.time()
-ultimo_dia = time.time()
+    pergunta_usuario = dados.get('pergunta', '')
+    conversa = identificar_conversa_http(dados.get('conversa') or conversa, nome_carteira)
 
-# Função para controlar a taxa de requisições
-def controlar_taxa():
-    global requisicoes_no_minuto, requisicoes_no_dia, ultimo_minuto, ultimo_dia
-    
-    agora = time.time()
-
-    # Resetar contador por minuto se necessário
-    if agora - ultimo_minuto >= 60:
-        requisicoes_no_minuto = 0
-        ultimo_minuto = agora
-
-    # Resetar contador por dia se necessário
-    if agora - ultimo_dia >= 86400:
-        requisicoes_no_dia = 0
-        ultimo_dia = agora
-
-    # Verificar se está dentro do limite
-    if requisicoes_no_minuto >= limite_por_minuto:
-        sleep(60 - (agora - ultimo_minuto))  # Aguardar até o próximo minuto
-        requisicoes_no_minuto = 0
-        ultimo_minuto = time.time()
-
-    if requisicoes_no_dia >= limite_por_dia:
-        raise Exception("Limite diário de requisições atingido.")  # Opcional: Retornar erro ou gerenciar de outra forma
-
-    requisicoes_no_minuto += 1
-    requisicoes_no_dia += 1
-
-# Função para processar fila de requisições
-def processar_fila():
-    while True:
-        pergunta, dataframe = fila_de_requisicoes.get()
-        controlar_taxa()  # Controlar a taxa antes de processar a requisição
-        resposta_texto, grafico_data = processar_pergunta(pergunta, dataframe)
-        fila_de_requisicoes.task_done()  # Marcar como finalizada
-        cache.set(pergunta, {"resposta": resposta_texto, "grafico": grafico_data})  # Armazenar no cache
-
-# Iniciar uma thread para processar as requisições na fila
-thread = Thread(target=processar_fila)
-thread.daemon = True
-thread.start()
-
-# Adicionar pergunta na fila
-def adicionar_pergunta_na_fila(pergunta, dataframe):
-    fila_de_requisicoes.put((pergunta, dataframe))
+    if not pergunta_usuario:
+        return {"erro": "Pergunta não fornecida!"}, 400, {}
+
+    # Buscar a resposta no cache ou adicionar a pergunta na fila e aguardar o processamento
+    try:
+        resposta = await aguardar_resposta_async(pergunta_usuario, carteira, conversa)
+    except TimeoutError:
+        return {"erro": "Tempo limite excedido ao processar a pergunta."}, 504, {}
+    except LimiteExcedido as e:
+        return {"erro": str(e)}, 429, {"Retry-After": str(int(e.aguardar) + 1)}
+    except ErroGemini as e:
+        return {"erro": str(e)}, 503, {}
+    except Exception as e:
+        return {"erro": f"Erro ao processar a pergunta: {e}"}, 500, {}
+
+    return resposta, 200, {}
+
+# Gerar a resposta em partes: ('parte', texto) a cada pedaço, ('aguardando', segundos) se o
+# limite do Gemini exigir espera e ('fim', resposta) no final
+# Respostas do cache e das intenções locais saem inteiras, numa única parte; as do Gemini saem
+# à medida que o modelo gera quando o limitador libera a chamada na hora. Sem orçamento, a
+# pergunta vai para a faixa do Gemini, que espera a vez no laço dela (sem sleep nesta thread),
+# e a resposta sai inteira; no servidor ASGI vale responder_em_partes_async
+# Se a mesma pergunta já estiver sendo respondida (aqui ou em outro worker), aguarda aquela
+# resposta pela fila, que a devolve inteira, em vez de chamar o Gemini de novo
+def responder_em_partes(pergunta, carteira, conversa=None):
+    categoria, intencao, historico, chave = preparar_pergunta(pergunta, carteira, conversa)
+    resposta = cache.get(chave) if intencao.cacheavel else None
+    if resposta is None and intencao.funcao_em_partes is not None:
+        try:
+            futuro, _ = reservar_resposta_em_partes(chave, intencao, 0)
+        except LimiteExcedido as e:
+            futuro = None
+            yield 'aguardando', e.aguardar
+        if futuro is not None:
+            try:
+                partes, grafico_data = executar_intencao_em_partes(categoria, intencao, pergunta, carteira, historico)
+                texto = []
+                for parte in partes:
+                    texto.append(parte)
+                    yield 'parte', parte
+                resposta = guardar_resposta(chave, intencao, "".join(texto).strip(), grafico_data)
+            except BaseException as e:
+                encerrar_resposta_em_partes(chave, intencao, futuro, erro=e)
+                raise
+            encerrar_resposta_em_partes(chave, intencao, futuro, resposta)
+            historico_conversas.adicionar(conversa, pergunta, resposta["resposta"])
+            yield 'fim', resposta
+            return
+
+    if resposta is None:
+        prazo = time.monotonic() + TEMPO_LIMITE_RESPOSTA
+        futuro = adicionar_pergunta_na_fila(chave, pergunta, carteira, categoria, intencao, historico, prazo)
+        resposta = futuro.result(timeout=TEMPO_LIMITE_RESPOSTA)
+    historico_conversas.adicionar(conversa, pergunta, resposta["resposta"])
+    yield 'parte', resposta["resposta"]
+    yield 'fim', resposta
+
+# Mesma resposta em partes no laço de eventos (rota nativa do servidor ASGI, app/asgi.py): a
+# espera pelo limite do Gemini é um asyncio.sleep e o cache e cada parte do modelo são lidos numa
+# thread, então uma resposta adiada ou em geração não prende nenhuma thread
+async def responder_em_partes_async(pergunta, carteira, conversa=None):
+    categoria, intencao, historico, chave = await asyncio.to_thread(preparar_pergunta, pergunta, carteira, conversa)
+    resposta = await asyncio.to_thread(cache.get, chave) if intencao.cacheavel else None
+    futuro = None
+    if resposta is None and intencao.funcao_em_partes is not None:
+        futuro, aguardar = await asyncio.to_thread(reservar_resposta_em_partes, chave, intencao, TEMPO_LIMITE_RESPOSTA)
+    if futuro is not None:
+        try:
+            if aguardar > 0:
+                yield 'aguardando', aguardar
+                await asyncio.sleep(aguardar)
+            partes, grafico_data = await asyncio.to_thread(
+                executar_intencao_em_partes, categoria, intencao, pergunta, carteira, historico
+            )
+            texto = []
+            while (parte := await asyncio.to_thread(next, partes, None)) is not None:
+                texto.append(parte)
+                yield 'parte', parte
+            resposta = await asyncio.to_thread(guardar_resposta, chave, intencao, "".join(texto).strip(), grafico_data)
+        except BaseException as e:
+            await asyncio.to_thread(encerrar_resposta_em_partes, chave, intencao, futuro, erro=e)
+            raise
+        await asyncio.to_thread(encerrar_resposta_em_partes, chave, intencao, futuro, resposta)
+        historico_conversas.adicionar(conversa, pergunta, resposta["resposta"])
+        yield 'fim', resposta
+        return
+
+    if resposta is None:
+        prazo = time.monotonic() + TEMPO_LIMITE_RESPOSTA
+        futuro = await asyncio.to_thread(adicionar_pergunta_na_fila, chave, pergunta, carteira, categoria, intencao, historico, prazo)
+        resposta = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(futuro)), TEMPO_LIMITE_RESPOSTA)
+    historico_conversas.adicionar(conversa, pergunta, resposta["resposta"])
+    yield 'parte', resposta["resposta"]
+    yield 'fim', resposta
+
+# Validar uma requisição /pergunta/stream: devolve (pergunta, carteira, conversa, None) ou, com
+# erro, (None, None, None, (corpo, status)); usada pela rota do Flask e pela nativa do ASGI
+def preparar_requisicao_em_partes(dados, conversa=None, nome_carteira=None):
+    dados = dados or {}
+    nome_carteira = dados.get('carteira') or nome_carteira
+    try:
+        carteira = selecionar_carteira(nome_carteira)
+    except CarteiraNaoEncontrada as e:
+        return None, None, None, ({"erro": str(e)}, 404)
+    if carteira is None:
+        return None, None, None, ({"erro": "Nenhum arquivo carregado!"}, 400)
+
+    pergunta_usuario = dados.get('pergunta', '')
+    if not pergunta_usuario:
+        return None, None, None, ({"erro": "Pergunta não fornecida!"}, 400)
+    return pergunta_usuario, carteira, identificar_conversa_http(dados.get('conversa') or conversa, nome_carteira), None
+
+# Evento SSE de cada etapa da resposta em partes (responder_em_partes) e dos erros
+def evento_da_etapa(tipo, conteudo):
+    if tipo == 'parte':
+        return evento_sse('parte', {"texto": conteudo})
+    if tipo == 'aguardando':
+        return evento_sse('aguardando', {"segundos": round(conteudo, 1)})
+    return evento_sse('fim', conteudo)
+
+def evento_de_erro(erro):
+    if isinstance(erro, TimeoutError):
+        return evento_sse('erro', {"erro": "Tempo limite excedido ao processar a pergunta."})
+    if isinstance(erro, LimiteExcedido):
+        return evento_sse('erro', {"erro": str(erro), "aguardar": round(erro.aguardar)})
+    if isinstance(erro, ErroGemini):
+        return evento_sse('erro', {"erro": str(erro)})
+    return evento_sse('erro', {"erro": f"Erro ao processar a pergunta: {erro}"})
+
+# Identificação da conversa de um cliente HTTP (prefixada para não colidir com os chats do Telegram)
+# A carteira faz parte da identificação: a mesma conversa em outra carteira não mistura histórico
+def identificar_conversa_http(conversa, nome_carteira=None):
+    if not conversa:
+        return None
+    return f"http:{nome_carteira}:{conversa}" if nome_carteira else f"http:{conversa}"
+
+# Carteira da pergunta: a do cliente indicado (levanta CarteiraNaoEncontrada) ou a padrão
+# A primeira pergunta de um cliente pode carregar a carteira dele (do snapshot, quando existe)
+def selecionar_carteira(nome_carteira=None):
+    if nome_carteira:
+        return registro_carteiras.obter(nome_carteira)
+    return recarregador_carteira.atual
+
+# Identificação da conversa de um chat do Telegram
+def identificar_conversa_telegram(update):
+    return f"telegram:{update.effective_chat.id}" if update.effective_chat else None
+
+# Função para formatar um evento SSE (text/event-stream)
+def evento_sse(tipo, dados):
+    return f"event: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False, default=str)}\n\n"
 
 # Função para iniciar o bot do Telegram
 def start(update: Update, context: CallbackContext) -> None:
     update.message.reply_text('Bem-vindo! Como posso facilitar seu dia hoje?\nFaça uma pergunta, como: Quantos processos ativos citam minha empresa?')
 
 def handle_message(update: Update, context: CallbackContext) -> None:
-    global df
-    if df is None:
+    # Chats associados a um cliente (CARTEIRAS_TELEGRAM) usam a carteira dele; os demais, a padrão
+    try:
+        carteira = selecionar_carteira(registro_carteiras.carteira_do_chat(update.effective_chat.id) if update.effective_chat else None)
+    except CarteiraNaoEncontrada:
+        carteira = None
+    if carteira is None:
         update.message.reply_text('Nenhum arquivo carregado!')
         return
 
@@ -101,36 +432,95 @@ def handle_message(update: Update, context: CallbackContext) -> None:
         update.message.reply_text('Pergunta não fornecida!')
         return
 
-    # Verificar se a resposta está no cache
-    resposta_cache = cache.get(pergunta_usuario)
-    
-    if resposta_cache:
-        update.message.reply_text(resposta_cache["resposta"])
+    conversa = identificar_conversa_telegram(update)
+    if RESPOSTAS_EM_PARTES_TELEGRAM and resolver_intencao(pergunta_usuario)[1].funcao_em_partes is not None:
+        faixa_telegram_em_partes.enviar(lambda: responder_telegram_em_partes(update, pergunta_usuario, carteira, conversa))
         return
 
-    # Adicionar a pergunta na fila para processamento
-    adicionar_pergunta_na_fila(pergunta_usuario, df)
-    
-    # Aguarda a fila processar a pergunta
-    while not cache.get(pergunta_usuario):
-        sleep(1)  # Aguarda o processamento da fila
-    
-    # Retorna a resposta do cache após o processamento
-    resposta_cache = cache.get(pergunta_usuario)
-    update.message.reply_text(resposta_cache["resposta"])
+    # Buscar a resposta no cache ou adicionar a pergunta na fila; a resposta é enviada quando
+    # o Future terminar, sem segurar o webhook
+    try:
+        resposta, futuro = iniciar_resposta(pergunta_usuario, carteira, conversa)
+    except Exception:
+        update.message.reply_text('Desculpe, não consegui processar sua pergunta.')
+        return
+
+    if futuro is None:
+        historico_conversas.adicionar(conversa, pergunta_usuario, resposta["resposta"])
+        update.message.reply_text(resposta["resposta"])
+        return
+    futuro.add_done_callback(
+        lambda futuro: faixa_telegram.enviar(lambda: entregar_resposta_telegram(update, futuro, pergunta_usuario, conversa))
+    )
+
+# Função executada pela faixa do Telegram: enviar a resposta (ou o erro) de uma pergunta já processada
+def entregar_resposta_telegram(update, futuro, pergunta_usuario, conversa):
+    try:
+        resposta = futuro.result()
+    except TimeoutError:
+        update.message.reply_text('A pergunta demorou demais para ser respondida. Tente novamente em instantes.')
+        return
+    except LimiteExcedido as e:
+        update.message.reply_text(f'Muitas perguntas no momento. Tente novamente em {max(1, round(e.aguardar / 60))} minuto(s).')
+        return
+    except ErroGemini as e:
+        update.message.reply_text(str(e))
+        return
+    except Exception:
+        update.message.reply_text('Desculpe, não consegui processar sua pergunta.')
+        return
+
+    historico_conversas.adicionar(conversa, pergunta_usuario, resposta["resposta"])
+    update.message.reply_text(resposta["resposta"])
+
+# Responder pelo Telegram com uma mensagem provisória, editada conforme as partes chegam
+# (no máximo uma edição por INTERVALO_EDICAO_TELEGRAM, por causa dos limites da API do Telegram)
+# Corrotina da faixa do Telegram em partes: as partes vêm de responder_em_partes_async e cada
+# chamada à API do Telegram vai para uma thread e volta logo; a espera pelo limitador e por uma
+# pergunta igual já em andamento não ocupa thread nenhuma
+async def responder_telegram_em_partes(update, pergunta_usuario, carteira, conversa):
+    mensagem = await asyncio.to_thread(update.message.reply_text, 'Pensando...')
+    texto, enviado, ultima_edicao = "", "", 0.0
+    try:
+        async for tipo, conteudo in responder_em_partes_async(pergunta_usuario, carteira, conversa):
+            if tipo == 'parte':
+                texto += conteudo
+            elif tipo == 'fim':
+                texto = conteudo["resposta"]
+            else:
+                continue
+            if tipo == 'fim' or time.monotonic() - ultima_edicao >= INTERVALO_EDICAO_TELEGRAM:
+                atual = texto.strip()[:LIMITE_MENSAGEM_TELEGRAM]
+                if atual and atual != enviado:
+                    await asyncio.to_thread(mensagem.edit_text, atual)
+                    enviado, ultima_edicao = atual, time.monotonic()
+    except TimeoutError:
+        await asyncio.to_thread(mensagem.edit_text, 'A pergunta demorou demais para ser respondida. Tente novamente em instantes.')
+    except LimiteExcedido as e:
+        await asyncio.to_thread(mensagem.edit_text, f'Muitas perguntas no momento. Tente novamente em {max(1, round(e.aguardar / 60))} minuto(s).')
+    except ErroGemini as e:
+        # O que já chegou continua na mensagem, seguido do aviso
+        await asyncio.to_thread(mensagem.edit_text, f"{texto.strip()}\n\n{e}".strip()[-LIMITE_MENSAGEM_TELEGRAM:])
+    except Exception:
+        logging.exception("Erro ao responder em partes pelo Telegram")
+        await asyncio.to_thread(mensagem.edit_text, 'Desculpe, não consegui processar sua pergunta.')
 
 # Registrar os handlers no dispatcher
 dispatcher.add_handler(CommandHandler('start', start))
 dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_message))
 
-# Rota para receber as atualizações do webhook do Telegram
-@main.route('/telegram_webhook', methods=['POST'])
-def telegram_webhook():
-    update = Update.de_json(request.get_json(force=True), bot)
+# Função para processar uma atualização do Telegram: os handlers só enfileiram a pergunta,
+# então o webhook responde na hora (rota do Flask e rota nativa do servidor ASGI)
+def processar_atualizacao_telegram(dados):
+    update = Update.de_json(dados, bot)
     
     # Processar a atualização com o dispatcher
     dispatcher.process_update(update)
-    
+
+# Rota para receber as atualizações do webhook do Telegram
+@main.route('/telegram_webhook', methods=['POST'])
+def telegram_webhook():
+    processar_atualizacao_telegram(request.get_json(force=True))
     return 'ok'
 
 # Função para configurar e iniciar o webhook do Telegram
@@ -142,34 +532,107 @@ def iniciar_bot_telegram(token, webhook_url):
 def tela_inicial():
     return jsonify({"mensagem": "Bem-vindo à tela inicial!"}), 200
 
-# Rota para processar perguntas via HTTP
+# Rota com as métricas das filas de processamento
+@main.route('/metricas', methods=['GET'])
+def metricas():
+    return jsonify({
+        "faixas": {faixa.nome: faixa.metricas() for faixa in (faixa_local, faixa_gemini, faixa_espera, faixa_telegram, faixa_telegram_em_partes, faixa_importacao)},
+        "perguntas_em_andamento": len(perguntas_em_andamento),
+        "limite_gemini": limitador_gemini.metricas(),
+        "intencoes": obter_estatisticas_intencoes(),
+        "prompts_gemini": obter_estatisticas_prompt(),
+        "historico": historico_conversas.metricas(),
+        "carteira": recarregador_carteira.metricas(),
+        "carteiras": registro_carteiras.metricas(),
+        "cache": cache.cache.metricas() if hasattr(cache.cache, 'metricas') else None,
+    }), 200
+
+# Rota para pedir a recarga da carteira (ex.: ao final da exportação do sistema de processos)
+# A carga acontece em segundo plano: a resposta é imediata e as perguntas continuam sendo
+# atendidas pela versão atual até a troca; o andamento aparece em /metricas ("carteira")
+# Com vários workers, cada um verifica a fonte no seu próprio intervalo (INTERVALO_RECARGA)
+@main.route('/recarregar', methods=['POST'])
+def recarregar():
+    recarregador_carteira.pedir_recarga()
+    return jsonify({"mensagem": "Recarga da carteira solicitada.", "carteira": recarregador_carteira.metricas()}), 202
+
+# Rota para enviar uma nova exportação da carteira (xlsx ou CSV) e publicá-la sem reiniciar
+# Aceita multipart (campo "arquivo") ou o arquivo direto no corpo (?nome=Processos.xlsx); o
+# parâmetro "carteira" (ou X-Carteira) escolhe a carteira de um cliente, sem ele a importação
+# substitui a carteira padrão. O arquivo é gravado em blocos em UPLOAD_FOLDER e importado em
+# segundo plano: a resposta (202) traz o id para acompanhar em /carteira/importar/<id>
+@main.route('/carteira/importar', methods=['POST'])
+def importar_carteira():
+    if request.content_length and request.content_length > UPLOAD_MAX_MB * 2**20:
+        return jsonify({"erro": f"Arquivo maior que o limite de {UPLOAD_MAX_MB} MB"}), 413
+
+    nome_carteira = request.args.get('carteira') or request.form.get('carteira') or request.headers.get('X-Carteira')
+    # O arquivo enviado vai para a fonte que os recarregadores acompanham: a pasta da carteira ou,
+    # sem CARTEIRA_PASTA, o próprio CARTEIRA_ARQUIVO (que só aceita o mesmo formato); assim a
+    # importação vale nos outros workers e após reiniciar
+    arquivo_destino, extensoes = None, EXTENSOES_SUPORTADAS
+    try:
+        if nome_carteira:
+            pasta_destino = registro_carteiras.pasta_da_carteira(nome_carteira)
+            publicar = lambda carteira, inicio: registro_carteiras.publicar(nome_carteira, carteira, inicio)
+            atual = lambda: registro_carteiras.carregada(nome_carteira)
+        else:
+            pasta_destino = CARTEIRA_PASTA
+            if not CARTEIRA_PASTA:
+                arquivo_destino = CARTEIRA_ARQUIVO
+                extensoes = (os.path.splitext(CARTEIRA_ARQUIVO)[1].lower(),)
+            publicar = recarregador_carteira.publicar
+            atual = lambda: recarregador_carteira.atual
+
+        arquivo = request.files.get('arquivo')
+        fluxo, nome_arquivo = (arquivo.stream, arquivo.filename) if arquivo else (request.stream, request.args.get('nome'))
+        estado, caminho = receber_upload(fluxo, nome_arquivo, UPLOAD_MAX_MB * 2**20, nome_carteira, extensoes)
+    except UploadGrandeDemais as e:
+        return jsonify({"erro": str(e)}), 413
+    except (ValueError, CarteiraNaoEncontrada) as e:
+        return jsonify({"erro": str(e)}), 400
+
+    # A carteira em uso é consultada quando a importação começa (base da carga incremental)
+    faixa_importacao.enviar(lambda: importar(estado, caminho, pasta_destino, publicar, atual(), arquivo_destino))
+    return jsonify(estado), 202, {"Location": f"/carteira/importar/{estado['id']}"}
+
+# Rota para acompanhar uma importação: estado ('recebido', 'lendo', 'publicando', 'concluido'
+# ou 'erro'), progresso (0 a 1) e linhas lidas
+@main.route('/carteira/importar/<importacao_id>', methods=['GET'])
+def acompanhar_importacao(importacao_id):
+    estado = obter_importacao(importacao_id)
+    if estado is None:
+        return jsonify({"erro": "Importação não encontrada."}), 404
+    return jsonify(estado), 200
+
+# Rota para processar perguntas via HTTP (view assíncrona: a espera é um await)
+# No servidor ASGI (asgi.py) esta rota é atendida direto no laço de eventos, sem thread por pergunta
 @main.route('/pergunta', methods=['POST'])
-def pergunta():
-    global df
-    if df is None:
-        return jsonify({"erro": "Nenhum arquivo carregado!"}), 400
-
-    dados = request.get_json()
-    pergunta_usuario = dados.get('pergunta', '')
-
-    if not pergunta_usuario:
-        return jsonify({"erro": "Pergunta não fornecida!"}), 400
-
-    # Verificar se a resposta para essa pergunta já está no cache
-    resposta_cache = cache.get(pergunta_usuario)
-    
-    if resposta_cache:
-        # Retornar a resposta do cache
-        return jsonify(resposta_cache)
-
-    # Adicionar a pergunta na fila para processamento
-    adicionar_pergunta_na_fila(pergunta_usuario, df)
-    
-    # Aguarda a fila processar a pergunta
-    while not cache.get(pergunta_usuario):
-        sleep(1)  # Aguarda o processamento da fila
-    
-    # Retorna a resposta do cache após o processamento
-    resposta_cache = cache.get(pergunta_usuario)
-    return jsonify(resposta_cache)
-
+async def pergunta():
+    corpo, status, cabecalhos = await processar_requisicao_pergunta(
+        request.get_json(), request.headers.get('X-Conversa'), request.headers.get('X-Carteira')
+    )
+    return jsonify(corpo), status, cabecalhos
+
+# Rota para processar perguntas com a resposta em partes (server-sent events)
+# Eventos: "aguardando" (limite do Gemini), "parte" ({"texto"}), "fim" (resposta completa,
+# como em /pergunta) ou "erro"; aceita POST com JSON ou GET ?pergunta= (EventSource)
+# No servidor ASGI (asgi.py) esta rota é atendida direto no laço de eventos
+@main.route('/pergunta/stream', methods=['GET', 'POST'])
+def pergunta_em_partes():
+    pergunta_usuario, carteira, conversa, erro = preparar_requisicao_em_partes(
+        request.get_json(silent=True) or request.args, request.headers.get('X-Conversa'), request.headers.get('X-Carteira')
+    )
+    if erro is not None:
+        return jsonify(erro[0]), erro[1]
+
+    def eventos():
+        try:
+            for tipo, conteudo in responder_em_partes(pergunta_usuario, carteira, conversa):
+                yield evento_da_etapa(tipo, conteudo)
+        except Exception as e:
+            yield evento_de_erro(e)
+
+    # Sem buffer no proxy (nginx) para que cada parte chegue assim que for gerada
+    return Response(stream_with_context(eventos()), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,142 @@
+# snapshot.py
+import glob
+import hashlib
+import json
+import logging
+import os
+
+from config import SNAPSHOT_FOLDER
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None  # Sem pyarrow a carga sempre volta para o Excel
+
+# Alterar sempre que a normalização em ingestao.py mudar, para invalidar os snapshots antigos
+VERSAO_SNAPSHOT = 4
+
+# Coluna extra do snapshot com a impressão digital de cada linha bruta (app/delta.py)
+COLUNA_IMPRESSAO = '__impressao_linha'
+
+
+# Função para calcular a assinatura (sha256) do arquivo de origem
+# Os metadados de mtime e tamanho evitam reler o arquivo quando ele não mudou
+def assinatura_arquivo(caminho):
+    estatisticas = os.stat(caminho)
+    caminho_meta = _caminho_snapshot(caminho, 'json')
+
+    try:
+        with open(caminho_meta) as arquivo_meta:
+            meta = json.load(arquivo_meta)
+        if meta['mtime'] == estatisticas.st_mtime_ns and meta['tamanho'] == estatisticas.st_size:
+            return meta['sha256']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    sha256 = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            sha256.update(bloco)
+    return sha256.hexdigest()
+
+
+# Função para ler o snapshot binário (Arrow/Feather) do arquivo, se estiver atualizado
+# Devolve (dados, impressões das linhas) ou None
+def ler_snapshot(caminho, assinatura):
+    if feather is None:
+        return None
+
+    caminho_meta = _caminho_snapshot(caminho, 'json')
+    caminho_dados = _caminho_snapshot(caminho, 'feather')
+    try:
+        with open(caminho_meta) as arquivo_meta:
+            meta = json.load(arquivo_meta)
+        if meta['sha256'] != assinatura or meta['versao'] != VERSAO_SNAPSHOT:
+            return None
+
+        # memory_map + split_blocks: colunas numéricas sem nulos ficam apontando para o arquivo
+        # mapeado, que é compartilhado entre os workers pelo cache de páginas do sistema
+        tabela = feather.read_table(caminho_dados, memory_map=True)
+        impressoes = None
+        if COLUNA_IMPRESSAO in tabela.column_names:
+            impressoes = tabela.column(COLUNA_IMPRESSAO).to_numpy()
+            tabela = tabela.drop([COLUNA_IMPRESSAO])
+        return tabela.to_pandas(split_blocks=True), impressoes
+    except FileNotFoundError:
+        return None  # Primeira carga deste arquivo
+    except (OSError, ValueError, KeyError) as e:
+        logging.warning(f"Snapshot de {caminho} ignorado: {e}")
+        return None
+
+
+# Função para gravar o snapshot após a primeira leitura do Excel (com as impressões das linhas, se houver)
+def gravar_snapshot(dataframe, caminho, assinatura, impressoes=None):
+    if feather is None:
+        return
+
+    estatisticas = os.stat(caminho)
+    caminho_meta = _caminho_snapshot(caminho, 'json')
+    caminho_dados = _caminho_snapshot(caminho, 'feather')
+    meta = {
+        'sha256': assinatura,
+        'mtime': estatisticas.st_mtime_ns,
+        'tamanho': estatisticas.st_size,
+        'versao': VERSAO_SNAPSHOT,
+    }
+
+    try:
+        os.makedirs(SNAPSHOT_FOLDER, exist_ok=True)
+        # Gravar em arquivos temporários e trocar de forma atômica (vários workers podem gravar ao mesmo tempo)
+        sufixo = f".{os.getpid()}.tmp"
+        dataframe = dataframe.reset_index(drop=True)
+        if impressoes is not None:
+            dataframe = dataframe.assign(**{COLUNA_IMPRESSAO: impressoes})
+        feather.write_feather(dataframe, caminho_dados + sufixo, compression='uncompressed')
+        with open(caminho_meta + sufixo, 'w') as arquivo_meta:
+            json.dump(meta, arquivo_meta)
+        os.replace(caminho_dados + sufixo, caminho_dados)
+        os.replace(caminho_meta + sufixo, caminho_meta)
+    except Exception as e:
+        logging.warning(f"Não foi possível gravar o snapshot de {caminho}: {e}")
+
+
+# Função para ler um texto derivado da planilha (ex.: a tabela serializada para o Gemini)
+# O nome do arquivo inclui a assinatura: outra versão dos dados simplesmente não o encontra
+def ler_texto_snapshot(caminho, assinatura, extensao):
+    try:
+        with open(_caminho_versionado(caminho, assinatura, extensao), encoding='utf-8') as arquivo:
+            return arquivo.read()
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f"Texto {extensao} de {caminho} ignorado: {e}")
+        return None
+
+
+# Função para gravar um texto derivado da planilha, removendo os de versões anteriores
+def gravar_texto_snapshot(texto, caminho, assinatura, extensao):
+    destino = _caminho_versionado(caminho, assinatura, extensao)
+    try:
+        os.makedirs(SNAPSHOT_FOLDER, exist_ok=True)
+        temporario = f"{destino}.{os.getpid()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto)
+        os.replace(temporario, destino)
+
+        for antigo in glob.glob(_caminho_snapshot(caminho, f"*.{extensao}")):
+            if antigo != destino:
+                os.remove(antigo)
+    except Exception as e:
+        logging.warning(f"Não foi possível gravar o texto {extensao} de {caminho}: {e}")
+
+
+def _caminho_versionado(caminho, assinatura, extensao):
+    return _caminho_snapshot(caminho, f"{assinatura[:16]}.v{VERSAO_SNAPSHOT}.{extensao}")
+
+
+# O nome inclui um resumo da pasta de origem: carteiras de clientes diferentes costumam ter
+# exportações com o mesmo nome de arquivo (app/registro_carteiras.py)
+def _caminho_snapshot(caminho, extensao):
+    nome = os.path.splitext(os.path.basename(caminho))[0]
+    pasta = hashlib.sha1(os.path.dirname(os.path.abspath(caminho)).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(SNAPSHOT_FOLDER, f"{nome}-{pasta}.{extensao}")
@@ -0,0 +1,99 @@
+# somente_leitura.py
+import functools
+
+import pandas as pd
+
+MENSAGEM_SOMENTE_LEITURA = (
+    "Os dados da carteira são somente leitura (compartilhados entre as requisições); "
+    "use .copy() para obter uma cópia alterável ou calcule a coluna em app/ingestao.py"
+)
+
+
+# Indexadores (.loc, .iloc, .at, .iat) que permitem leitura mas recusam atribuição
+class _IndexadorSomenteLeitura:
+    def __init__(self, indexador):
+        self._indexador = indexador
+
+    def __getitem__(self, chave):
+        return self._indexador[chave]
+
+    def __setitem__(self, chave, valor):
+        raise TypeError(MENSAGEM_SOMENTE_LEITURA)
+
+    def __call__(self, *args, **kwargs):
+        return _IndexadorSomenteLeitura(self._indexador(*args, **kwargs))
+
+
+# Métodos que trocam os rótulos da própria tabela com inplace=True (rename, set_index...): alguns
+# atribuem o eixo antes de passar por _update_inplace, então a escrita é recusada já na chamada
+def _sem_inplace(metodo):
+    @functools.wraps(metodo)
+    def chamar(self, *args, inplace=False, **kwargs):
+        if inplace:
+            raise TypeError(MENSAGEM_SOMENTE_LEITURA)
+        return metodo(self, *args, **kwargs)
+    return chamar
+
+
+# DataFrame da carteira: qualquer escrita levanta TypeError
+# Filtros, seleções e cópias devolvem DataFrames comuns, que os handlers podem alterar à vontade
+class DataFrameSomenteLeitura(pd.DataFrame):
+    _metadata = []
+
+    @property
+    def _constructor(self):
+        return pd.DataFrame
+
+    def _recusar(self, *args, **kwargs):
+        raise TypeError(MENSAGEM_SOMENTE_LEITURA)
+
+    __setitem__ = _recusar
+    __delitem__ = _recusar
+    insert = _recusar
+    pop = _recusar
+    update = _recusar
+    _update_inplace = _recusar
+
+    rename = _sem_inplace(pd.DataFrame.rename)
+    set_index = _sem_inplace(pd.DataFrame.set_index)
+    reset_index = _sem_inplace(pd.DataFrame.reset_index)
+    sort_index = _sem_inplace(pd.DataFrame.sort_index)
+    set_axis = _sem_inplace(pd.DataFrame.set_axis)
+
+    def __setattr__(self, nome, valor):
+        # df.coluna = valor também altera os dados, e df.columns/df.index trocam os rótulos;
+        # atributos internos do pandas continuam liberados
+        if nome in ('columns', 'index') or (not nome.startswith('_') and nome in self.columns):
+            raise TypeError(MENSAGEM_SOMENTE_LEITURA)
+        super().__setattr__(nome, valor)
+
+    @property
+    def loc(self):
+        return _IndexadorSomenteLeitura(super().loc)
+
+    @property
+    def iloc(self):
+        return _IndexadorSomenteLeitura(super().iloc)
+
+    @property
+    def at(self):
+        return _IndexadorSomenteLeitura(super().at)
+
+    @property
+    def iat(self):
+        return _IndexadorSomenteLeitura(super().iat)
+
+
+# Função para congelar o DataFrame normalizado antes de compartilhá-lo entre as requisições
+# Os arrays numpy por baixo também ficam somente leitura, o que pega escritas feitas
+# através de Series (dados['Coluna'][0] = ...) e de .values
+def congelar(dataframe):
+    congelado = DataFrameSomenteLeitura(dataframe, copy=False)
+    for bloco in congelado._mgr.blocks:
+        valores = getattr(bloco.values, '_ndarray', bloco.values)
+        try:
+            valores.flags.writeable = False
+        except (AttributeError, ValueError):
+            # Extension arrays sem ndarray exposto ficam protegidos apenas pela classe
+            pass
+    return congelado
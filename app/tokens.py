@@ -0,0 +1,67 @@
+# tokens.py
+import math
+import re
+from functools import lru_cache
+from threading import Lock
+
+# Aproximação offline do tokenizador do Gemini (SentencePiece), que:
+# - quebra números em dígitos (um token por dígito: tabelas de valores e CNJs custam caro)
+# - em português, divide as palavras em pedaços de ~4 caracteres (acentos quebram mais)
+# - trata cada sinal de pontuação/símbolo como um token; espaços vêm junto com a palavra
+PADRAO_PEDACOS = re.compile(r"\d|[^\W\d_]+|[^\w\s]|_")
+CARACTERES_POR_TOKEN = 4
+CARACTERES_POR_TOKEN_ACENTUADO = 3
+
+# Limites do fator de calibração (contagem real da API / estimativa), para que uma resposta
+# estranha da API não derrube o orçamento
+FATOR_MINIMO = 0.5
+FATOR_MAXIMO = 3.0
+PESO_CALIBRACAO = 0.2  # Média móvel exponencial: peso de cada nova medição
+
+
+@lru_cache(maxsize=512)
+def _contar_bruto(texto):
+    tokens = 0
+    for pedaco in PADRAO_PEDACOS.findall(texto):
+        if len(pedaco) == 1:
+            tokens += 1
+        elif pedaco.isascii():
+            tokens += math.ceil(len(pedaco) / CARACTERES_POR_TOKEN)
+        else:
+            tokens += math.ceil(len(pedaco) / CARACTERES_POR_TOKEN_ACENTUADO)
+    return tokens
+
+
+# Contador de tokens calibrado: a estimativa offline é corrigida pelo fator aprendido com as
+# contagens reais que a API devolve em cada resposta (usage_metadata.prompt_token_count)
+class ContadorTokens:
+    def __init__(self, fator=1.0):
+        self.fator = fator
+        self.calibracoes = 0
+        self._trava = Lock()
+
+    def estimar(self, texto):
+        return math.ceil(_contar_bruto(texto) * self.fator) if texto else 0
+
+    def calibrar(self, texto, tokens_reais):
+        bruto = _contar_bruto(texto)
+        if not bruto or not tokens_reais:
+            return
+        medido = min(FATOR_MAXIMO, max(FATOR_MINIMO, tokens_reais / bruto))
+        with self._trava:
+            self.fator = medido if self.calibracoes == 0 else (1 - PESO_CALIBRACAO) * self.fator + PESO_CALIBRACAO * medido
+            self.calibracoes += 1
+
+    # Manter as primeiras linhas do texto que cabem no orçamento; devolve (texto, linhas mantidas)
+    def cortar_linhas(self, texto, orcamento):
+        mantidas, usados = [], 0
+        for linha in texto.split("\n"):
+            custo = self.estimar(linha) + 1  # + quebra de linha
+            if usados + custo > orcamento:
+                break
+            mantidas.append(linha)
+            usados += custo
+        return "\n".join(mantidas), len(mantidas)
+
+
+contador_tokens = ContadorTokens()
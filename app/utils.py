@@ -1,208 +1,158 @@
 #utils.py
-import pandas as pd
-import os
-import google.generativeai as genai
-from ratelimit import limits, sleep_and_retry
-from app.functions_ import *
+import hashlib
+import json
+import time
 import unicodedata
 from app.map import categoria_perguntas
+from app.classificador import ClassificadorIntencoes, normalizar_pergunta
+from app.leitura_planilha import ler_planilha, ler_planilha_com_impressoes
+from app.snapshot import assinatura_arquivo, ler_snapshot, gravar_snapshot
+from app.carteira import Carteira
+from app.delta import atualizar_carteira
+from app.intencoes import intencoes, INTENCAO_GEMINI, INTENCAO_SAUDACAO, registrar_execucao
+from config import INGESTAO_INCREMENTAL
+
+# Saudações respondidas sem consultar os dados
+SAUDACOES = ["olá", "como você está", "oi", "bom dia", "boa tarde", "boa noite", "tudo bem"]
+
+# Função para carregar e preparar os dados do Excel (ou CSV), lidos em blocos (app/leitura_planilha.py)
+# Toda a limpeza (moeda, datas, textos e categorias) acontece aqui, uma única vez
+def carregar_dados(file, progresso=None):
+    return ler_planilha(file, progresso)
+
+# Função para carregar a carteira usando o snapshot binário quando o Excel não mudou
+# A versão (assinatura do arquivo) pode vir já calculada, como no recarregador (app/recarga.py)
+# Com a carteira anterior (recarga ou importação de uma exportação nova), só as linhas que mudaram
+# são normalizadas de novo (app/delta.py)
+def carregar_carteira(file, versao=None, anterior=None):
+    versao = versao or assinatura_arquivo(file)
+    snapshot = ler_snapshot(file, versao)
+    if snapshot is not None:
+        df, impressoes = snapshot
+        return Carteira(df, versao, file, impressoes)
+    carteira = montar_carteira(file, versao, anterior=anterior)
+    gravar_snapshot(carteira.dados, file, versao, carteira.impressoes_linhas)
+    return carteira
+
+# Função para montar a carteira lendo a planilha: incremental quando há uma carteira anterior
+# (com as impressões das linhas) e INGESTAO_INCREMENTAL está ligada; senão, carga completa
+def montar_carteira(file, versao, origem=None, anterior=None, progresso=None):
+    if INGESTAO_INCREMENTAL and anterior is not None and anterior.impressoes_linhas is not None:
+        return atualizar_carteira(anterior, file, versao, origem, progresso)
+    df, impressoes = ler_planilha_com_impressoes(file, progresso)
+    return Carteira(df, versao, origem or file, impressoes)
 
+# Função para remover acentos de uma string
+def remover_acentos(texto):
+    return ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
 
-historico_conversa = []
-
-# Função para carregar e preparar os dados do Excel
-def carregar_dados(file):
-    df = pd.read_excel(file)
 
-    # Converter colunas que são datas para o formato datetime
-    colunas_data = ['Data de distribuição', 'Data de cadastro', 'Data de citação']
-    
-    for coluna in colunas_data:
-        if coluna in df.columns:
-            df[coluna] = pd.to_datetime(df[coluna], format='%d/%m/%Y', errors='coerce')
-    
-    return df
 
-# Função para normalizar a pergunta, removendo acentos e pontuações
-def normalizar_pergunta(pergunta):
-    # Remover acentos
-    pergunta = ''.join(
-        c for c in unicodedata.normalize('NFD', pergunta) if unicodedata.category(c) != 'Mn'
-    )
-    # Remover pontuações
-    pergunta = re.sub(r'[^\w\s]', '', pergunta)
-    return pergunta.lower().strip()
+# Toda categoria de app/map.py precisa de uma função em app/intencoes.py
+categorias_sem_funcao = set(categoria_perguntas) - set(intencoes)
+if categorias_sem_funcao:
+    raise RuntimeError(f"Categorias sem função registrada em app/intencoes.py: {sorted(categorias_sem_funcao)}")
 
-# Função para remover acentos de uma string
-def remover_acentos(texto):
-    return ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+# Classificador de intenções montado uma única vez, na importação
+classificador_intencoes = ClassificadorIntencoes(categoria_perguntas)
 
+# Função para identificar a categoria da pergunta (já normalizada); None quando nenhuma se aplica
+def identificar_categoria(pergunta_normalizada):
+    return classificador_intencoes.classificar(pergunta_normalizada)
 
+# Função para verificar se a pergunta (já normalizada) é apenas uma saudação
+def e_saudacao(pergunta_normalizada):
+    return any(saudacao in pergunta_normalizada for saudacao in SAUDACOES)
 
-def processar_pergunta(pergunta, dataframe):
-    # Normalizar a pergunta para lidar com acentos, pontuação e maiúsculas
+# Função para identificar a intenção da pergunta: (categoria, Intencao)
+# A categoria é 'saudacao' para cumprimentos e None quando a pergunta vai direto para o Gemini
+def resolver_intencao(pergunta):
     pergunta_normalizada = normalizar_pergunta(pergunta)
-    
-    # Verificar se a pergunta é conversacional
-    greetings = ["olá", "como você está", "oi", "bom dia", "boa tarde", "boa noite", "tudo bem"]
-    if any(greeting in pergunta_normalizada.lower() for greeting in greetings):
-        resposta_texto = "Como posso te ajudar hoje?"
-        historico_conversa.append({"Usuário": pergunta, "TIAGO": resposta_texto})
-        return resposta_texto, {}
-
-    for categoria, padroes in categoria_perguntas.items():
-        for padrao in padroes:
-            if re.search(padrao, pergunta_normalizada, re.IGNORECASE):
-                # Chamar a função apropriada com base na categoria identificada
-                if categoria == 'valor_total_acordos':
-                    return processar_valor_acordo(dataframe)
-                elif categoria == 'valor_condenacao_estado':
-                    return processar_valor_condenacao_por_estado(dataframe)
-                elif categoria == 'estado_maior_valor_causa':
-                    return processar_maior_valor_causa_por_estado(dataframe)
-                elif categoria == 'estado_maior_media_valor_causa':
-                    return processar_media_valor_causa_por_estado(dataframe)
-                elif categoria == 'divisao_resultados_processos':
-                    return processar_sentenca(dataframe, pergunta)
-                elif categoria == 'transitaram_julgado':
-                    return processar_transito_julgado(dataframe)
-                elif categoria == 'quantidade_processos_estado':
-                    return processar_quantidade_processos_por_estado(dataframe)
-                elif categoria == 'quantidade_total_processos':
-                    return processar_quantidade_processos(dataframe)
-                elif categoria == 'valor_total_causa':
-                    return processar_valor_total_causa(dataframe)
-                elif categoria == 'processos_ativos':
-                    return processar_status(pergunta, dataframe, "ativo")
-                elif categoria == 'processos_arquivados':
-                    return processar_status(pergunta, dataframe, "arquivado")
-                elif categoria == 'quantidade_recursos':
-                    return processar_quantidade_recursos(dataframe)
-                elif categoria == 'sentencas':
-                    return processar_sentenca(dataframe, pergunta)
-                elif categoria == 'assuntos_recorrentes':
-                    return processar_assuntos_recorrentes(dataframe)
-                elif categoria == 'tribunal_acoes_convencoes':
-                    return processar_tribunal_acoes_convenções(dataframe)
-                elif categoria == 'rito_sumarisimo':
-                    return processar_rito(dataframe)
-                elif categoria == 'divisao_fase':
-                    return processar_fase(dataframe)
-                elif categoria == 'reclamantes_multiplos':
-                    return processar_reclamantes_multiplos(dataframe)
-                elif categoria == 'estado_mais_ofensor':
-                    return processar_estado_mais_ofensor(dataframe)
-                elif categoria == 'comarca_mais_ofensora':
-                    return processar_comarca_mais_preocupante(dataframe)
-                elif categoria == 'melhor_estrategia':
-                    return consultar_gemini_conversacional(pergunta, dataframe), "Essa pergunta envolve uma análise mais detalhada e política de acordo. Por favor, entre em contato com o setor responsável."
-                elif categoria == 'beneficio_economico_carteira':
-                    return consultar_gemini_conversacional(pergunta, dataframe), "Para calcular o benefício econômico, subtraia o valor da condenação do valor da causa."
-                elif categoria == 'beneficio_economico_estado':
-                    return consultar_gemini_conversacional(pergunta, dataframe), "Para calcular o benefício econômico por estado, subtraia o valor da condenação pelo valor da causa em cada estado."
-                elif categoria == 'idade_carteira':
-                    return consultar_gemini_conversacional(pergunta, dataframe), "Para determinar a idade da carteira, consulte os dados de abertura e finalização dos processos."
-                elif categoria == 'maior_media_duracao_estado':
-                    return processar_media_duracao_por_estado(dataframe)
-                elif categoria == 'maior_media_duracao_comarca':
-                    return processar_media_duracao_por_comarca(dataframe)
-                elif categoria == 'processos_improcedentes':
-                    return processar_sentencas_improcedentes(dataframe)
-                elif categoria == 'processos_procedentes':
-                    return processar_sentencas_procedentes(dataframe)
-                elif categoria == 'processos_extintos_sem_custos':
-                    return processar_sentencas_extinto_sem_custos(dataframe)
-                elif categoria == 'processo_maior_tempo_sem_movimentacao':
-                    return processar_maior_tempo_sem_movimentacao(dataframe)
-                elif categoria == 'divisao_por_rito':
-                    return processar_divisao_por_rito(dataframe)
-                elif categoria == 'processos_nao_julgados':
-                    return processar_nao_julgados(dataframe)
-                elif categoria == 'processos_nao_citados':
-                    return processar_nao_citados(dataframe)
-                elif categoria == 'processo_mais_antigo':
-                    return consultar_gemini_conversacional(pergunta, dataframe), "Para encontrar o processo mais antigo, verifique a data de distribuição mais antiga no banco de dados."
-
-                # Para cada categoria, verificar se a função retorna um gráfico ou uma string
-                historico_conversa.append({"Usuário": pergunta, "TIAGO": resposta_texto})
-                return resposta_texto, {}
-
-    # Se a pergunta não puder ser processada diretamente, enviar para o Gemini
-    chatgemini_resposta = consultar_gemini_conversacional(pergunta, dataframe)
-    historico_conversa.append({"Usuário": pergunta, "TIAGO": chatgemini_resposta})
-    return chatgemini_resposta, {}  # Retorna string do Gemini com gráfico vazio
-
-
-# Limites da API do ChatGemini
-RPM = 10  # 2 requisições por minuto
-RPD = 800  # 50 requisições por dia
-
-# Função para contar o número de tokens
-def contar_tokens(texto):
-    # Uma maneira simplificada de contar tokens é dividir o texto em palavras
-    # Você pode ajustar isso para ser mais preciso com base no comportamento do modelo
-    return len(texto.split())
-
-# Configurar a API do Gemini
-def configurar_gemini():
-    genai.configure(api_key=os.environ["GEMINI_API_KEY"]) # Certifique-se de ter a chave de API do Gemini no seu .env
-    
-    
-# Limitar a taxa de requisições a 2 por minuto (RPM) e 50 por dia (rPD)
-# @sleep_and_retry
-# @limits(calls=RPM, period=60)  # Limite de 2 chamadas por minuto
-# @limits(calls=RPD, period=86400)  # Limite de 50 chamadas por dia
-# def consultar_gemini(pergunta, dataframe):
-#     configurar_gemini()
-#     model = genai.GenerativeModel("gemini-1.5-pro-001")
-#
-#     # Converter todos os dados do DataFrame em uma string para fornecer contexto ao Gemini
-#     contexto = dataframe.to_string(index=False)
-#     prompt = f"Os dados a seguir são extraídos de um arquivo Excel:\n{contexto}\n\nPergunta: {pergunta}\n\nResponda de forma concisa, fornecendo resultado de terceira pessoa, por exemplo: Atualmente, há X processos ativos."
-#
-#     # Contar tokens no prompt
-#     tokens_enviados = contar_tokens(prompt)
-#     print(f"Tokens enviados: {tokens_enviados}")
-#
-#     try:
-#         # Enviar a pergunta com o contexto para o Gemini
-#         response = model.generate_content(prompt)
-#         # Contar tokens na resposta
-#         tokens_recebidos = contar_tokens(response.text)
-#         print(f"Tokens recebidos: {tokens_recebidos}")
-#         return response.text.strip()  # Extrair o texto da resposta
-#
-#     except Exception as e:
-#         print(f"Erro ao consultar a API do Gemini: {e}")
-#         return "Desculpe, não conseguir processar sua solicitação. Mais irei melhora meu banco de dados."
-    
-# Função específica para perguntas conversacionais
-# Conversações simples com limite de requisições
-@sleep_and_retry
-@limits(calls=RPM, period=60)
-@limits(calls=RPD, period=86400)
-def consultar_gemini_conversacional(pergunta, dataframe):
-    # Configurar a API do Gemini para conversas genéricas
-    configurar_gemini()  # Certifique-se de ter a chave de API do Gemini no seu .env
-    model = genai.GenerativeModel("gemini-1.5-pro-001")
-    
-    # Converter todos os dados do DataFrame em uma string para fornecer contexto ao Gemini
-    contexto = dataframe.to_string(index=False)
-    contexto_conversa = "\n".join([f"{msg['Usuário']}: {msg['TIAGO']}" for msg in historico_conversa[-5:]])
-    prompt = (f"Contexto da conversa:\n{contexto_conversa}\n\nDados do Excel:\n{contexto}\n\n"
-              f"Pergunta atual: {pergunta}\n\nConverse com o usuário de forma amigável e educada, "
-              "sem incluir emojis.")
-    
-    tokens_enviados = contar_tokens(prompt)
-    print(f"Tokens enviados: {tokens_enviados}")
-    
-    try:
-        # Enviar a pergunta para o Gemini e obter uma resposta
-        response = model.generate_content(prompt)
-        tokens_recebidos = contar_tokens(response.text)
-        print(f"Tokens recebidos: {tokens_recebidos}")
-        return response.text.strip()  # Retorna a resposta como string limpa
-    except Exception as e:
-        print(f"Erro ao consultar a API do Gemini: {e}")
-        return "Desculpe, ainda estou aprimorando minha base de conhecimento. Tente novamente em alguns instantes."
-
+    if e_saudacao(pergunta_normalizada):
+        return 'saudacao', INTENCAO_SAUDACAO
+
+    categoria = identificar_categoria(pergunta_normalizada)
+    if categoria is None:
+        return None, INTENCAO_GEMINI
+    return categoria, intencoes[categoria]
+
+# Função para montar a chave de cache da resposta: conteúdo lido pela intenção (ou a versão dos
+# dados, Carteira.impressao) + intenção + parâmetros
+# Perguntas que só diferem em acentos, pontuação ou maiúsculas compartilham a mesma chave
+# Nas intenções do Gemini a resposta depende também do histórico da conversa: com histórico, a
+# chave leva o resumo dele, então nem o cache nem a pergunta em andamento (routes.py) passam a
+# resposta de uma conversa para outra (só conversas com o mesmo histórico compartilham)
+def chave_resposta(categoria, intencao, pergunta, carteira, historico=()):
+    if intencao.parametros is not None:
+        parametros = intencao.parametros(pergunta)
+    elif intencao.usa_pergunta:
+        parametros = normalizar_pergunta(pergunta)
+    else:
+        parametros = None
+    impressao = carteira.impressao(intencao.fonte, intencao.dependencias)
+    chave = f"resposta:{impressao}:{categoria or 'gemini'}:{parametros or ''}"
+    if intencao.usa_gemini and historico:
+        resumo = hashlib.sha256(json.dumps(list(historico), ensure_ascii=False, sort_keys=True).encode('utf-8'))
+        chave += f":{resumo.hexdigest()[:32]}"
+    return chave
+
+# Função para saber, antes de processar, se a pergunta vai consultar o Gemini
+def pergunta_usa_gemini(pergunta):
+    return resolver_intencao(pergunta)[1].usa_gemini
+
+# Argumentos da função da intenção: a fonte de dados, a pergunta (usa_pergunta) e, nas
+# intenções do Gemini, o histórico da conversa de quem perguntou
+def _argumentos(intencao, fonte, pergunta, historico):
+    argumentos = [fonte]
+    if intencao.usa_pergunta:
+        argumentos.append(pergunta)
+    if intencao.usa_gemini:
+        argumentos.append(historico)
+    return argumentos
+
+# Resposta para as perguntas que a carteira não tem como responder: a exportação não traz todas as
+# colunas (a planilha de exemplo, por exemplo, não tem 'Resultado da Sentença')
+def responder_dados_indisponiveis(colunas_ausentes):
+    if colunas_ausentes:
+        return f"Esta carteira não tem dados de {', '.join(colunas_ausentes)} para responder a essa pergunta.", {}
+    return "Esta carteira não tem os dados necessários para responder a essa pergunta.", {}
+
+# Função para executar a intenção já identificada
+# O histórico é registrado por quem recebe a resposta (routes.py), conversa a conversa
+def executar_intencao(categoria, intencao, pergunta, carteira, historico=()):
+    inicio = time.perf_counter()
+    fonte = getattr(carteira, intencao.fonte)  # DataFrame ou cubo de agregados
+    ausentes = [coluna for coluna in intencao.colunas() if coluna not in carteira.dados.columns]
+    if fonte is None or ausentes:
+        resposta_texto, grafico_data = responder_dados_indisponiveis(ausentes)
+    else:
+        resposta_texto, grafico_data = intencao.funcao(*_argumentos(intencao, fonte, pergunta, historico))
+    registrar_execucao(categoria, time.perf_counter() - inicio)
+    return resposta_texto, grafico_data
+
+# Mesma execução para a faixa assíncrona: intenções com funcao_async não bloqueiam a thread
+async def executar_intencao_async(categoria, intencao, pergunta, carteira, historico=()):
+    if intencao.funcao_async is None:
+        return executar_intencao(categoria, intencao, pergunta, carteira, historico)
+    inicio = time.perf_counter()
+    fonte = getattr(carteira, intencao.fonte)
+    resposta_texto, grafico_data = await intencao.funcao_async(*_argumentos(intencao, fonte, pergunta, historico))
+    registrar_execucao(categoria, time.perf_counter() - inicio)
+    return resposta_texto, grafico_data
+
+# Execução em partes (intenções com funcao_em_partes): devolve (gerador das partes do texto,
+# gráfico); a estatística é registrada quando a última parte sai
+def executar_intencao_em_partes(categoria, intencao, pergunta, carteira, historico=()):
+    fonte = getattr(carteira, intencao.fonte)
+    partes, grafico_data = intencao.funcao_em_partes(*_argumentos(intencao, fonte, pergunta, historico))
+
+    def acompanhar():
+        inicio = time.perf_counter()
+        yield from partes
+        registrar_execucao(categoria, time.perf_counter() - inicio)
+
+    return acompanhar(), grafico_data
+
+def processar_pergunta(pergunta, carteira):
+    categoria, intencao = resolver_intencao(pergunta)
+    return executar_intencao(categoria, intencao, pergunta, carteira)
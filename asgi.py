@@ -0,0 +1,5 @@
+from app import create_app
+from app.asgi import criar_app_asgi
+
+# Servidor ASGI: uvicorn asgi:app --workers N
+app = criar_app_asgi(create_app())
@@ -0,0 +1,59 @@
+# bench_classificador.py
+# Micro-benchmark da identificação de categoria: laço de re.search (implementação antiga)
+# contra o classificador de Aho-Corasick de app/classificador.py
+#
+# Uso (na raiz do projeto): python -m benchmarks.bench_classificador [repeticoes]
+import os
+import re
+import sys
+import timeit
+
+from app.map import categoria_perguntas
+from app.classificador import ClassificadorIntencoes, normalizar_pergunta
+
+ARQUIVO_PERGUNTAS = os.path.join(os.path.dirname(__file__), 'perguntas.txt')
+
+
+# Implementação anterior: percorre as categorias na ordem do dicionário e para no primeiro re.search
+def identificar_categoria_legado(pergunta_normalizada):
+    for categoria, padroes in categoria_perguntas.items():
+        for padrao in padroes:
+            if re.search(padrao, pergunta_normalizada, re.IGNORECASE):
+                return categoria
+    return None
+
+
+def carregar_perguntas():
+    with open(ARQUIVO_PERGUNTAS, encoding='utf-8') as arquivo:
+        return [linha.strip() for linha in arquivo if linha.strip() and not linha.startswith('#')]
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    perguntas = [normalizar_pergunta(p) for p in carregar_perguntas()]
+
+    inicio = timeit.default_timer()
+    classificador = ClassificadorIntencoes(categoria_perguntas)
+    tempo_montagem = timeit.default_timer() - inicio
+
+    def rodar(funcao):
+        tempo = timeit.timeit(lambda: [funcao(p) for p in perguntas], number=repeticoes)
+        return tempo / (repeticoes * len(perguntas)) * 1e6
+
+    tempo_legado = rodar(identificar_categoria_legado)
+    tempo_novo = rodar(classificador.classificar)
+
+    print(f"Perguntas no corpus: {len(perguntas)} | repetições: {repeticoes}")
+    print(f"Montagem do autômato: {tempo_montagem * 1e3:.2f} ms")
+    print(f"re.search em laço:    {tempo_legado:8.2f} µs/pergunta")
+    print(f"Aho-Corasick:         {tempo_novo:8.2f} µs/pergunta ({tempo_legado / tempo_novo:.1f}x)")
+
+    # Perguntas em que a regra da frase mais longa muda a categoria escolhida
+    for pergunta in perguntas:
+        antiga, nova = identificar_categoria_legado(pergunta), classificador.classificar(pergunta)
+        if antiga != nova:
+            print(f"  {pergunta!r}: {antiga} -> {nova}")
+
+
+if __name__ == '__main__':
+    main()
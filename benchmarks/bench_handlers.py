@@ -0,0 +1,278 @@
+# bench_handlers.py
+# Suíte de benchmarks da carteira sintética (benchmarks/gerar_carteira.py), de 10 mil a 10 milhões
+# de linhas: mede a carga (leitura da planilha, montagem da Carteira e recarga incremental), a
+# identificação da intenção de cada pergunta de benchmarks/perguntas.txt e cada handler
+# processar_* de app/functions_.py, com throughput e pico de memória
+# O resultado é gravado em JSON (commit, ambiente e uma linha por medição) para comparar com o de
+# outro commit: --comparar mostra a razão novo/base de cada medição
+#
+# Uso (na raiz do projeto): python -m benchmarks.bench_handlers [--linhas 10k,100k] [--repeticoes 5]
+#     [--formato csv|xlsx] [--semente 42] [--saida resultados.json] [--comparar base.json] [--sem-memoria]
+# As carteiras geradas ficam em benchmarks/dados/ e são reaproveitadas entre execuções
+import argparse
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows: sem o pico de memória do processo (rss_max_mb)
+
+from app import functions_
+from app.carteira import Carteira
+from app.delta import atualizar_carteira
+from app.functions_ import (
+    processar_media_duracao_processos_arquivados, processar_orgao, processar_datas, processar_semana,
+    processar_status,
+)
+from app.intencoes import intencoes
+from app.leitura_planilha import ler_planilha_com_impressoes
+from app.utils import resolver_intencao, executar_intencao
+from benchmarks.bench_classificador import carregar_perguntas
+from benchmarks.gerar_carteira import LIMITE_XLSX, gerar_carteira, interpretar_linhas
+
+VERSAO_FORMATO = 1  # Muda quando o formato do JSON de resultados muda
+PASTA_DADOS = os.path.join(os.path.dirname(__file__), 'dados')
+LIMIAR_REGRESSAO = 1.10  # Razão novo/base a partir da qual a comparação marca a medição
+
+# Handlers que nenhuma intenção registra (ou que ela chama por uma lambda), com os argumentos
+# que as respostas usariam
+EXTRAS = {
+    'processar_media_duracao_processos_arquivados': lambda carteira: processar_media_duracao_processos_arquivados(carteira.dados),
+    'processar_orgao': lambda carteira: processar_orgao(carteira.dados),
+    'processar_datas': lambda carteira: processar_datas(carteira.dados, 'Data de distribuição', "Quantos processos foram distribuídos no mês de março?"),
+    'processar_semana': lambda carteira: processar_semana(carteira.dados, 'Data de distribuição', "Quantos processos foram distribuídos na semana passada?"),
+    'processar_status': lambda carteira: processar_status("Quantos processos ativos?", carteira.cubo, 'ativo'),
+}
+
+
+# Tempo (s) e resultado de uma chamada
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+
+# Pico de memória (MB) alocada durante a chamada, numa execução à parte (o tracemalloc deixa
+# tudo mais lento); conta os objetos Python e os arrays do numpy/pandas
+def pico_memoria(funcao):
+    tracemalloc.start()
+    try:
+        funcao()
+        return round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+    finally:
+        tracemalloc.stop()
+
+
+def medir(funcao, repeticoes):
+    funcao()  # Aquecimento: caches do pandas e do classificador
+    return statistics.median(cronometrar(funcao)[0] for _ in range(repeticoes))
+
+
+def resultado(linhas, etapa, nome, segundos, operacoes=1, pico_mb=None):
+    return {
+        "linhas": linhas,
+        "etapa": etapa,
+        "nome": nome,
+        "segundos": round(segundos, 6),
+        "operacoes_por_s": round(operacoes / segundos, 2) if segundos else None,
+        "linhas_por_s": round(linhas * operacoes / segundos) if segundos else None,
+        "pico_mb": pico_mb,
+    }
+
+
+# Carteira sintética da pasta de dados, gerada na primeira vez
+def arquivo_carteira(linhas, formato, semente):
+    caminho = os.path.join(PASTA_DADOS, f"carteira_{linhas}_{semente}.{formato}")
+    if not os.path.exists(caminho):
+        print(f"Gerando {caminho}...", flush=True)
+        gerar_carteira(linhas, caminho, semente)
+    return caminho
+
+
+# Pergunta de cada categoria: a primeira do corpus que cai nela; status_autor pergunta por uma
+# parte que existe na carteira
+def perguntas_por_categoria(perguntas, carteira):
+    escolhidas = {}
+    for pergunta in perguntas:
+        categoria = resolver_intencao(pergunta)[0]
+        escolhidas.setdefault(categoria, pergunta)
+    autores = carteira.dados['Envolvidos - Polo Ativo'].dropna()
+    if len(autores):
+        nome = autores.iloc[len(autores) // 2].split(' - ')[0].title()
+        escolhidas['status_autor'] = f"Qual o status do processo de {nome}?"
+    return escolhidas
+
+
+def medir_carga(caminho, linhas, memoria):
+    resultados = []
+    segundos, (dados, impressoes) = cronometrar(lambda: ler_planilha_com_impressoes(caminho))
+    resultados.append(resultado(linhas, 'carga', 'ler_planilha', segundos,
+                                pico_mb=pico_memoria(lambda: ler_planilha_com_impressoes(caminho)) if memoria else None))
+
+    montar = lambda: Carteira(dados, 'bench', caminho, impressoes)
+    segundos, carteira = cronometrar(montar)
+    resultados.append(resultado(linhas, 'carga', 'montar_carteira', segundos,
+                                pico_mb=pico_memoria(montar) if memoria else None))
+
+    # Mesma exportação de novo: o caminho da recarga diária, em que quase nada muda (app/delta.py)
+    recarregar = lambda: atualizar_carteira(carteira, caminho, 'bench-2')
+    segundos, _ = cronometrar(recarregar)
+    resultados.append(resultado(linhas, 'carga', 'atualizar_carteira', segundos,
+                                pico_mb=pico_memoria(recarregar) if memoria else None))
+    return carteira, resultados
+
+
+def medir_roteamento(perguntas, linhas, repeticoes):
+    rotear = lambda: [resolver_intencao(pergunta) for pergunta in perguntas]
+    segundos = medir(rotear, repeticoes)
+    medicao = resultado(linhas, 'roteamento', 'resolver_intencao', segundos, operacoes=len(perguntas))
+    medicao["linhas_por_s"] = None  # Não depende do tamanho da carteira
+    return [medicao]
+
+
+def medir_handlers(carteira, perguntas, linhas, repeticoes, memoria):
+    resultados = []
+    escolhidas = perguntas_por_categoria(perguntas, carteira)
+    chamadas = {
+        categoria: (lambda categoria=categoria, intencao=intencao:
+                    executar_intencao(categoria, intencao, escolhidas.get(categoria, categoria), carteira))
+        for categoria, intencao in intencoes.items() if not intencao.usa_gemini
+    }
+    chamadas.update({nome: (lambda funcao=funcao: funcao(carteira)) for nome, funcao in EXTRAS.items()})
+    for nome, chamada in chamadas.items():
+        # Um handler que falha (ex.: locale.currency sem o locale pt_BR instalado) fica registrado
+        # com o erro, sem interromper as outras medições
+        try:
+            segundos = medir(chamada, repeticoes)
+        except Exception as e:
+            resultados.append({**resultado(linhas, 'handler', nome, 0.0), "segundos": None, "erro": f"{type(e).__name__}: {e}"})
+            continue
+        resultados.append(resultado(linhas, 'handler', nome, segundos,
+                                    pico_mb=pico_memoria(chamada) if memoria else None))
+    return resultados
+
+
+# Funções processar_* de app/functions_.py sem nenhuma medição (nem por intenção nem em EXTRAS)
+def handlers_sem_benchmark():
+    medidas = {getattr(intencao.funcao, '__name__', '') for intencao in intencoes.values()} | set(EXTRAS)
+    return sorted(
+        nome for nome, funcao in inspect.getmembers(functions_, inspect.isfunction)
+        if nome.startswith('processar_') and funcao.__module__ == functions_.__name__ and nome not in medidas
+    )
+
+
+def commit_atual():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        sujo = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, sujo
+
+
+def ambiente():
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def imprimir(resultados):
+    print(f"\n{'linhas':>10}  {'etapa':<11}{'nome':<46}{'segundos':>11}{'op/s':>14}{'linhas/s':>18}{'pico MB':>10}")
+    for item in resultados:
+        if item.get('erro'):
+            print(f"{item['linhas']:>10}  {item['etapa']:<11}{item['nome']:<46}  erro: {item['erro']}")
+            continue
+        operacoes = f"{item['operacoes_por_s']:,.1f}" if item['operacoes_por_s'] is not None else '-'
+        linhas_s = f"{item['linhas_por_s']:,}" if item['linhas_por_s'] is not None else '-'
+        pico = f"{item['pico_mb']:.1f}" if item['pico_mb'] is not None else '-'
+        print(f"{item['linhas']:>10}  {item['etapa']:<11}{item['nome']:<46}{item['segundos']:>11.5f}{operacoes:>14}{linhas_s:>18}{pico:>10}")
+
+
+# Razão novo/base dos tempos de cada medição presente nos dois resultados
+def comparar(resultados, arquivo_base):
+    with open(arquivo_base, encoding='utf-8') as arquivo:
+        base = json.load(arquivo)
+    tempos_base = {(item['linhas'], item['etapa'], item['nome']): item['segundos'] for item in base['resultados']}
+    print(f"\nComparação com {arquivo_base} (commit {base.get('commit')}): razão novo/base do tempo")
+    for item in resultados:
+        anterior = tempos_base.get((item['linhas'], item['etapa'], item['nome']))
+        if not anterior or not item['segundos']:
+            continue
+        razao = item['segundos'] / anterior
+        marca = '  <- mais lento' if razao >= LIMIAR_REGRESSAO else ('  <- mais rápido' if razao <= 1 / LIMIAR_REGRESSAO else '')
+        print(f"{item['linhas']:>10}  {item['etapa']:<11}{item['nome']:<46}{razao:>8.2f}x{marca}")
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description="Benchmarks de carga, roteamento e handlers na carteira sintética")
+    argumentos.add_argument('--linhas', default='10k', help="Tamanhos da carteira separados por vírgula (ex.: 10k,100k,1M)")
+    argumentos.add_argument('--repeticoes', type=int, default=5, help="Execuções de cada handler (vale a mediana)")
+    argumentos.add_argument('--formato', choices=('csv', 'xlsx'), default='csv')
+    argumentos.add_argument('--semente', type=int, default=42)
+    argumentos.add_argument('--saida', help="Arquivo JSON dos resultados (padrão: benchmarks/dados/resultados_<commit>.json)")
+    argumentos.add_argument('--comparar', help="JSON de outra execução para comparar")
+    argumentos.add_argument('--sem-memoria', action='store_true', help="Não medir o pico de memória (execução mais rápida)")
+    opcoes = argumentos.parse_args()
+
+    tamanhos = [interpretar_linhas(texto) for texto in opcoes.linhas.split(',')]
+    if opcoes.formato == 'xlsx' and max(tamanhos) > LIMITE_XLSX:
+        sys.exit(f"Uma planilha .xlsx tem no máximo {LIMITE_XLSX} linhas: use --formato csv")
+    perguntas = carregar_perguntas()
+    commit, sujo = commit_atual()
+
+    resultados = []
+    for linhas in tamanhos:
+        caminho = arquivo_carteira(linhas, opcoes.formato, opcoes.semente)
+        print(f"Carteira de {linhas} linhas: {caminho}", flush=True)
+        carteira, medicoes = medir_carga(caminho, linhas, not opcoes.sem_memoria)
+        medicoes += medir_roteamento(perguntas, linhas, opcoes.repeticoes)
+        medicoes += medir_handlers(carteira, perguntas, linhas, opcoes.repeticoes, not opcoes.sem_memoria)
+        resultados += medicoes
+        del carteira
+
+    sem_benchmark = handlers_sem_benchmark()
+    relatorio = {
+        "versao_formato": VERSAO_FORMATO,
+        "commit": commit,
+        "alteracoes_nao_commitadas": sujo,
+        "data": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "ambiente": ambiente(),
+        "parametros": {
+            "linhas": tamanhos, "repeticoes": opcoes.repeticoes, "formato": opcoes.formato,
+            "semente": opcoes.semente, "perguntas": len(perguntas), "memoria": not opcoes.sem_memoria,
+        },
+        "resultados": resultados,
+        "sem_benchmark": sem_benchmark,
+        # ru_maxrss vem em KB no Linux
+        "rss_max_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1) if resource else None,
+    }
+
+    imprimir(resultados)
+    if sem_benchmark:
+        print(f"\nHandlers sem benchmark: {', '.join(sem_benchmark)}")
+    saida = opcoes.saida or os.path.join(PASTA_DADOS, f"resultados_{commit or 'sem_git'}{'-sujo' if sujo else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    print(f"\nResultados: {saida}")
+    if opcoes.comparar:
+        comparar(resultados, opcoes.comparar)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# bench_memoria.py
+# Relatório de memória e CPU das colunas categóricas (app/ingestao.py): compara a carteira
+# com as colunas de baixa cardinalidade como texto (object) e como pandas.Categorical
+#
+# Uso (na raiz do projeto): python -m benchmarks.bench_memoria [arquivo.xlsx] [repeticoes]
+import sys
+import timeit
+
+from app.cubo import construir_cubo
+from app.ingestao import COLUNAS_CATEGORICAS
+from app.utils import carregar_dados
+
+ARQUIVO_PADRAO = 'Processos_20240917131041.xlsx'
+
+# Operações típicas dos handlers sobre as colunas categóricas
+OPERACOES = {
+    "Status == 'ativo'": lambda dados: (dados['Status'] == 'ativo').sum(),
+    "Foro.value_counts()": lambda dados: dados['Foro'].value_counts(),
+    "Órgão.str.lower()": lambda dados: dados['Órgão'].str.lower(),
+    "Assuntos.str.contains()": lambda dados: dados['Assuntos'].str.contains('convenção', case=False, na=False),
+    "construir_cubo()": construir_cubo,
+}
+
+
+def megabytes(valor):
+    return valor / 1024 ** 2
+
+
+def main():
+    arquivo = sys.argv[1] if len(sys.argv) > 1 else ARQUIVO_PADRAO
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    depois = carregar_dados(arquivo)
+    colunas = [coluna for coluna in COLUNAS_CATEGORICAS if coluna in depois.columns]
+    antes = depois.astype({coluna: object for coluna in colunas})
+
+    memoria_antes = antes.memory_usage(deep=True)
+    memoria_depois = depois.memory_usage(deep=True)
+
+    print(f"Arquivo: {arquivo} | {len(depois)} linhas x {len(depois.columns)} colunas")
+    print(f"{'coluna':<24}{'distintos':>10}{'object (MB)':>14}{'category (MB)':>16}")
+    for coluna in colunas:
+        print(f"{coluna:<24}{depois[coluna].nunique():>10}"
+              f"{megabytes(memoria_antes[coluna]):>14.3f}{megabytes(memoria_depois[coluna]):>16.3f}")
+    total_antes, total_depois = megabytes(memoria_antes.sum()), megabytes(memoria_depois.sum())
+    print(f"{'DataFrame inteiro':<34}{total_antes:>14.3f}{total_depois:>16.3f}"
+          f"  (-{(1 - total_depois / total_antes) * 100:.0f}%)")
+
+    print(f"\n{'operação':<26}{'object (µs)':>14}{'category (µs)':>16}")
+    for nome, operacao in OPERACOES.items():
+        tempos = [
+            timeit.timeit(lambda: operacao(dados), number=repeticoes) / repeticoes * 1e6
+            for dados in (antes, depois)
+        ]
+        print(f"{nome:<26}{tempos[0]:>14.1f}{tempos[1]:>16.1f}  ({tempos[0] / tempos[1]:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+# gerar_carteira.py
+# Gerador de carteiras sintéticas no formato da exportação do sistema de processos: as colunas
+# lidas pelos handlers, valores em reais como texto ("R$ 1.234,56"), datas dd/mm/aaaa, partes
+# com nome e sobrenome (algumas com vários processos) e foros concentrados em poucas comarcas,
+# como na carteira real. Escreve em blocos, então 10 milhões de linhas não passam pela memória
+# de uma vez; a mesma semente gera sempre o mesmo arquivo
+#
+# Uso (na raiz do projeto): python -m benchmarks.gerar_carteira <linhas> [saida.csv|saida.xlsx] [semente]
+# As linhas aceitam sufixos: 10k, 250k, 1M, 10M
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+LINHAS_POR_BLOCO = 100_000
+LIMITE_XLSX = 1_048_575  # Linhas de dados de uma planilha do Excel (fora o cabeçalho)
+DATA_REFERENCIA = np.datetime64('2024-09-17')  # Data da exportação de exemplo
+DIAS_HISTORICO = 12 * 365
+USO = "Uso: python -m benchmarks.gerar_carteira <linhas> [saida.csv|saida.xlsx] [semente]"
+
+COLUNAS = [
+    'Identificador', 'Tipo', 'Número CNJ', 'Órgão', 'Foro', 'Envolvidos - Polo Ativo',
+    'Envolvidos - Polo passivo', 'Última mov.', 'Assuntos', 'Data de distribuição', 'Data de citação',
+    'Data de cadastro', 'Status', 'Rito', 'Fase', 'Resultado da Sentença', 'Tipo de Recurso',
+    'Data de Trânsito em Julgado', 'Data de encerramento', 'Probabilidade', 'Responsáveis',
+    'Total da causa', 'Total deferido', 'Valor do acordo',
+]
+
+# (comarca, UF, peso): a carteira real concentra um terço dos processos em Fortaleza
+FOROS = [
+    ('Fortaleza', 'CE', 340), ('Manaus', 'AM', 25), ('Salvador', 'BA', 18), ('João Pessoa', 'PB', 17),
+    ('São Paulo', 'SP', 15), ('Natal', 'RN', 13), ('São Luís', 'MA', 12), ('Caucaia', 'CE', 12),
+    ('Juazeiro do Norte', 'CE', 10), ('Cuiabá', 'MT', 10), ('Maracanaú', 'CE', 10), ('Porto Alegre', 'RS', 9),
+    ('Maceió', 'AL', 9), ('Recife', 'PE', 9), ('Rio de Janeiro', 'RJ', 8), ('Campina Grande', 'PB', 7),
+    ('Sobral', 'CE', 6), ('Rio Branco', 'AC', 6), ('Guarapuava', 'PR', 5), ('Belém', 'PA', 5),
+    ('Goiânia', 'GO', 5), ('Mossoró', 'RN', 4), ('Belo Horizonte', 'MG', 4), ('Teresina', 'PI', 4),
+    ('Curitiba', 'PR', 3), ('Aracaju', 'SE', 3), ('Florianópolis', 'SC', 3), ('Vitória', 'ES', 3),
+    ('Campo Grande', 'MS', 3), ('Porto Velho', 'RO', 2), ('Palmas', 'TO', 2), ('Macapá', 'AP', 2),
+    ('Boa Vista', 'RR', 1), ('Brasília', 'DF', 3), ('Uberlândia', 'MG', 2), ('Campinas', 'SP', 2),
+    ('Joinville', 'SC', 2), ('Caxias do Sul', 'RS', 2), ('Petrolina', 'PE', 2), ('Imperatriz', 'MA', 2),
+]
+REGIAO_TRT = {
+    'RJ': 1, 'SP': 2, 'MG': 3, 'RS': 4, 'BA': 5, 'PE': 6, 'CE': 7, 'PA': 8, 'AP': 8, 'PR': 9, 'DF': 10,
+    'TO': 10, 'AM': 11, 'RR': 11, 'SC': 12, 'PB': 13, 'RO': 14, 'AC': 14, 'MA': 16, 'ES': 17, 'GO': 18,
+    'AL': 19, 'SE': 20, 'RN': 21, 'PI': 22, 'MT': 23, 'MS': 24,
+}
+
+PRENOMES = [
+    'MARIA', 'JOSE', 'ANA', 'JOAO', 'FRANCISCO', 'ANTONIO', 'FRANCISCA', 'CARLOS', 'PAULO', 'PEDRO',
+    'LUCAS', 'LUIZ', 'MARCOS', 'LUIS', 'GABRIEL', 'RAFAEL', 'DANIEL', 'MARCELO', 'BRUNO', 'EDUARDO',
+    'FELIPE', 'RAIMUNDO', 'RODRIGO', 'MANOEL', 'MATEUS', 'ANDRE', 'FERNANDO', 'FABIO', 'LEONARDO', 'GUSTAVO',
+    'ADRIANA', 'JULIANA', 'MARCIA', 'FERNANDA', 'PATRICIA', 'ALINE', 'SANDRA', 'CAMILA', 'AMANDA', 'BRUNA',
+    'JESSICA', 'LETICIA', 'JULIA', 'LUCIANA', 'VANESSA', 'MARIANA', 'GABRIELA', 'VERA', 'VITORIA', 'LARISSA',
+    'CLAUDIA', 'BEATRIZ', 'LUANA', 'RITA', 'SONIA', 'RENATA', 'ELIANE', 'JOSEFA', 'SIMONE', 'NATALIA',
+]
+SOBRENOMES = [
+    'SILVA', 'SANTOS', 'OLIVEIRA', 'SOUSA', 'RODRIGUES', 'FERREIRA', 'ALVES', 'PEREIRA', 'LIMA', 'GOMES',
+    'COSTA', 'RIBEIRO', 'MARTINS', 'CARVALHO', 'ALMEIDA', 'LOPES', 'SOARES', 'FERNANDES', 'VIEIRA', 'BARBOSA',
+    'ROCHA', 'DIAS', 'NASCIMENTO', 'ANDRADE', 'MOREIRA', 'NUNES', 'MARQUES', 'MACHADO', 'MENDES', 'FREITAS',
+    'CARDOSO', 'RAMOS', 'GONCALVES', 'SANTANA', 'TEIXEIRA', 'MELO', 'ARAUJO', 'PINTO', 'CAVALCANTE', 'BEZERRA',
+    'MONTEIRO', 'MOURA', 'CORREIA', 'BARROS', 'FARIAS', 'QUEIROZ', 'BRAGA', 'PINHEIRO', 'NOGUEIRA', 'MAIA',
+    'SAMPAIO', 'HOLANDA', 'FROTA', 'XAVIER', 'REBOUCAS', 'TAVARES', 'MATOS', 'SALES', 'BRITO', 'VIDAL',
+]
+REUS = [
+    'BANCO TRIANGULO S/A', 'TRICARD SERVICOS DE INTERMEDIACAO DE CARTOES DE CREDITO LTDA',
+    'MARTINS COMERCIO E SERVICOS DE DISTRIBUICAO S/A', 'CENTRO DE ENSINO SUPERIOR DO CEARA',
+    'MULTIPLA CREDITO FINANCIAMENTO E INVESTIMENTO SA', 'CAPITALIZE FOMENTO COMERCIAL LTDA',
+    'SP INDUSTRIA E DISTRIBUIDORA DE PETROLEO LTDA', 'SV COMERCIO DE MATERIAL ELETRICO LTDA',
+]
+ASSUNTOS = [
+    ('Bancários', 26), ('Dano', 18), ('Inclusão Indevida em Cadastro de Inadimplentes', 14), ('Duplicata', 10),
+    ('DIREITO DO CONSUMIDOR, Dano, Responsabilidade do Fornecedor', 9), ('Cédula de Crédito Bancário', 6),
+    ('Pagamento', 6), ('Cheque', 5), ('Nota Promissória', 4), ('Rescisão Indireta', 4), ('Horas Extras', 4),
+    ('Acordo e Convenção Coletivos de Trabalho', 3), ('Verbas Rescisórias', 3), ('Indenização por Dano Moral', 3),
+    ('Contratos Bancários', 2), ('Práticas Abusivas', 2),
+]
+RITOS = [('Comum', 30), ('Procon', 20), ('Especial', 15), ('Ordinário', 12), ('Sumaríssimo', 10), ('Sumário', 5)]
+FASES = [('Conhecimento', 40), ('Executória', 30), ('Recursal', 15), ('Conciliatória', 8), ('Execução', 7)]
+SENTENCAS = [
+    ('Sentenca improcedente', 30), ('Sentenca parcialmente procedente', 30),
+    ('Sentenca de extincao sem resolucao do merito', 25), ('Sentenca de homologacao de acordo', 15),
+]
+RECURSOS = [('-', 70), ('Recurso Ordinário', 10), ('Apelação', 8), ('Agravo de Instrumento', 5),
+            ('Recurso Inominado', 4), ('Embargos de Declaração', 3)]
+PROBABILIDADES = [('Neutro', 40), ('10% - Êxito remota', 15), ('70% - Êxito possível', 15),
+                  ('30% - Êxito remota', 10), ('70% - Perda possível', 10), ('90% - Perda provável', 10)]
+RESPONSAVEIS = [('Contencioso Bancário', 35), ('Recuperação de Crédito Judicial', 25), ('Trabalhista', 15),
+                ('Cível Estratégico', 15), ('Controladoria', 10)]
+
+
+# "10k" -> 10000, "1M" -> 1000000
+def interpretar_linhas(texto):
+    texto = str(texto).strip().lower().replace('_', '')
+    multiplicador = {'k': 1_000, 'm': 1_000_000}.get(texto[-1:], 1)
+    return int(float(texto.rstrip('km')) * multiplicador)
+
+
+def _sortear(gerador, opcoes, tamanho, vazios=0.0):
+    valores = np.array([valor for valor, _ in opcoes] + [None], dtype=object)
+    pesos = np.array([peso for _, peso in opcoes], dtype=float)
+    pesos = np.append(pesos / pesos.sum() * (1 - vazios), vazios)
+    return valores[gerador.choice(len(valores), size=tamanho, p=pesos)]
+
+
+# Tabela dia -> "dd/mm/aaaa" dos últimos DIAS_HISTORICO dias (e alguns à frente da referência):
+# formatar por consulta à tabela custa o mesmo para 10 mil ou 10 milhões de linhas
+def _tabela_datas():
+    dias = np.arange(-DIAS_HISTORICO, 400)
+    return pd.Series(DATA_REFERENCIA + dias).dt.strftime('%d/%m/%Y').to_numpy(dtype=object)
+
+
+def _datas(tabela, deslocamentos, preenchidas=None):
+    textos = tabela[np.clip(deslocamentos, 0, len(tabela) - 1)]
+    if preenchidas is not None:
+        textos[~preenchidas] = None
+    return textos
+
+
+def _reais(valores):
+    return np.array([
+        f"R$ {valor:,.2f}".translate(str.maketrans(',.', '.,')) for valor in valores.tolist()
+    ], dtype=object)
+
+
+# Número CNJ (NNNNNNN-DD.AAAA.J.TR.OOOO) com dígito verificador válido (módulo 97)
+def _numeros_cnj(sequenciais, anos, justica, tribunais, origens):
+    resto = sequenciais % 97
+    resto = (resto * 10_000 + anos) % 97
+    resto = (resto * 10 + justica) % 97
+    resto = (resto * 100 + tribunais) % 97
+    resto = (resto * 10_000 + origens) % 97
+    digitos = 98 - (resto * 100) % 97
+    return np.array([
+        f"{n:07d}-{d:02d}.{a}.{j}.{t:02d}.{o:04d}"
+        for n, d, a, j, t, o in zip(sequenciais.tolist(), digitos.tolist(), anos.tolist(),
+                                    justica.tolist(), tribunais.tolist(), origens.tolist())
+    ], dtype=object)
+
+
+# Bloco de `tamanho` processos a partir do processo número `inicio`
+def gerar_bloco(gerador, inicio, tamanho, total, tabela_datas):
+    indices = np.arange(inicio, inicio + tamanho)
+    pesos_foros = np.array([peso for _, _, peso in FOROS], dtype=float)
+    foros = gerador.choice(len(FOROS), size=tamanho, p=pesos_foros / pesos_foros.sum())
+    comarcas = np.array([comarca for comarca, _, _ in FOROS], dtype=object)[foros]
+    ufs = np.array([uf for _, uf, _ in FOROS], dtype=object)[foros]
+    foro = comarcas + ' - ' + ufs
+    foro[gerador.random(tamanho) < 0.08] = None
+
+    # Justiça: 5 = trabalho (TRT), 8 = estadual (TJ); Procon (administrativo) sem número CNJ próprio
+    trabalhista = gerador.random(tamanho) < 0.25
+    procon = ~trabalhista & (gerador.random(tamanho) < 0.2)
+    regioes = np.array([REGIAO_TRT[uf] for uf in ufs.tolist()])
+    orgao = np.where(trabalhista, 'TRT' + regioes.astype(str).astype(object), np.where(procon, 'PROCON-' + ufs, 'TJ-' + ufs))
+    orgao[gerador.random(tamanho) < 0.3] = None
+
+    distribuicao = -gerador.integers(30, DIAS_HISTORICO, size=tamanho)
+    anos = (DATA_REFERENCIA + distribuicao).astype('datetime64[Y]').astype(int) + 1970
+    numeros = _numeros_cnj(
+        indices % 10_000_000, anos, np.where(trabalhista, 5, 8), np.where(trabalhista, regioes, 6),
+        gerador.integers(1, 9999, size=tamanho),
+    )
+
+    # Partes: o autor é sorteado entre `total` pessoas, então parte delas tem vários processos
+    # (como na carteira real, ~70% de nomes distintos); a multiplicação espalha as pessoas por
+    # todas as combinações de dois prenomes e dois sobrenomes
+    n, m = len(PRENOMES), len(SOBRENOMES)
+    pessoas = gerador.integers(0, max(total, 100), size=tamanho) * 7_919_317 % (n * n * m * m)
+    autores = np.array([
+        f"{PRENOMES[p % n]} {PRENOMES[p // n % n]} {SOBRENOMES[p // n ** 2 % m]} {SOBRENOMES[p // (n ** 2 * m)]} - Autor(a)"
+        for p in pessoas.tolist()
+    ], dtype=object)
+    autores[gerador.random(tamanho) < 0.16] = None
+    reus = np.array([f"{reu} - Réu" for reu in REUS], dtype=object)[gerador.integers(0, len(REUS), size=tamanho)]
+
+    arquivado = gerador.random(tamanho) < 0.3
+    julgado = gerador.random(tamanho) < np.where(arquivado, 0.9, 0.35)
+    sentencas = _sortear(gerador, SENTENCAS, tamanho)
+    sentencas[~julgado] = None
+    transito = distribuicao + gerador.integers(180, 1500, size=tamanho)
+    ultima_mov = np.minimum(distribuicao + gerador.integers(0, 3000, size=tamanho), 0)
+    encerramento = np.minimum(ultima_mov + gerador.integers(0, 90, size=tamanho), 0)
+
+    causa = np.round(gerador.lognormal(9.6, 1.3, size=tamanho), 2)
+    causa[gerador.random(tamanho) < 0.1] = 0.0
+    deferido = np.where(julgado & (gerador.random(tamanho) < 0.4), np.round(causa * gerador.uniform(0.1, 1.0, size=tamanho), 2), 0.0)
+    acordo = np.where(gerador.random(tamanho) < 0.12, np.round(causa * gerador.uniform(0.2, 0.8, size=tamanho), 2), 0.0)
+
+    return pd.DataFrame({
+        'Identificador': 'PROC-' + (indices + 1).astype(str).astype(object),
+        'Tipo': np.where(procon, 'Extrajudicial', 'Judicial'),
+        'Número CNJ': numeros,
+        'Órgão': orgao,
+        'Foro': foro,
+        'Envolvidos - Polo Ativo': autores,
+        'Envolvidos - Polo passivo': reus,
+        'Última mov.': _datas(tabela_datas, ultima_mov + DIAS_HISTORICO, gerador.random(tamanho) < 0.7),
+        'Assuntos': _sortear(gerador, ASSUNTOS, tamanho, vazios=0.35),
+        'Data de distribuição': _datas(tabela_datas, distribuicao + DIAS_HISTORICO, gerador.random(tamanho) < 0.9),
+        'Data de citação': _datas(tabela_datas, distribuicao + gerador.integers(10, 120, size=tamanho) + DIAS_HISTORICO,
+                                  gerador.random(tamanho) < 0.25),
+        'Data de cadastro': _datas(tabela_datas, distribuicao + gerador.integers(0, 60, size=tamanho) + DIAS_HISTORICO),
+        'Status': np.where(arquivado, 'Arquivado', 'Ativo'),
+        'Rito': _sortear(gerador, RITOS, tamanho, vazios=0.4),
+        'Fase': _sortear(gerador, FASES, tamanho, vazios=0.6),
+        'Resultado da Sentença': sentencas,
+        'Tipo de Recurso': _sortear(gerador, RECURSOS, tamanho),
+        'Data de Trânsito em Julgado': _datas(tabela_datas, transito + DIAS_HISTORICO, julgado & arquivado & (transito < 0)),
+        'Data de encerramento': _datas(tabela_datas, encerramento + DIAS_HISTORICO, arquivado),
+        'Probabilidade': _sortear(gerador, PROBABILIDADES, tamanho),
+        'Responsáveis': _sortear(gerador, RESPONSAVEIS, tamanho, vazios=0.09),
+        'Total da causa': _reais(causa),
+        'Total deferido': _reais(deferido),
+        'Valor do acordo': _reais(acordo),
+    }, columns=COLUNAS)
+
+
+# Gerar a carteira em `saida` (.csv com ';' como a exportação, ou .xlsx até LIMITE_XLSX linhas)
+def gerar_carteira(linhas, saida, semente=42, progresso=None):
+    extensao = os.path.splitext(saida)[1].lower()
+    if extensao not in ('.csv', '.xlsx'):
+        raise ValueError(f"Formato não suportado: {extensao} (use .csv ou .xlsx)")
+    if extensao == '.xlsx' and linhas > LIMITE_XLSX:
+        raise ValueError(f"Uma planilha do Excel comporta até {LIMITE_XLSX} linhas; use .csv")
+
+    gerador = np.random.default_rng(semente)
+    tabela_datas = _tabela_datas()
+
+    def blocos():
+        for inicio in range(0, linhas, LINHAS_POR_BLOCO):
+            bloco = gerar_bloco(gerador, inicio, min(LINHAS_POR_BLOCO, linhas - inicio), linhas, tabela_datas)
+            yield bloco
+            if progresso:
+                progresso(inicio + len(bloco))
+
+    if os.path.dirname(saida):
+        os.makedirs(os.path.dirname(saida), exist_ok=True)
+    # Arquivo temporário trocado no fim: um arquivo interrompido no meio nunca tem o nome final
+    temporario = f"{saida}.{os.getpid()}.tmp"
+    try:
+        if extensao == '.csv':
+            _escrever_csv(blocos(), temporario)
+        else:
+            _escrever_xlsx(blocos(), temporario)
+        os.replace(temporario, saida)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return saida
+
+
+def _escrever_csv(blocos, caminho):
+    with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+        for numero, bloco in enumerate(blocos):
+            bloco.to_csv(arquivo, sep=';', index=False, header=numero == 0)
+
+
+def _escrever_xlsx(blocos, caminho):
+    from openpyxl import Workbook  # Só para gerar .xlsx
+
+    livro = Workbook(write_only=True)
+    planilha = livro.create_sheet()
+    planilha.append(COLUNAS)
+    for bloco in blocos:
+        for linha in bloco.itertuples(index=False):
+            planilha.append(linha)
+    livro.save(caminho)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(USO)
+        sys.exit(1)
+    linhas = interpretar_linhas(sys.argv[1])
+    saida = sys.argv[2] if len(sys.argv) > 2 else f"carteira_sintetica_{sys.argv[1]}.csv"
+    semente = int(sys.argv[3]) if len(sys.argv) > 3 else 42
+
+    inicio = time.perf_counter()
+    gerar_carteira(linhas, saida, semente, progresso=lambda feitas: print(f"\r{feitas}/{linhas} linhas", end='', flush=True))
+    duracao = time.perf_counter() - inicio
+    print(f"\n{saida}: {linhas} linhas em {duracao:.1f} s ({os.path.getsize(saida) / 2**20:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+# verificar_cache.py
+# Verificação dos backends compartilhados do cache de respostas (app/cache_compartilhado.py):
+# get/set/has/delete, expiração e o add() usado como reserva ("calculando:<chave>"), inclusive a
+# disputa em que vários workers tentam reservar a mesma chave ao mesmo tempo e só um pode vencer
+# - CacheSQLite: num arquivo temporário, com threads e com processos disputando a reserva
+# - CacheRedis: contra RedisFalso (abaixo), um servidor em memória no próprio processo; com
+#   --redis URL (e o pacote redis instalado), também contra um servidor de verdade
+#
+# Uso (na raiz do projeto): python -m benchmarks.verificar_cache [--concorrentes 16] [--redis URL]
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from time import monotonic
+
+from app.cache_compartilhado import CacheRedis, CacheSQLite
+
+
+# Servidor compatível com Redis em memória, com a interface do redis-py usada pelo RedisCache
+# Cada comando é atômico (uma trava, como o laço único do servidor) e fica registrado em
+# `comandos`, para conferir quais o adaptador envia
+class RedisFalso:
+    def __init__(self):
+        self._dados = {}  # chave -> (valor, expira_em ou None)
+        self._trava = threading.Lock()
+        self.comandos = []
+
+    def _valor(self, name):
+        valor, expira_em = self._dados.get(name, (None, None))
+        if expira_em is not None and expira_em <= monotonic():
+            del self._dados[name]
+            return None
+        return valor
+
+    def get(self, name):
+        with self._trava:
+            self.comandos.append('GET')
+            return self._valor(name)
+
+    def set(self, name, value, ex=None, nx=False):
+        with self._trava:
+            self.comandos.append('SET NX' if nx else 'SET')
+            if nx and self._valor(name) is not None:
+                return None
+            self._dados[name] = (value, monotonic() + ex if ex else None)
+            return True
+
+    def setnx(self, name, value):
+        with self._trava:
+            self.comandos.append('SETNX')
+            if self._valor(name) is not None:
+                return False
+            self._dados[name] = (value, None)
+            return True
+
+    def expire(self, name, time):
+        with self._trava:
+            self.comandos.append('EXPIRE')
+            if self._valor(name) is None:
+                return False
+            self._dados[name] = (self._dados[name][0], monotonic() + time)
+            return True
+
+    def exists(self, *names):
+        with self._trava:
+            self.comandos.append('EXISTS')
+            return sum(self._valor(name) is not None for name in names)
+
+    def delete(self, *names):
+        with self._trava:
+            self.comandos.append('DEL')
+            return sum(self._dados.pop(name, None) is not None for name in names)
+
+
+# Verificações comuns aos backends: devolve a lista de falhas
+def verificar_operacoes(cache):
+    falhas = []
+
+    def conferir(condicao, descricao):
+        if not condicao:
+            falhas.append(descricao)
+
+    cache.set('resposta:a', {"resposta": "x", "grafico": None}, timeout=60)
+    conferir(cache.get('resposta:a') == {"resposta": "x", "grafico": None}, "get devolve o valor gravado")
+    conferir(cache.has('resposta:a'), "has encontra a chave gravada")
+    conferir(cache.get('resposta:ausente') is None, "get de chave ausente devolve None")
+    conferir(cache.delete('resposta:a') and not cache.has('resposta:a'), "delete remove a chave")
+
+    conferir(cache.add('calculando:a', 1, timeout=60), "add reserva uma chave livre")
+    conferir(not cache.add('calculando:a', 2, timeout=60), "add recusa uma chave já reservada")
+    conferir(cache.get('calculando:a') == 1, "add recusado não altera a reserva")
+
+    cache.add('calculando:b', 1, timeout=1)
+    time.sleep(1.2)
+    conferir(not cache.has('calculando:b'), "a reserva expira no timeout")
+    conferir(cache.add('calculando:b', 2, timeout=60), "add reserva de novo uma chave expirada")
+    return falhas
+
+
+# Disputa pela mesma reserva: `concorrentes` threads esperam na mesma barreira e chamam add()
+# juntas; devolve quantas conseguiram reservar (o esperado é 1)
+def disputar_com_threads(cache, chave, concorrentes):
+    barreira = threading.Barrier(concorrentes)
+    vencedores = []
+
+    def tentar(indice):
+        barreira.wait()
+        if cache.add(chave, indice, timeout=60):
+            vencedores.append(indice)
+
+    threads = [threading.Thread(target=tentar, args=(indice,)) for indice in range(concorrentes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(vencedores)
+
+
+def _tentar_em_processo(caminho, chave, barreira, vencedores):
+    cache = CacheSQLite(caminho)
+    barreira.wait()
+    if cache.add(chave, os.getpid(), timeout=60):
+        with vencedores.get_lock():
+            vencedores.value += 1
+
+
+# Mesma disputa entre processos (workers do gunicorn), cada um com a sua conexão ao SQLite
+def disputar_com_processos(caminho, chave, concorrentes):
+    contexto = multiprocessing.get_context('spawn')
+    barreira = contexto.Barrier(concorrentes)
+    vencedores = contexto.Value('i', 0)
+    processos = [
+        contexto.Process(target=_tentar_em_processo, args=(caminho, chave, barreira, vencedores))
+        for _ in range(concorrentes)
+    ]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join()
+    return vencedores.value
+
+
+def relatar(nome, falhas):
+    print(f"{nome}: {'ok' if not falhas else 'FALHOU'}")
+    for falha in falhas:
+        print(f"  - {falha}")
+    return not falhas
+
+
+def verificar_sqlite(concorrentes):
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'respostas.sqlite3')
+        cache = CacheSQLite(caminho)
+        falhas = verificar_operacoes(cache)
+        for rodada in range(5):
+            vencedores = disputar_com_threads(cache, f'calculando:threads-{rodada}', concorrentes)
+            if vencedores != 1:
+                falhas.append(f"disputa entre {concorrentes} threads (rodada {rodada}): {vencedores} reservas")
+        vencedores = disputar_com_processos(caminho, 'calculando:processos', concorrentes)
+        if vencedores != 1:
+            falhas.append(f"disputa entre {concorrentes} processos: {vencedores} reservas")
+    return relatar("CacheSQLite", falhas)
+
+
+def verificar_redis_falso(concorrentes):
+    servidor = RedisFalso()
+    cache = CacheRedis(host=servidor, key_prefix='teste:')
+    falhas = verificar_operacoes(cache)
+
+    # A reserva é um único SET NX EX: nenhum SETNX seguido de EXPIRE, que deixaria uma reserva
+    # sem validade se o worker caísse entre os dois comandos
+    servidor.comandos.clear()
+    cache.add('calculando:c', 1, timeout=60)
+    if servidor.comandos != ['SET NX']:
+        falhas.append(f"add envia {servidor.comandos} em vez de um único SET NX EX")
+    if servidor._dados['teste:calculando:c'][1] is None:
+        falhas.append("a reserva criada pelo add não tem validade")
+
+    for rodada in range(5):
+        vencedores = disputar_com_threads(cache, f'calculando:threads-{rodada}', concorrentes)
+        if vencedores != 1:
+            falhas.append(f"disputa entre {concorrentes} threads (rodada {rodada}): {vencedores} reservas")
+    return relatar("CacheRedis (RedisFalso)", falhas)
+
+
+def verificar_redis(url, concorrentes):
+    import redis  # Só com --redis
+
+    prefixo = f'verificar_cache:{os.getpid()}:'
+    cache = CacheRedis(host=redis.Redis.from_url(url), key_prefix=prefixo)
+    try:
+        falhas = verificar_operacoes(cache)
+        for rodada in range(5):
+            vencedores = disputar_com_threads(cache, f'calculando:threads-{rodada}', concorrentes)
+            if vencedores != 1:
+                falhas.append(f"disputa entre {concorrentes} threads (rodada {rodada}): {vencedores} reservas")
+    finally:
+        cache.clear()  # Só as chaves com o prefixo desta verificação
+    return relatar(f"CacheRedis ({url})", falhas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica os backends compartilhados do cache de respostas")
+    parser.add_argument('--concorrentes', type=int, default=16, help="Threads/processos disputando cada reserva")
+    parser.add_argument('--redis', metavar='URL', help="Verificar também um servidor Redis de verdade")
+    args = parser.parse_args()
+
+    resultados = [verificar_sqlite(args.concorrentes), verificar_redis_falso(args.concorrentes)]
+    if args.redis:
+        resultados.append(verificar_redis(args.redis, args.concorrentes))
+    sys.exit(0 if all(resultados) else 1)
+
+
+if __name__ == '__main__':
+    main()
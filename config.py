@@ -9,7 +9,41 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 UPLOAD_FOLDER = 'uploads/'
+# Tamanho máximo (MB) da planilha enviada para importação (app/importacao.py); o Flask recusa corpos maiores
+UPLOAD_MAX_MB = int(os.getenv('UPLOAD_MAX_MB', 200))
+MAX_CONTENT_LENGTH = UPLOAD_MAX_MB * 2**20
+# Pasta dos snapshots binários (Arrow/Feather) das planilhas já normalizadas
+SNAPSHOT_FOLDER = os.getenv('SNAPSHOT_FOLDER', 'snapshots/')
+# Contexto enviado ao Gemini: 'recortado' (resumo + linhas relevantes) ou 'completo' (resumo + tabela inteira)
+CONTEXTO_GEMINI = os.getenv('CONTEXTO_GEMINI', 'recortado')
+# Orçamento de chamadas ao Gemini, compartilhado por todos os workers (app/limitador.py)
+GEMINI_RPM = int(os.getenv('GEMINI_RPM', 4))    # Requisições por minuto
+GEMINI_RPD = int(os.getenv('GEMINI_RPD', 100))  # Requisições por dia
+LIMITADOR_ARQUIVO = os.path.join(os.getenv('CACHE_DIR', 'cache/'), 'limites.sqlite3')
+# Cliente do Gemini (app/cliente_gemini.py); GEMINI_MODELO=falso usa um modelo local, sem rede
+GEMINI_MODELO = os.getenv('GEMINI_MODELO', 'gemini-1.5-pro-001')
+GEMINI_TIMEOUT = float(os.getenv('GEMINI_TIMEOUT', 60))              # Segundos por chamada
+GEMINI_TENTATIVAS = int(os.getenv('GEMINI_TENTATIVAS', 3))           # Em erros temporários
+GEMINI_ESPERA_INICIAL = float(os.getenv('GEMINI_ESPERA_INICIAL', 1))  # Dobra a cada nova tentativa
+GEMINI_LATENCIA_FALSA = float(os.getenv('GEMINI_LATENCIA_FALSA', 1))  # Latência do modelo falso
+# Tamanho máximo (em tokens, app/tokens.py) do prompt de cada pergunta: histórico e contexto são cortados
+ORCAMENTO_TOKENS_PROMPT = int(os.getenv('ORCAMENTO_TOKENS_PROMPT', 8000))
+# Histórico por conversa (app/historico.py): trocas guardadas por conversa, quantidade máxima de
+# conversas na memória e segundos sem uso até a conversa ser descartada
+HISTORICO_MENSAGENS = int(os.getenv('HISTORICO_MENSAGENS', 5))
+HISTORICO_MAX_CONVERSAS = int(os.getenv('HISTORICO_MAX_CONVERSAS', 1000))
+HISTORICO_EXPIRACAO = int(os.getenv('HISTORICO_EXPIRACAO', 3600))
+# Fonte da carteira (app/recarga.py): um arquivo fixo ou, com CARTEIRA_PASTA, a planilha mais recente
+# da pasta; a cada INTERVALO_RECARGA segundos a fonte é verificada e a carteira trocada a quente (0 = só por pedido)
+CARTEIRA_ARQUIVO = os.getenv('CARTEIRA_ARQUIVO', 'Processos_20240917131041.xlsx')
+CARTEIRA_PASTA = os.getenv('CARTEIRA_PASTA')
+INTERVALO_RECARGA = float(os.getenv('INTERVALO_RECARGA', 30))
+# Carteiras de outros clientes (app/registro_carteiras.py): uma subpasta de CARTEIRAS_PASTA por cliente,
+# carregadas sob demanda até CARTEIRAS_MEMORIA_MB; CARTEIRAS_TELEGRAM associa chats a carteiras (JSON)
+CARTEIRAS_PASTA = os.getenv('CARTEIRAS_PASTA', 'carteiras/')
+CARTEIRAS_MEMORIA_MB = int(os.getenv('CARTEIRAS_MEMORIA_MB', 512))
+CARTEIRAS_TELEGRAM = os.getenv('CARTEIRAS_TELEGRAM', os.path.join(CARTEIRAS_PASTA, 'telegram.json'))
 
-
-
-
+# Ingestão incremental (app/delta.py): uma exportação nova é comparada linha a linha com a carteira
+# atual e só as linhas inseridas ou alteradas são normalizadas (0 = sempre carga completa)
+INGESTAO_INCREMENTAL = os.getenv('INGESTAO_INCREMENTAL', '1') == '1'